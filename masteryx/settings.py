@@ -18,6 +18,27 @@ from dotenv import load_dotenv
 load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
+# GEMINI_STUB=1: lokaler Offline-Stub statt Gemini (Entwicklung, Benchmarks)
+GEMINI_STUB = os.getenv('GEMINI_STUB', '') == '1'
+GEMINI_STUB_LATENCY_MS = int(os.getenv('GEMINI_STUB_LATENCY_MS', '0'))
+GEMINI_STUB_INVALID_EVERY = int(os.getenv('GEMINI_STUB_INVALID_EVERY', '0'))   # jede n-te Antwort kaputt (0 = nie)
+# Obergrenze der Ausgabe je bewerteter Antwort (JSON mit kurzem Feedback)
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', '256'))
+# Gleichzeitige Antworten zur selben Aufgabe sammeln und in einem Prompt bewerten (0 = aus).
+# Nur sinnvoll mit mehreren Threads pro Prozess (gunicorn --threads), z. B. 200
+GEMINI_BATCH_WINDOW_MS = int(os.getenv('GEMINI_BATCH_WINDOW_MS', '0'))
+GEMINI_BATCH_MAX = int(os.getenv('GEMINI_BATCH_MAX', '10'))
+# Prompt-Präfix langer Aufgaben serverseitig cachen (~4 Zeichen/Token, Gemini cacht erst ab ~4k Tokens; 0 = aus)
+GEMINI_CONTEXT_CACHE_MIN_CHARS = int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_CHARS', '16000'))
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))   # Sekunden
+# Bewertung einer fast gleichen, schon bewerteten Antwort übernehmen (Kosinus über Zeichen-n-Gramme, 0 = aus).
+# Standard aus – ein anderer Artikel oder ein fehlendes Komma kann die Bewertung ändern; pro Frage
+# über QuizQuestion.reuse_threshold einschalten (empfohlen ≥ 0.99)
+ANSWER_REUSE_THRESHOLD = float(os.getenv('ANSWER_REUSE_THRESHOLD', '0'))
+
+# Beim Start der WSGI-Worker google.generativeai, Templates und Katalog vorladen (utils/warmup.py)
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', '1') == '1'
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,11 +76,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myx_stud.middleware.PerformanceTimingMiddleware',  # Server-Timing + Histogramm, muss vor Sessions stehen
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'myx_stud.middleware.LearnerMiddleware',   # Lernstand-Cookie (utils/mastery.py), nach Auth
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +117,27 @@ DATABASES = {
     }
 }
 
+# Caches: Daten (Seiten-Fragmente, Katalog, Context-Cache-Namen, Antwort-Index) liegen pro
+# Worker im Speicher; geteilt werden muss nur der Versionszähler (utils/caching.py) – ein Bump
+# im Worker, der die Admin-Änderung speichert, muss bei allen ankommen. Ohne REDIS_URL liegen
+# die Zähler in einem Dateicache (ein Dateizugriff statt SQL je Abfrage, nur für Worker auf
+# demselben Host); mit REDIS_URL liegt alles in Redis (mehrere Hosts).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    _redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+    CACHES = {'default': _redis, 'versions': _redis}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('VERSION_CACHE_DIR', str(BASE_DIR / '.cache' / 'versions')),
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +176,19 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Static mit Hash im Dateinamen → dauerhaft cachebar. Braucht das Manifest aus collectstatic,
+# deshalb nur mit STATIC_MANIFEST=1 (Produktion); sonst jede Seite mit {% static %} ein ValueError.
+STATIC_MANIFEST = os.getenv('STATIC_MANIFEST', '0') == '1'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.ManifestStaticFilesStorage' if STATIC_MANIFEST
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -139,4 +196,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Responsive Bilder: Varianten (WebP/AVIF) in diesen Breiten, erzeugt im Hintergrund-Thread
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_WORKERS = 1
+IMAGE_VARIANTS_SYNC = False   # True = direkt beim Speichern (Tests)
+
+# Media-Auslieferung: 'python' (Django selbst), 'x-accel' (nginx) oder 'x-sendfile' (Apache)
+MEDIA_SERVE_BACKEND = os.getenv('MEDIA_SERVE_BACKEND', 'python')
+MEDIA_ACCEL_PREFIX = '/protected-media/'   # nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+
+
+# Request-Timing (Server-Timing-Header + Histogramm unter /perf/)
+PERF_TIMING_ENABLED = True
+PERF_HISTOGRAM_SIZE = 1000   # letzte N Requests pro Endpoint
@@ -15,14 +15,15 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from myx_stud.views.media import serve_media
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", include("myx_stud.urls")),
+    # Media auch ohne DEBUG (Cache-Header, Range, optional X-Accel-Redirect/X-Sendfile)
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.+)$", serve_media, name="media"),
 ]
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'masteryx.settings')
 
 application = get_wsgi_application()
+
+# Teure Imports/Templates vor dem ersten Request laden (myx_stud/utils/warmup.py)
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, "WARMUP_ON_START", True):
+    from myx_stud.utils.warmup import warm_up  # noqa: E402
+    warm_up()
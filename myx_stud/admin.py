@@ -1,26 +1,42 @@
-from django.contrib import admin
-from .models import QuizQuestion, QuestionLog, Kurse, Konzepte
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from .models import QuizQuestion, QuestionLog, Kurse, Konzepte, Attempt
 from django.core.exceptions import PermissionDenied
-from django.db.models import QuerySet
+from django.db.models import Case, Count, Q, QuerySet, Value, When
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .utils import bulk_edit, search
+from .utils.permissions import allowed_kurs_ids
 
 
 # ===== Helpers =====
+# Kurs-IDs kommen aus utils.permissions (pro Request gemerkt + kurz gecacht) →
+# die Objekt-Checks unten sind Set-Lookups statt je einer .exists()-Abfrage.
 def allowed_courses_qs(user) -> QuerySet:
-    if not user.is_active or not user.is_staff:
-        return Kurse.objects.none()
-    if user.is_superuser:
+    ids = allowed_kurs_ids(user)
+    if ids is None:
         return Kurse.objects.all()
-    return Kurse.objects.filter(editors=user)
+    return Kurse.objects.filter(pk__in=ids)
 
-def user_can_access_course(user, kurs: Kurse) -> bool:
-    if not user.is_active or not user.is_staff:
-        return False
-    if user.is_superuser:
+def user_can_access_course(user, kurs) -> bool:
+    """kurs = Kurse-Objekt oder Kurs-ID."""
+    ids = allowed_kurs_ids(user)
+    if ids is None:
         return True
-    return allowed_courses_qs(user).filter(pk=kurs.pk).exists()
+    return getattr(kurs, "pk", kurs) in ids
 
 def allowed_konzepte_qs(user) -> QuerySet:
-    return Konzepte.objects.filter(kurs__in=allowed_courses_qs(user))
+    ids = allowed_kurs_ids(user)
+    if ids is None:
+        return Konzepte.objects.all()
+    return Konzepte.objects.filter(kurs_id__in=ids)
+
+def has_any_course(user) -> bool:
+    ids = allowed_kurs_ids(user)
+    return ids is None or bool(ids)
 
 
 
@@ -37,7 +53,7 @@ class KurseAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs if request.user.is_superuser else qs.filter(pk__in=allowed_courses_qs(request.user).values("pk"))
+        return qs if request.user.is_superuser else qs.filter(pk__in=allowed_kurs_ids(request.user))
 
     # Absicherung gegen Direkt-URL-Zugriffe
     def has_view_permission(self, request, obj=None):
@@ -68,14 +84,22 @@ class KurseAdmin(admin.ModelAdmin):
 class KonzepteAdmin(admin.ModelAdmin):
     list_display  = ["id", "name", "kurs", "funny"]
     list_editable = ["name", "funny"]
-    search_fields = ["name", "kurs__fach", "kurs__kurs"]
+    search_fields = ["name", "kurs__fach", "kurs__kurs"]   # Fallback ohne Volltextindex
     list_filter   = ["kurs"]
     raw_id_fields = ["kurs"]  # schneller FK-Picker
     # Optional schöner: autocomplete_fields = ["kurs"]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Konzepttexte über den Volltextindex (utils/search.py), Kursnamen weiter per icontains
+        ids = search.search_konzept_ids(search_term, limit=None) if search_term else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        by_kurs = Q(kurs__fach__icontains=search_term) | Q(kurs__kurs__icontains=search_term)
+        return queryset.filter(Q(pk__in=ids) | by_kurs), False
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs if request.user.is_superuser else qs.filter(kurs__in=allowed_courses_qs(request.user))
+        return qs if request.user.is_superuser else qs.filter(kurs_id__in=allowed_kurs_ids(request.user))
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "kurs" and not request.user.is_superuser:
@@ -83,7 +107,7 @@ class KonzepteAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def save_model(self, request, obj, form, change):
-        if not request.user.is_superuser and not user_can_access_course(request.user, obj.kurs):
+        if not request.user.is_superuser and not user_can_access_course(request.user, obj.kurs_id):
             raise PermissionDenied("Du darfst diesem Kurs keine Konzepte zuordnen.")
         super().save_model(request, obj, form, change)
 
@@ -91,41 +115,162 @@ class KonzepteAdmin(admin.ModelAdmin):
         base = super().has_view_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.kurs)
+        return user_can_access_course(request.user, obj.kurs_id)
 
     def has_change_permission(self, request, obj=None):
         base = super().has_change_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.kurs)
+        return user_can_access_course(request.user, obj.kurs_id)
 
     def has_delete_permission(self, request, obj=None):
         base = super().has_delete_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.kurs)
+        return user_can_access_course(request.user, obj.kurs_id)
 
     def has_add_permission(self, request):
         base = super().has_add_permission(request)
         if request.user.is_superuser:
             return base
-        return base and allowed_courses_qs(request.user).exists()
+        return base and has_any_course(request.user)
 
     def get_model_perms(self, request):
         perms = super().get_model_perms(request)
         if request.user.is_superuser:
             return perms
-        return perms if allowed_courses_qs(request.user).exists() else {}
+        return perms if has_any_course(request.user) else {}
     
 
 
 # === QuizQuestion ===
+class KonzeptChoiceForm(forms.Form):
+    konzept = forms.ModelChoiceField(queryset=Konzepte.objects.none(), label="Ziel-Konzept")
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["konzept"].queryset = allowed_konzepte_qs(user).select_related("kurs")
+
+
+class FeedbackPromptForm(forms.Form):
+    feedback_prompt = forms.CharField(widget=forms.Textarea, required=False, label="Neue Feedback-Vorgaben")
+
+
+class CsvImportForm(forms.Form):
+    csv_file = forms.FileField(label="CSV-Datei (aus „Als CSV exportieren“)")
+
+
 @admin.register(QuizQuestion)
 class QuizQuestionAdmin(admin.ModelAdmin):
     list_display = ['item_id', 'text', 'question', 'image', 'correct_answer', 'gemini_feedback', 'feedback_prompt']
     list_editable = ['text', 'question', 'correct_answer', 'gemini_feedback', 'feedback_prompt']
     list_per_page = 10
-    search_fields = ['question', 'konzept']
+    search_fields = ['title', 'question', 'konzept__name']   # Fallback ohne Volltextindex
+    change_list_template = "admin/myx_stud/quizquestion/change_list.html"
+
+    # Massenaktionen: je ein UPDATE/INSERT statt Zeile für Zeile (utils/bulk_edit.py).
+    # Der Queryset kommt aus get_queryset → bereits auf freigegebene Kurse beschränkt;
+    # ändernde Aktionen nur mit change- bzw. add-Recht (nicht für reine Leser).
+    actions = ["activate", "deactivate", "toggle_gemini_feedback", "move_to_konzept",
+               "replace_feedback_prompt", "duplicate_to_konzept", "export_csv"]
+
+    @admin.action(description="Ausgewählte Fragen aktivieren", permissions=["change"])
+    def activate(self, request, queryset):
+        n = bulk_edit.update_questions(queryset, active=True)
+        self.message_user(request, f"{n} Fragen aktiviert.")
+
+    @admin.action(description="Ausgewählte Fragen deaktivieren", permissions=["change"])
+    def deactivate(self, request, queryset):
+        n = bulk_edit.update_questions(queryset, active=False)
+        self.message_user(request, f"{n} Fragen deaktiviert.")
+
+    @admin.action(description="Gemini-Feedback umschalten", permissions=["change"])
+    def toggle_gemini_feedback(self, request, queryset):
+        n = bulk_edit.update_questions(queryset, gemini_feedback=Case(
+            When(gemini_feedback=True, then=Value(False)), default=Value(True)))
+        self.message_user(request, f"Gemini-Feedback bei {n} Fragen umgeschaltet.")
+
+    @admin.action(description="In anderes Konzept verschieben …", permissions=["change"])
+    def move_to_konzept(self, request, queryset):
+        form = self._action_form(request, KonzeptChoiceForm, user=request.user)
+        if not form.is_valid():
+            return self._render_action_form(request, queryset, form, "Fragen verschieben")
+        n = bulk_edit.update_questions(queryset, konzept=form.cleaned_data["konzept"])
+        self.message_user(request, f"{n} Fragen nach „{form.cleaned_data['konzept']}“ verschoben.")
+
+    @admin.action(description="Feedback-Vorgaben ersetzen …", permissions=["change"])
+    def replace_feedback_prompt(self, request, queryset):
+        form = self._action_form(request, FeedbackPromptForm)
+        if not form.is_valid():
+            return self._render_action_form(request, queryset, form, "Feedback-Vorgaben ersetzen")
+        n = bulk_edit.update_questions(queryset, feedback_prompt=form.cleaned_data["feedback_prompt"])
+        self.message_user(request, f"Feedback-Vorgaben bei {n} Fragen ersetzt.")
+
+    @admin.action(description="In anderen Kurs kopieren …", permissions=["add"])
+    def duplicate_to_konzept(self, request, queryset):
+        form = self._action_form(request, KonzeptChoiceForm, user=request.user)
+        if not form.is_valid():
+            return self._render_action_form(request, queryset, form, "Fragen kopieren")
+        n = bulk_edit.duplicate_questions(queryset, form.cleaned_data["konzept"])
+        self.message_user(request, f"{n} Fragen nach „{form.cleaned_data['konzept']}“ kopiert.")
+
+    @admin.action(description="Als CSV exportieren")
+    def export_csv(self, request, queryset):
+        response = HttpResponse(bulk_edit.export_csv(queryset), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="quizfragen.csv"'
+        return response
+
+    def get_search_results(self, request, queryset, search_term):
+        # Volltextindex (utils/search.py) statt icontains-Scan über alle Textspalten
+        ids = search.search_question_ids(search_term, limit=None) if search_term else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+
+    def _action_form(self, request, form_class, **kwargs):
+        # Erster Aufruf kommt von der Changelist (ohne "apply") → leeres Formular zeigen
+        data = request.POST if "apply" in request.POST else None
+        return form_class(data, **kwargs)
+
+    def _render_action_form(self, request, queryset, form, title):
+        return TemplateResponse(request, "admin/myx_stud/quizquestion/bulk_action.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": title,
+            "form": form,
+            "action": request.POST.get("action"),
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+            "count": queryset.count(),
+        })
+
+    # CSV-Round-Trip: exportieren, in Excel & Co. bearbeiten, hier wieder hochladen
+    def get_urls(self):
+        return [
+            path("csv-import/", self.admin_site.admin_view(self.csv_import_view),
+                 name="myx_stud_quizquestion_csv_import"),
+        ] + super().get_urls()
+
+    def csv_import_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        form = CsvImportForm(request.POST or None, request.FILES or None)
+        errors = []
+        if request.method == "POST" and form.is_valid():
+            try:
+                n, errors = bulk_edit.import_csv(form.cleaned_data["csv_file"].read(), request.user)
+            except UnicodeDecodeError:
+                n, errors = 0, ["Datei ist nicht UTF-8-kodiert."]
+            if not errors:
+                self.message_user(request, f"{n} Fragen aus der CSV übernommen.", messages.SUCCESS)
+                return redirect("admin:myx_stud_quizquestion_changelist")
+        return TemplateResponse(request, "admin/myx_stud/quizquestion/csv_import.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Quizfragen aus CSV übernehmen",
+            "form": form,
+            "errors": errors,
+        })
 
     list_filter   = ["active", ("konzept", admin.RelatedOnlyFieldListFilter)]
     raw_id_fields = ["konzept"]  # schneller FK-Picker (alternativ: autocomplete_fields)
@@ -134,7 +279,7 @@ class QuizQuestionAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request).select_related("konzept__kurs")
         if request.user.is_superuser:
             return qs
-        return qs.filter(konzept__kurs__in=allowed_courses_qs(request.user))
+        return qs.filter(konzept__kurs_id__in=allowed_kurs_ids(request.user))
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "konzept" and not request.user.is_superuser:
@@ -144,8 +289,7 @@ class QuizQuestionAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         # Absichern gegen manuelles POSTen fremder Konzepte/Kurse
         if not request.user.is_superuser:
-            kurs = obj.konzept.kurs
-            if not user_can_access_course(request.user, kurs):
+            if not user_can_access_course(request.user, obj.konzept.kurs_id):
                 raise PermissionDenied("Du darfst nur Quizfragen deiner freigegebenen Kurse bearbeiten.")
         super().save_model(request, obj, form, change)
 
@@ -154,19 +298,19 @@ class QuizQuestionAdmin(admin.ModelAdmin):
         base = super().has_view_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.konzept.kurs)
+        return user_can_access_course(request.user, obj.konzept.kurs_id)
 
     def has_change_permission(self, request, obj=None):
         base = super().has_change_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.konzept.kurs)
+        return user_can_access_course(request.user, obj.konzept.kurs_id)
 
     def has_delete_permission(self, request, obj=None):
         base = super().has_delete_permission(request, obj)
         if not base or obj is None or request.user.is_superuser:
             return base
-        return user_can_access_course(request.user, obj.konzept.kurs)
+        return user_can_access_course(request.user, obj.konzept.kurs_id)
 
     def has_add_permission(self, request):
         base = super().has_add_permission(request)
@@ -180,16 +324,48 @@ class QuizQuestionAdmin(admin.ModelAdmin):
         perms = super().get_model_perms(request)
         if request.user.is_superuser:
             return perms
-        return perms if allowed_courses_qs(request.user).exists() else {}
+        return perms if has_any_course(request.user) else {}
 
 
 # === QuestionLog ===
+class AttemptInline(admin.TabularInline):
+    model = Attempt
+    fields = ["n", "answer", "feedback_text", "is_correct", "score", "submitted_at"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("feedback")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Feedback")
+    def feedback_text(self, obj):
+        return obj.feedback.text if obj.feedback else ""
+
+
 @admin.register(QuestionLog)
 class QuestionLogAdmin(admin.ModelAdmin):
     list_display = ["id", "session_id", "quiz_id", "item_id", "attempt_count", "item_rating", "created_at"]
-    search_fields = ["session_id", "quiz_id", "item_id", "fach", "kurs", "konzept"]
-    list_filter = ["fach", "kurs", "konzept", "gemini_feedback"]
-    readonly_fields = ["created_at", "started_at"]
+    search_fields = ["session_id", "quiz_id", "item_id", "snapshot__fach", "snapshot__kurs", "snapshot__konzept"]
+    list_filter = ["snapshot__fach", "snapshot__kurs", "snapshot__konzept", "snapshot__gemini_feedback"]
+    readonly_fields = ["created_at", "started_at", "snapshot_info"]
+    exclude = ["snapshot"]
+    inlines = [AttemptInline]
+
+    def get_queryset(self, request):
+        # Anzahl per COUNT in derselben Abfrage statt pro Zeile
+        return (super().get_queryset(request)
+                .select_related("snapshot")
+                .annotate(_attempt_count=Count("attempts")))
+
+    @admin.display(description="Aufgabe (Stand)")
+    def snapshot_info(self, obj):
+        s = obj.snapshot
+        return f"{s.fach} – {s.kurs} · {s.konzept} (v{s.version}): {s.question}"
 
+    @admin.display(description="Versuche", ordering="_attempt_count")
     def attempt_count(self, obj):
-        return len(obj.attempts or [])
\ No newline at end of file
+        return obj._attempt_count
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MyxStudConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myx_stud'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registriert Cache-Invalidierung)
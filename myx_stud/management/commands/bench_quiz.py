@@ -0,0 +1,186 @@
+import json
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from myx_stud.models import Kurse, Konzepte, QuizQuestion
+from myx_stud.utils.counts import refresh_question_counts
+from myx_stud.utils.perf import _percentile
+
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Simuliert eine Klasse (N Schüler) im kompletten Quiz-Durchlauf gegen eine Test-DB "
+        "mit Gemini-Stub und misst Durchsatz, Latenz-Perzentile und DB-Schreibzugriffe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=30)
+        parser.add_argument("--items", type=int, default=10, help="Aufgaben im Konzept")
+        parser.add_argument("--gemini-share", type=float, default=0.5, help="Anteil LLM-bewerteter Aufgaben")
+        parser.add_argument("--correct-rate", type=float, default=0.7, help="Wahrscheinlichkeit richtiger Antwort")
+        parser.add_argument("--llm-latency-ms", type=int, default=0, help="simulierte Gemini-Latenz")
+        parser.add_argument("--batch-window-ms", type=int, default=0,
+                            help="GEMINI_BATCH_WINDOW_MS (die Schüler laufen nacheinander – Batching bringt hier nur Wartezeit)")
+        parser.add_argument("--session-engine", default=None, help="z. B. django.contrib.sessions.backends.cache")
+        parser.add_argument("--pragma", action="append", default=[], help="SQLite-PRAGMA, z. B. journal_mode=WAL")
+        parser.add_argument("--db-file", default=None, help="Test-DB als Datei statt In-Memory (für PRAGMA-Vergleiche)")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+
+    def handle(self, *args, **opts):
+        overrides = {
+            "GEMINI_STUB": True,
+            "GEMINI_STUB_LATENCY_MS": opts["llm_latency_ms"],
+            "GEMINI_BATCH_WINDOW_MS": opts["batch_window_ms"],
+        }
+        if opts["session_engine"]:
+            overrides["SESSION_ENGINE"] = opts["session_engine"]
+
+        if opts["db_file"]:
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = opts["db_file"]
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(**overrides):
+                self._apply_pragmas(opts["pragma"])
+                kurs = self._create_catalog(opts["items"], opts["gemini_share"])
+                result = self._run(kurs, opts)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        result["settings"] = {k: opts[k] for k in ("students", "items", "gemini_share", "llm_latency_ms",
+                                                   "batch_window_ms", "session_engine", "pragma", "db_file")}
+        if opts["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self._print_report(result)
+
+    # ---------- Setup ----------
+
+    def _apply_pragmas(self, pragmas):
+        if not pragmas:
+            return
+        if connection.vendor != "sqlite":
+            self.stderr.write(self.style.WARNING("--pragma wird nur bei SQLite angewendet."))
+            return
+        with connection.cursor() as cur:
+            for p in pragmas:
+                cur.execute(f"PRAGMA {p}")
+
+    def _create_catalog(self, n_items, gemini_share):
+        kurs = Kurse.objects.create(fach="Bench", kurs="Klassenzimmer", intro="Benchmark")
+        konzept = Konzepte.objects.create(kurs=kurs, name="Konzept A")
+        n_gemini = int(round(n_items * gemini_share))
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                konzept=konzept,
+                title=f"Aufgabe {i}",
+                text=f"Lies den Satz Nummer {i} genau.",
+                question=f"Wie lautet das Subjekt in Satz {i}?",
+                correct_answer=f"der junge {i}",
+                gemini_feedback=(i < n_gemini),
+                feedback_prompt="Kurz und ermutigend.",
+            )
+            for i in range(n_items)
+        ])
+        refresh_question_counts([konzept.pk])
+        return kurs
+
+    # ---------- Durchlauf ----------
+
+    def _run(self, kurs, opts):
+        rng = random.Random(opts["seed"])
+        latencies = defaultdict(list)
+        writes = defaultdict(int)
+        state = {"label": None}
+
+        def count_writes(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(WRITE_PREFIXES):
+                writes[state["label"]] += 1
+            return execute(sql, params, many, context)
+
+        def call(client, label, method, url, data=None):
+            state["label"] = label
+            start = time.perf_counter()
+            resp = getattr(client, method)(url, data or {})
+            latencies[label].append(time.perf_counter() - start)
+            return resp
+
+        konzept = kurs.konzepte.first()
+        students = [Client() for _ in range(opts["students"])]
+        finished = set()
+
+        wall_start = time.perf_counter()
+        with connection.execute_wrapper(count_writes):
+            # Einstieg: alle Schüler wählen Kurs und Konzept
+            for c in students:
+                call(c, "kurswahl", "get", "/kurswahl/")
+                call(c, "get_kurse_for_fach", "get", "/quiz/ajax/get-kurse/", {"fach": kurs.fach})
+                call(c, "kurswahl_post", "post", "/kurswahl/", {"fach": kurs.fach, "kurs": kurs.kurs})
+                call(c, "kurs", "get", "/kurs/")
+                call(c, "konzept", "get", f"/konzept/{konzept.id}/")
+
+            # Quiz: Runde für Runde, damit sich die Sessions wie im Klassenzimmer mischen
+            while len(finished) < len(students):
+                for i, c in enumerate(students):
+                    if i in finished:
+                        continue
+                    resp = call(c, "quiz_view", "get", "/quiz/view/")
+                    if resp.status_code == 302:
+                        call(c, "quiz_complete", "get", "/quiz/complete/")
+                        finished.add(i)
+                        continue
+
+                    q = resp.context["question"]
+                    answer = q.correct_answer if rng.random() < opts["correct_rate"] else "weiß nicht"
+                    call(c, "quiz_submit", "post", "/quiz/view/", {"answer": answer})
+                    call(c, "quiz_rating_prompt", "post", "/quiz/view/", {"next": "1"})
+                    call(c, "quiz_next", "post", "/quiz/view/", {"next": "1", "rating": str(rng.randint(1, 5))})
+        wall = time.perf_counter() - wall_start
+
+        total_requests = sum(len(v) for v in latencies.values())
+        endpoints = {}
+        for label, values in latencies.items():
+            values = sorted(values)
+            endpoints[label] = {
+                "count": len(values),
+                "mean_ms": 1000 * sum(values) / len(values),
+                "p50_ms": 1000 * _percentile(values, 50),
+                "p95_ms": 1000 * _percentile(values, 95),
+                "p99_ms": 1000 * _percentile(values, 99),
+                "db_writes": writes.get(label, 0),
+            }
+
+        return {
+            "requests": total_requests,
+            "wall_s": wall,
+            "throughput_rps": total_requests / wall if wall else 0.0,
+            "db_writes": sum(writes.values()),
+            "db_writes_per_item": sum(writes.values()) / max(1, opts["students"] * opts["items"]),
+            "endpoints": endpoints,
+        }
+
+    def _print_report(self, r):
+        self.stdout.write(self.style.SUCCESS(
+            f"{r['requests']} Requests in {r['wall_s']:.2f}s → {r['throughput_rps']:.1f} req/s, "
+            f"{r['db_writes']} DB-Writes ({r['db_writes_per_item']:.1f} pro Schüler-Aufgabe)"
+        ))
+        self.stdout.write(f"{'Endpoint':<22}{'n':>6}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'writes':>8}")
+        for label, e in r["endpoints"].items():
+            self.stdout.write(
+                f"{label:<22}{e['count']:>6}{e['mean_ms']:>9.2f}{e['p50_ms']:>9.2f}"
+                f"{e['p95_ms']:>9.2f}{e['p99_ms']:>9.2f}{e['db_writes']:>8}"
+            )
@@ -0,0 +1,92 @@
+import time
+import uuid
+from array import array
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myx_stud.models import Attempt, QuizQuestion
+
+
+class Command(BaseCommand):
+    help = (
+        "Kalibriert die Aufgaben nach dem Rasch-Modell: Erstversuche aus dem QuestionLog "
+        "(Lernender = session_id, richtig = is_correct) werden als dünne Antwortmatrix in NumPy "
+        "gelesen, Fähigkeiten und Schwierigkeiten vektorisiert geschätzt und die Schwierigkeiten "
+        "per bulk_update in QuizQuestion.difficulty geschrieben."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-responses", type=int, default=20,
+                            help="nur Aufgaben mit mindestens so vielen Erstversuchen speichern")
+        parser.add_argument("--max-iter", type=int, default=100)
+        parser.add_argument("--tol", type=float, default=1e-4, help="Abbruch bei max. Änderung < tol (Logits)")
+        parser.add_argument("--chunk-size", type=int, default=20000)
+        parser.add_argument("--dry-run", action="store_true", help="nur schätzen, nichts speichern")
+
+    def handle(self, *args, **opts):
+        import numpy as np   # erst hier laden (Importzeit der übrigen Commands)
+
+        from myx_stud.utils import irt
+
+        start = time.perf_counter()
+        sessions, items, rows, cols, correct = self._stream(opts["chunk_size"])
+        if not items:
+            self.stdout.write("Keine Versuche – nichts zu kalibrieren.")
+            return
+        load_s = time.perf_counter() - start
+
+        rows, cols, n, k = irt.aggregate(np.frombuffer(rows, dtype=np.int32),
+                                         np.frombuffer(cols, dtype=np.int32),
+                                         np.frombuffer(correct, dtype=np.int8))
+        theta, b, iterations, converged = irt.fit_rasch(
+            rows, cols, n, k, len(sessions), len(items), opts["max_iter"], opts["tol"],
+        )
+        fit_s = time.perf_counter() - start - load_s
+
+        counts = np.bincount(cols, n, len(items)).astype(int)
+        item_ids = list(items)
+        calibrated = {item_ids[j]: (float(b[j]), int(counts[j]))
+                      for j in np.flatnonzero(counts >= opts["min_responses"])}
+        saved = 0 if opts["dry_run"] else self._save(calibrated)
+
+        self.stdout.write(f"attempts: {len(correct)}  learners: {len(sessions)}  items: {len(items)}  "
+                          f"cells: {len(n)}")
+        self.stdout.write(f"iterations: {iterations}" + ("" if converged else " (nicht konvergiert)"))
+        self.stdout.write(f"ability: mean {theta.mean():.2f}  sd {theta.std():.2f}")
+        if calibrated:
+            values = np.array([d for d, _ in calibrated.values()])
+            self.stdout.write(f"difficulty: min {values.min():.2f}  max {values.max():.2f}  "
+                              f"({len(calibrated)} Aufgaben mit ≥ {opts['min_responses']} Versuchen)")
+        self.stdout.write(f"load: {load_s:.2f} s  fit: {fit_s:.2f} s  saved: {saved}")
+        self.stdout.write(self.style.SUCCESS("Fertig." if not opts["dry_run"] else "Fertig (dry run)."))
+
+    def _stream(self, chunk_size):
+        """
+        Erstversuche zeilenweise lesen → (session-Index, item-Index, Zeilen, Spalten, richtig).
+        Nur die Indexpuffer wachsen mit (je 9 Byte pro Versuch), nicht die Tupel.
+        """
+        sessions, items = {}, {}
+        rows, cols, correct = array("i"), array("i"), array("b")
+        qs = (Attempt.objects.filter(n=1).order_by()
+              .values_list("log__session_id", "log__item_id", "is_correct"))
+        for session_id, item_id, is_correct in qs.iterator(chunk_size=chunk_size):
+            rows.append(sessions.setdefault(session_id, len(sessions)))
+            cols.append(items.setdefault(item_id, len(items)))
+            correct.append(is_correct)
+        return sessions, items, rows, cols, correct
+
+    def _save(self, calibrated):
+        """Schwierigkeiten in Batches zurückschreiben; item_id im Log ist der String der UUID."""
+        valid = []
+        for item_id in calibrated:
+            try:
+                valid.append(uuid.UUID(item_id))
+            except ValueError:
+                continue   # Log-Einträge zu Aufgaben ohne UUID (Altbestand)
+        questions = list(QuizQuestion.objects.filter(item_id__in=valid).only("item_id"))
+        for q in questions:
+            q.difficulty, q.difficulty_n = calibrated[str(q.item_id)]
+        with transaction.atomic():
+            QuizQuestion.objects.bulk_update(questions, ["difficulty", "difficulty_n"], batch_size=500)
+        return len(questions)
@@ -0,0 +1,200 @@
+import re
+from datetime import datetime, timedelta
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from myx_stud.models import QuestionLog, QuizQuestion, QuizRun
+from myx_stud.utils.attempts import save_questionlogs
+from myx_stud.views.quizview import SESSION_QUIZ_ID, _build_questionlog, _log_meta
+
+
+BUCKET_RE = re.compile(r"^qlog_([0-9a-f]+)_([0-9a-f-]+)$")
+STARTED_RE = re.compile(r"^qlog_([0-9a-f]+)_([0-9a-f-]+)_created_at$")
+
+
+def _parse_started(iso):
+    try:
+        dt = datetime.fromisoformat(iso)
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+class Command(BaseCommand):
+    help = (
+        "Räumt die Session-Tabelle auf: Versuchs-Buckets (qlog_*) abgebrochener Läufe werden als "
+        "QuestionLog gespeichert (oder mit --discard verworfen), abgelaufene Sessions in Batches "
+        "gelöscht, alte QuizRuns entfernt und unter SQLite der freie Platz per incremental_vacuum "
+        "zurückgegeben. Für den periodischen Aufruf (cron/systemd-timer) gedacht."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--run-days", type=int, default=30,
+                            help="QuizRuns löschen, die so lange nicht mehr geändert wurden")
+        parser.add_argument("--discard", action="store_true",
+                            help="verwaiste Buckets verwerfen statt ins QuestionLog zu schreiben")
+        parser.add_argument("--full-vacuum", action="store_true",
+                            help="SQLite einmalig auf auto_vacuum=INCREMENTAL umstellen (VACUUM, sperrt die DB)")
+        parser.add_argument("--dry-run", action="store_true", help="nur zählen, nichts ändern")
+
+    def handle(self, *args, **opts):
+        self.opts = opts
+        self.stats = {"sessions_deleted": 0, "sessions_cleaned": 0, "buckets_flushed": 0,
+                      "buckets_discarded": 0, "keys_removed": 0, "runs_deleted": 0}
+        now = timezone.now()
+
+        before = self._db_pages()
+        self._sweep(Session.objects.filter(expire_date__lt=now), expired=True)
+        self._sweep(Session.objects.filter(expire_date__gte=now), expired=False)
+        self._delete_runs(now - timedelta(days=opts["run_days"]))
+        reclaimed = self._vacuum(before)
+
+        for name, value in self.stats.items():
+            self.stdout.write(f"{name}: {value}")
+        if reclaimed is not None:
+            self.stdout.write(f"bytes_reclaimed: {reclaimed} ({reclaimed / 1e6:.2f} MB)")
+        self.stdout.write(self.style.SUCCESS("Fertig." if not opts["dry_run"] else "Fertig (dry run)."))
+
+    # ---------- Sessions ----------
+
+    def _sweep(self, qs, expired):
+        """Sessions in pk-Batches durchgehen; abgelaufene löschen, lebende nur entrümpeln."""
+        last_key = ""
+        batch_size = self.opts["batch_size"]
+        while True:
+            batch = list(qs.filter(session_key__gt=last_key)
+                         .order_by("session_key")
+                         .values_list("session_key", "session_data")[:batch_size])
+            if not batch:
+                break
+            last_key = batch[-1][0]
+            entries, updates = [], []
+            for session_key, session_data in batch:
+                data = Session(session_data=session_data).get_decoded()
+                cleaned = self._collect(session_key, data, entries, expired)
+                if cleaned is not None:
+                    updates.append((session_key, session_data, cleaned))
+
+            if self.opts["dry_run"]:
+                if expired:
+                    self.stats["sessions_deleted"] += len(batch)
+                continue
+            if entries:
+                save_questionlogs(entries)
+            if expired:
+                deleted, _ = Session.objects.filter(session_key__in=[k for k, _ in batch]).delete()
+                self.stats["sessions_deleted"] += deleted
+            for session_key, old_data, cleaned in updates:
+                # nur schreiben, wenn die Session inzwischen nicht von einem Request geändert wurde
+                self.stats["sessions_cleaned"] += Session.objects.filter(
+                    session_key=session_key, session_data=old_data,
+                ).update(session_data=Session.objects.encode(cleaned))
+
+    def _collect(self, session_key, data, entries, expired):
+        """
+        Verwaiste Buckets der Session einsammeln (→ entries) und die bereinigten Daten zurückgeben
+        (None = nichts zu ändern). Bei lebenden Sessions gilt nur der aktuelle, offene Lauf als aktiv.
+        """
+        keys = [k for k in data if k.startswith("qlog_")]
+        if not keys:
+            return None
+
+        active = set()
+        if not expired and data.get(SESSION_QUIZ_ID):
+            run = QuizRun.objects.filter(quiz_id=data[SESSION_QUIZ_ID], finished_at__isnull=True).first()
+            if run is not None:
+                active.add(run.quiz_id)
+
+        buckets, started, drop = {}, {}, []
+        for k in keys:
+            m = BUCKET_RE.match(k) or STARTED_RE.match(k)
+            if m is None or m.group(1) in active:
+                continue
+            drop.append(k)
+            if k.endswith("_created_at"):
+                started[(m.group(1), m.group(2))] = data[k]
+            elif data[k]:
+                buckets[(m.group(1), m.group(2))] = data[k]
+
+        if not drop:
+            return None
+        self.stats["keys_removed"] += len(drop)
+        self._flush(session_key, buckets, started, entries)
+        return {k: v for k, v in data.items() if k not in drop}
+
+    def _flush(self, session_key, buckets, started, entries):
+        if not buckets:
+            return
+        if self.opts["discard"]:
+            self.stats["buckets_discarded"] += len(buckets)
+            return
+
+        item_ids = {item_id for _, item_id in buckets}
+        questions = {str(q.item_id): q for q in (QuizQuestion.objects
+                                                 .select_related("konzept__kurs")
+                                                 .filter(item_id__in=item_ids))}
+        already = set(QuestionLog.objects
+                      .filter(session_id=session_key, quiz_id__in={q for q, _ in buckets})
+                      .values_list("quiz_id", "item_id"))
+        for (quiz_id, item_id), bucket in buckets.items():
+            question = questions.get(item_id)
+            if question is None or (quiz_id, item_id) in already:
+                self.stats["buckets_discarded"] += 1
+                continue
+            entries.append(_build_questionlog(_log_meta(question, session_key), quiz_id, item_id,
+                                              _parse_started(started.get((quiz_id, item_id))), bucket))
+            self.stats["buckets_flushed"] += 1
+
+    # ---------- Läufe ----------
+
+    def _delete_runs(self, cutoff):
+        """Abgeschlossene oder liegengebliebene Läufe; RunRequests hängen per CASCADE dran."""
+        qs = QuizRun.objects.filter(updated_at__lt=cutoff)
+        if self.opts["dry_run"]:
+            self.stats["runs_deleted"] = qs.count()
+            return
+        batch_size = self.opts["batch_size"]
+        while True:
+            ids = list(qs.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            QuizRun.objects.filter(pk__in=ids).delete()
+            self.stats["runs_deleted"] += len(ids)
+
+    # ---------- SQLite ----------
+
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def _db_pages(self):
+        if connection.vendor != "sqlite":
+            return None
+        return self._pragma("page_count"), self._pragma("freelist_count")
+
+    def _vacuum(self, before):
+        """Freie Seiten an das Dateisystem zurückgeben → Bytes (None, wenn nicht SQLite)."""
+        if before is None or self.opts["dry_run"]:
+            return None
+        page_size = self._pragma("page_size")
+        if self._pragma("auto_vacuum") == 2:   # INCREMENTAL
+            # über cursor.execute gibt der Pragma nur eine Seite pro Schritt frei → executescript
+            connection.ensure_connection()
+            connection.connection.executescript("PRAGMA incremental_vacuum")
+        elif self.opts["full_vacuum"]:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+        else:
+            self.stdout.write(self.style.WARNING(
+                "SQLite läuft ohne auto_vacuum=INCREMENTAL – freie Seiten bleiben in der Datei. "
+                "Einmalig mit --full-vacuum umstellen."
+            ))
+            return 0
+        pages_after = self._pragma("page_count")
+        return max(0, before[0] - pages_after) * page_size
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from myx_stud.models import QuizQuestion
-import pandas as pd
+from myx_stud.utils import search
+from myx_stud.utils.counts import refresh_question_counts
+from myx_stud.utils.functions import prompt_fields
 import os
 from datetime import date
 import re
@@ -11,6 +13,8 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         file_path = os.path.join('myx_stud', 'management', 'files', 'Quizitems.xlsx')
 
+        import pandas as pd   # erst hier laden: pandas kostet jeden manage.py-Aufruf spürbar Zeit
+
         try:
             df = pd.read_excel(file_path)
 
@@ -43,9 +47,13 @@ class Command(BaseCommand):
                     feedback_prompt="Default feedback",
                     active=True
                 )
+                for field, value in prompt_fields(quiz).items():   # bulk_create löst kein pre_save aus
+                    setattr(quiz, field, value)
                 quiz_questions.append(quiz)
 
             QuizQuestion.objects.bulk_create(quiz_questions)
+            refresh_question_counts()   # bulk_create löst keine Signals aus
+            search.index_questions(quiz_questions)
             self.stdout.write(self.style.SUCCESS(f'Successfully uploaded {len(quiz_questions)} quiz questions.'))
 
         except FileNotFoundError:
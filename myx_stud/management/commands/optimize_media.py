@@ -0,0 +1,140 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from myx_stud.utils.caching import bump_version
+from myx_stud.utils.images import delete_variants, shared_name
+
+
+def _init_worker():
+    # Bei spawn (Windows/macOS) startet der Kindprozess ohne Django-Setup
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_job(name):
+    from myx_stud.utils.images import file_digest
+    return name, file_digest(name), default_storage.size(name)
+
+
+def _variants_job(name):
+    from myx_stud.utils.images import generate_variants
+    created = generate_variants(name)
+    return name, sum(default_storage.size(v) for v in created), len(created)
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill für vorhandene Uploads: dedupliziert identische Bilddateien (SHA-256) auf "
+        "gemeinsame, inhaltsadressierte Pfade, aktualisiert alle ImageField-Referenzen in "
+        "einer Transaktion und erzeugt WebP/AVIF-Varianten parallel im Prozess-Pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--dry-run", action="store_true", help="nur berichten, nichts ändern")
+        parser.add_argument("--skip-variants", action="store_true")
+
+    def handle(self, *args, **opts):
+        refs = self._collect_references()
+        names = sorted({name for entries in refs.values() for name in entries})
+        names = [n for n in names if default_storage.exists(n)]
+        if not names:
+            self.stdout.write("Keine Bilddateien gefunden.")
+            return
+        self.stdout.write(f"{len(names)} referenzierte Bilddateien in {len(refs)} Feldern.")
+
+        with ProcessPoolExecutor(max_workers=opts["workers"], initializer=_init_worker) as pool:
+            hashed = list(pool.map(_hash_job, names))
+
+            renames, freed = self._plan_dedupe(hashed)
+            self.stdout.write(
+                f"Dedupe: {len(renames)} Dateien → {len(set(renames.values()))} gemeinsame Pfade, "
+                f"{freed / 1e6:.2f} MB doppelt gespeichert."
+            )
+
+            if opts["dry_run"]:
+                return
+
+            if renames:
+                self._apply_renames(refs, renames)
+            final_names = sorted({renames.get(n, n) for n in names})
+
+            if opts["skip_variants"]:
+                return
+            original_bytes = sum(default_storage.size(n) for n in final_names)
+            variant_bytes = variant_count = 0
+            for name, size, count in pool.map(_variants_job, final_names):
+                variant_bytes += size
+                variant_count += count
+        # gecachte Fragmente kennen die neuen Varianten noch nicht (responsive_img)
+        bump_version("content")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fertig: {freed / 1e6:.2f} MB durch Dedupe frei, {variant_count} Varianten erzeugt "
+            f"({variant_bytes / 1e6:.2f} MB für alle Stufen/Formate vs. {original_bytes / 1e6:.2f} MB Originale)."
+        ))
+
+    # ---------- Schritte ----------
+
+    def _collect_references(self):
+        """{(Model, Feldname): {dateiname: [pk, ...]}} für alle ImageFields der App."""
+        refs = {}
+        for model in apps.get_app_config("myx_stud").get_models():
+            for field in model._meta.get_fields():
+                if not isinstance(field, models.ImageField):
+                    continue
+                entries = defaultdict(list)
+                qs = model.objects.exclude(**{field.name: ""}).exclude(**{f"{field.name}__isnull": True})
+                for pk, name in qs.values_list("pk", field.name).iterator():
+                    entries[name].append(pk)
+                refs[(model, field.name)] = entries
+        return refs
+
+    def _plan_dedupe(self, hashed):
+        """Alter Name → gemeinsamer Name; dazu die Bytes, die als Duplikat gespeichert sind."""
+        groups = defaultdict(list)
+        for name, digest, size in hashed:
+            groups[digest].append((name, size))
+
+        renames, freed = {}, 0
+        for digest, files in groups.items():
+            files.sort()
+            target = shared_name(files[0][0], digest)
+            for name, size in files:
+                if name != target:
+                    renames[name] = target
+            freed += sum(size for _, size in files[1:])
+        return renames, freed
+
+    def _apply_renames(self, refs, renames):
+        # 1) Zieldateien anlegen (einmal pro Inhalt)
+        for old, new in renames.items():
+            if not default_storage.exists(new):
+                with default_storage.open(old, "rb") as fh:
+                    saved = default_storage.save(new, fh)
+                if saved != new:
+                    raise RuntimeError(f"Speicherpfad {new} wurde zu {saved} umbenannt.")
+
+        # 2) Alle Referenzen in einer Transaktion umhängen
+        with transaction.atomic():
+            for (model, field), entries in refs.items():
+                for old, pks in entries.items():
+                    if old in renames:
+                        model.objects.filter(pk__in=pks).update(**{field: renames[old]})
+
+            # 3) Alte Dateien erst löschen, wenn die DB-Änderung committed ist;
+            #    update() löst keine Signals aus → Seiten-Caches selbst invalidieren
+            transaction.on_commit(lambda: self._cleanup(renames))
+
+    def _cleanup(self, renames):
+        for old in renames:
+            delete_variants(old)
+            default_storage.delete(old)
+        bump_version("content")
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import connection
+
+from .utils import perf
+from .utils.mastery import LEARNER_COOKIE, LEARNER_COOKIE_AGE
+
+
+class PerformanceTimingMiddleware:
+    """
+    Misst Wall-Time, DB-Queries, Session-Load/Save und LLM-Zeit pro Request.
+    Ergebnis geht als Server-Timing-Header raus und ins rollende Histogramm
+    (siehe /perf/). Muss VOR SessionMiddleware stehen, damit das Speichern
+    der Session mitgemessen wird.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "PERF_TIMING_ENABLED", True):
+            return self.get_response(request)
+
+        timings, token = perf.begin_request()
+        try:
+            with connection.execute_wrapper(perf.db_execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            perf.end_request(token)
+
+        total = timings.elapsed()
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.view_name if match else "unresolved"
+        perf.histogram.record(endpoint, total, timings)
+
+        response["Server-Timing"] = perf.server_timing_header(total, timings)
+        return response
+
+
+class LearnerMiddleware:
+    """
+    Lern-Cookie für den dauerhaften Lernstand (utils/mastery.py): liest das signierte Cookie
+    und setzt es nur, wenn utils.mastery.learner_key() im Request einen neuen Schlüssel vergeben hat.
+    Muss NACH AuthenticationMiddleware stehen.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.learner_cookie = request.get_signed_cookie(LEARNER_COOKIE, default=None, salt=LEARNER_COOKIE)
+        response = self.get_response(request)
+
+        new_cookie = getattr(request, "new_learner_cookie", None)
+        if new_cookie:
+            response.set_signed_cookie(
+                LEARNER_COOKIE, new_cookie, salt=LEARNER_COOKIE, max_age=LEARNER_COOKIE_AGE,
+                httponly=True, samesite="Lax", secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    """Stand von utils/counts.refresh_question_counts zum Zeitpunkt der Migration (alle Zeilen)."""
+    Kurse = apps.get_model('myx_stud', 'Kurse')
+    Konzepte = apps.get_model('myx_stud', 'Konzepte')
+    QuizQuestion = apps.get_model('myx_stud', 'QuizQuestion')
+
+    active = (QuizQuestion.objects
+              .filter(konzept=OuterRef('pk'), active=True)
+              .order_by()
+              .values('konzept')
+              .annotate(c=Count('pk'))
+              .values('c'))
+    Konzepte.objects.update(active_question_count=Coalesce(Subquery(active), 0))
+
+    per_kurs = (Konzepte.objects
+                .filter(kurs=OuterRef('pk'))
+                .order_by()
+                .values('kurs')
+                .annotate(s=Sum('active_question_count'))
+                .values('s'))
+    Kurse.objects.update(active_question_count=Coalesce(Subquery(per_kurs), 0))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0003_kurse_editors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='konzepte',
+            name='active_question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='kurse',
+            name='active_question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='correct_answer',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='feedback_prompt',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='question',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
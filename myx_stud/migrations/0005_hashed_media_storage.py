@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:59
+
+import myx_stud.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0004_question_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='konzepte',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=myx_stud.storage.media_storage, upload_to='concept_images/'),
+        ),
+        migrations.AlterField(
+            model_name='kurse',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=myx_stud.storage.media_storage, upload_to='kurs_images/'),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=myx_stud.storage.media_storage, upload_to='quiz_images/'),
+        ),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:20
+
+import hashlib
+from datetime import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+BATCH_SIZE = 500
+
+
+# Eingefrorener Stand von utils/attempts.py – Migrationen dürfen nicht von Live-Code abhängen
+
+def _intern_feedback(FeedbackText, texts):
+    """{text: FeedbackText.pk} für alle nicht-leeren Texte; fehlende werden angelegt."""
+    by_digest = {hashlib.sha256(t.encode('utf-8')).hexdigest(): t for t in set(texts) if t}
+    if not by_digest:
+        return {}
+    ids = dict(FeedbackText.objects.filter(digest__in=list(by_digest)).values_list('digest', 'pk'))
+    missing = [d for d in by_digest if d not in ids]
+    if missing:
+        FeedbackText.objects.bulk_create([FeedbackText(digest=d, text=by_digest[d]) for d in missing])
+        ids.update(FeedbackText.objects.filter(digest__in=missing).values_list('digest', 'pk'))
+    return {by_digest[d]: pk for d, pk in ids.items()}
+
+
+def _parse_submitted_at(value):
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = parse_datetime(str(value or ''))
+        if dt is None:
+            return None
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def _build_attempts(Attempt, log_id, attempts, feedback_ids):
+    return [
+        Attempt(
+            log_id=log_id,
+            n=idx,
+            answer=a.get('answer') or '',
+            feedback_id=feedback_ids.get(a.get('feedback') or ''),
+            is_correct=bool(a.get('is_correct', False)),
+            score=float(a.get('score', 0.0) or 0.0),
+            submitted_at=_parse_submitted_at(a.get('submitted_at')),
+        )
+        for idx, a in enumerate(attempts, start=1)
+    ]
+
+
+def split_attempts(apps, schema_editor):
+    """QuestionLog.attempts (JSON) → Attempt-Zeilen, batchweise nach pk."""
+    QuestionLog = apps.get_model('myx_stud', 'QuestionLog')
+    Attempt = apps.get_model('myx_stud', 'Attempt')
+    FeedbackText = apps.get_model('myx_stud', 'FeedbackText')
+
+    last_pk = 0
+    while True:
+        batch = list(QuestionLog.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .values_list('pk', 'attempts_json')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        batch = [(pk, attempts) for pk, attempts in batch if attempts]
+        feedback_ids = _intern_feedback(
+            FeedbackText, (a.get('feedback') or '' for _, attempts in batch for a in attempts),
+        )
+        Attempt.objects.bulk_create([
+            row
+            for pk, attempts in batch
+            for row in _build_attempts(Attempt, pk, attempts, feedback_ids)
+        ])
+
+
+def join_attempts(apps, schema_editor):
+    """Rückweg: Attempt-Zeilen wieder als JSON-Liste ins Log."""
+    QuestionLog = apps.get_model('myx_stud', 'QuestionLog')
+    Attempt = apps.get_model('myx_stud', 'Attempt')
+
+    last_pk = 0
+    while True:
+        logs = list(QuestionLog.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not logs:
+            break
+        last_pk = logs[-1].pk
+        by_id = {log.pk: log for log in logs}
+        by_log = {}
+        for a in (Attempt.objects.filter(log__in=logs).select_related('feedback').order_by('log_id', 'n')):
+            log = by_id[a.log_id]
+            by_log.setdefault(a.log_id, []).append({
+                'n': a.n,
+                'answer': a.answer,
+                'feedback': a.feedback.text if a.feedback else '',
+                'correct_answer': '' if log.gemini_feedback else log.correct_answer,
+                'is_correct': a.is_correct,
+                'score': a.score,
+                'submitted_at': a.submitted_at.isoformat() if a.submitted_at else None,
+            })
+        for log in logs:
+            log.attempts_json = by_log.get(log.pk, [])
+        QuestionLog.objects.bulk_update(logs, ['attempts_json'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0005_hashed_media_storage'),
+    ]
+
+    operations = [
+        # Name frei machen für den Reverse-Accessor QuestionLog.attempts
+        migrations.RenameField(
+            model_name='questionlog',
+            old_name='attempts',
+            new_name='attempts_json',
+        ),
+        migrations.CreateModel(
+            name='FeedbackText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('n', models.PositiveSmallIntegerField()),
+                ('answer', models.TextField(blank=True)),
+                ('is_correct', models.BooleanField(default=False)),
+                ('score', models.FloatField(default=0.0)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('feedback', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='myx_stud.feedbacktext')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='myx_stud.questionlog')),
+            ],
+            options={
+                'ordering': ['log', 'n'],
+                'indexes': [models.Index(fields=['score'], name='myx_stud_at_score_bbe305_idx'), models.Index(fields=['is_correct'], name='myx_stud_at_is_corr_7d437c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('log', 'n'), name='uniq_attempt_log_n')],
+            },
+        ),
+        migrations.RunPython(split_attempts, join_attempts),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='attempts_json',
+        ),
+    ]
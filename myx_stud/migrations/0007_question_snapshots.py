@@ -0,0 +1,154 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:45
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+BATCH_SIZE = 500
+
+# Eingefrorener Stand von utils/snapshots.py – Migrationen dürfen nicht von Live-Code abhängen
+SNAPSHOT_FIELDS = ('fach', 'kurs', 'konzept', 'text', 'question', 'correct_answer', 'feedback_prompt',
+                   'gemini_feedback')
+
+
+def _values(log):
+    values = {f: (getattr(log, f) or '') for f in SNAPSHOT_FIELDS}
+    values['gemini_feedback'] = bool(log.gemini_feedback)
+    return values
+
+
+def _digest(item_id, values):
+    payload = json.dumps([str(item_id)] + [values[f] for f in SNAPSHOT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _snapshot_ids(QuestionSnapshot, entries):
+    """entries = [(item_id, values), ...] → Snapshot-pks in derselben Reihenfolge."""
+    digests = [_digest(item_id, values) for item_id, values in entries]
+    ids = dict(QuestionSnapshot.objects.filter(digest__in=set(digests)).values_list('digest', 'pk'))
+
+    missing = {}
+    for digest, (item_id, values) in zip(digests, entries):
+        if digest not in ids:
+            missing.setdefault(digest, (str(item_id), values))
+    if missing:
+        versions = dict(QuestionSnapshot.objects
+                        .filter(item_id__in={item_id for item_id, _ in missing.values()})
+                        .order_by().values('item_id').annotate(v=Max('version')).values_list('item_id', 'v'))
+        new = []
+        for digest, (item_id, values) in missing.items():
+            versions[item_id] = versions.get(item_id, 0) + 1
+            new.append(QuestionSnapshot(digest=digest, item_id=item_id, version=versions[item_id], **values))
+        QuestionSnapshot.objects.bulk_create(new)
+        ids.update(QuestionSnapshot.objects.filter(digest__in=list(missing)).values_list('digest', 'pk'))
+    return [ids[d] for d in digests]
+
+
+def backfill_snapshots(apps, schema_editor):
+    """Kopierte Aufgabenfelder der Logs → QuestionSnapshot, batchweise nach pk."""
+    QuestionLog = apps.get_model('myx_stud', 'QuestionLog')
+    QuestionSnapshot = apps.get_model('myx_stud', 'QuestionSnapshot')
+
+    last_pk = 0
+    while True:
+        logs = list(QuestionLog.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .only('pk', 'item_id', *SNAPSHOT_FIELDS)[:BATCH_SIZE])
+        if not logs:
+            break
+        last_pk = logs[-1].pk
+        ids = _snapshot_ids(QuestionSnapshot, [(log.item_id, _values(log)) for log in logs])
+        for log, snapshot_id in zip(logs, ids):
+            log.snapshot_id = snapshot_id
+        QuestionLog.objects.bulk_update(logs, ['snapshot'])
+
+
+def restore_fields(apps, schema_editor):
+    """Rückweg: Felder aus dem Snapshot wieder in jede Log-Zeile kopieren."""
+    QuestionLog = apps.get_model('myx_stud', 'QuestionLog')
+
+    last_pk = 0
+    while True:
+        logs = list(QuestionLog.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .select_related('snapshot')[:BATCH_SIZE])
+        if not logs:
+            break
+        last_pk = logs[-1].pk
+        for log in logs:
+            for f in SNAPSHOT_FIELDS:
+                setattr(log, f, getattr(log.snapshot, f))
+        QuestionLog.objects.bulk_update(logs, list(SNAPSHOT_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0006_attempt_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('item_id', models.CharField(db_index=True, max_length=200)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('fach', models.CharField(blank=True, max_length=200, verbose_name='Fach')),
+                ('kurs', models.CharField(blank=True, max_length=200, verbose_name='Kurs')),
+                ('konzept', models.CharField(blank=True, max_length=200, verbose_name='Konzept')),
+                ('text', models.TextField(blank=True)),
+                ('question', models.TextField(blank=True)),
+                ('correct_answer', models.TextField(blank=True)),
+                ('gemini_feedback', models.BooleanField(default=False)),
+                ('feedback_prompt', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='questionlog',
+            name='snapshot',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='myx_stud.questionsnapshot'),
+        ),
+        migrations.RunPython(backfill_snapshots, restore_fields),
+        migrations.AlterField(
+            model_name='questionlog',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='myx_stud.questionsnapshot'),
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='correct_answer',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='fach',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='feedback_prompt',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='gemini_feedback',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='konzept',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='kurs',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='question',
+        ),
+        migrations.RemoveField(
+            model_name='questionlog',
+            name='text',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0007_question_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quiz_id', models.CharField(max_length=200, unique=True)),
+                ('session_id', models.CharField(db_index=True, max_length=200)),
+                ('kurs_id', models.UUIDField(blank=True, null=True)),
+                ('konzept_id', models.UUIDField(blank=True, null=True)),
+                ('index', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('items_scored', models.PositiveIntegerField(default=0)),
+                ('solved', models.JSONField(default=list)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RunRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('action', models.CharField(max_length=20)),
+                ('done', models.BooleanField(default=False)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='requests', to='myx_stud.quizrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'key'), name='uniq_runrequest_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+
+# Eingefrorener Stand von utils/search.py – Migrationen dürfen nicht von Live-Code abhängen
+TABLE = 'myx_stud_search'
+BATCH_SIZE = 2000
+
+
+def _insert(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (kind, obj_id, konzept_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+            'kind UNINDEXED, obj_id UNINDEXED, konzept_id UNINDEXED, title, body, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {TABLE} ('
+            'kind varchar(16) NOT NULL, obj_id varchar(64) NOT NULL, konzept_id varchar(64) NOT NULL, '
+            'title text NOT NULL, body text NOT NULL, '
+            'tsv tsvector GENERATED ALWAYS AS ('
+            "setweight(to_tsvector('german', title), 'A') || "
+            "setweight(to_tsvector('german', body), 'B')) STORED, "
+            'PRIMARY KEY (kind, obj_id))'
+        )
+        schema_editor.execute(f'CREATE INDEX {TABLE}_tsv ON {TABLE} USING gin (tsv)')
+    else:
+        return
+
+    Konzepte = apps.get_model('myx_stud', 'Konzepte')
+    QuizQuestion = apps.get_model('myx_stud', 'QuizQuestion')
+    with schema_editor.connection.cursor() as cursor:
+        _insert(cursor, [
+            ('konzept', k.pk.hex, k.pk.hex, k.name or '', '\n'.join(filter(None, [k.definition, k.example])))
+            for k in Konzepte.objects.only('name', 'definition', 'example').iterator()
+        ])
+        qs = QuizQuestion.objects.order_by('pk').only('konzept_id', 'title', 'text', 'question', 'correct_answer')
+        for start in range(0, qs.count(), BATCH_SIZE):
+            _insert(cursor, [
+                ('question', str(q.pk), q.konzept_id.hex, q.title or '',
+                 '\n'.join(filter(None, [q.text, q.question, q.correct_answer])))
+                for q in qs[start:start + BATCH_SIZE]
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0008_quiz_runs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learner_key', models.CharField(max_length=64)),
+                ('item_id', models.CharField(max_length=200)),
+                ('konzept_id', models.UUIDField(blank=True, null=True)),
+                ('box', models.PositiveSmallIntegerField(default=0)),
+                ('easiness', models.FloatField(default=2.5)),
+                ('interval_days', models.FloatField(default=0.0)),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('last_score', models.FloatField(default=0.0)),
+                ('last_seen_at', models.DateTimeField()),
+                ('due_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['learner_key', 'due_at'], name='myx_stud_it_learner_eb6502_idx')],
+                'constraints': [models.UniqueConstraint(fields=('learner_key', 'item_id'), name='uniq_mastery_learner_item')],
+            },
+        ),
+        migrations.CreateModel(
+            name='KonzeptMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learner_key', models.CharField(max_length=64)),
+                ('konzept_id', models.UUIDField()),
+                ('percent', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('learner_key', 'konzept_id'), name='uniq_mastery_learner_konzept')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:25
+
+import hashlib
+
+from django.db import migrations, models
+
+
+# Eingefrorener Stand von utils/functions.build_prompt_prefix – Migrationen dürfen nicht von
+# Live-Code abhängen; ändert sich der Prompt später, rechnet das pre_save-Signal beim Speichern neu
+def _prompt_prefix(q):
+    return f"""
+        Du bist ein Tutor und gibst konstruktives, kurzes Feedback. 
+        Der Schüler darf seine Antwort nach deinem Feedback überarbeiten.
+
+        Aufgabentext: {q.text or ""}
+        Frage: {q.question or ""}
+        Korrekte Antwort: {q.correct_answer or ""}
+
+        Erstelle dein Feedback nach diesen Vorgaben: {q.feedback_prompt or ""}
+
+        Zusätzlich: Schätze die Korrektheit der Schüler-Antwort als Score zwischen 0 und 1:
+        - 1.0 = vollkommen korrekt
+        - 0.0 = völlig falsch
+        - dazwischen = teilweise korrekt
+        """.strip()
+
+
+def backfill_prompt_prefix(apps, schema_editor):
+    QuizQuestion = apps.get_model('myx_stud', 'QuizQuestion')
+    qs = QuizQuestion.objects.order_by('pk').only('text', 'question', 'correct_answer', 'feedback_prompt')
+    for start in range(0, qs.count(), 500):
+        batch = list(qs[start:start + 500])
+        for q in batch:
+            q.prompt_prefix = _prompt_prefix(q)
+            q.prompt_digest = hashlib.sha256(q.prompt_prefix.encode('utf-8')).hexdigest()
+        QuizQuestion.objects.bulk_update(batch, ['prompt_prefix', 'prompt_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0010_mastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='prompt_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='prompt_prefix',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_prompt_prefix, migrations.RunPython.noop),
+    ]
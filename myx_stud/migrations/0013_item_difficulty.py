@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0012_answer_reuse_threshold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='difficulty',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='difficulty_n',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:48
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0014_cache_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='reuse_threshold',
+            field=models.FloatField(blank=True, help_text='Ab dieser Ähnlichkeit (0–1) wird die Bewertung einer früheren Antwort übernommen. Leer = Standard (aus), 0 = immer neu bewerten. Empfohlen: 0.99 oder höher – darunter gelten schon Antworten mit anderem Artikel oder fehlendem Komma als gleich.', null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)], verbose_name='Ähnlichkeitsschwelle'),
+        ),
+    ]
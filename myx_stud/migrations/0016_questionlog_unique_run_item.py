@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:01
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_logs(apps, schema_editor):
+    """Doppelt gespeicherte Logs (paralleler Offline-Sync) entfernen; das erste bleibt."""
+    QuestionLog = apps.get_model('myx_stud', 'QuestionLog')
+
+    duplicates = (QuestionLog.objects.order_by()
+                  .values('session_id', 'quiz_id', 'item_id')
+                  .annotate(n=Count('pk'), first=Min('pk'))
+                  .filter(n__gt=1))
+    for row in duplicates.iterator():
+        (QuestionLog.objects
+         .filter(session_id=row['session_id'], quiz_id=row['quiz_id'], item_id=row['item_id'])
+         .exclude(pk=row['first'])
+         .delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myx_stud', '0015_reuse_threshold_help'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_logs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='questionlog',
+            constraint=models.UniqueConstraint(fields=('session_id', 'quiz_id', 'item_id'), name='uniq_questionlog_run_item'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 import uuid
 
+from .storage import media_storage
+
         
 
 # Tabelle für die Kurse
@@ -13,8 +16,10 @@ class Kurse(models.Model):
     fach = models.CharField(max_length=200,verbose_name="Fach")
     kurs = models.CharField(max_length=200, verbose_name="Kurs")
     intro = models.TextField(blank=True)
-    image = models.ImageField(upload_to='kurs_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='kurs_images/', storage=media_storage, blank=True, null=True)
     video_url = models.CharField(max_length=200, blank=True)  
+    # denormalisiert, wird per Signal gepflegt (Summe über die Konzepte)
+    active_question_count = models.PositiveIntegerField(default=0, editable=False)
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["fach", "kurs"], name="uniq_fach_kurs")
@@ -41,7 +46,9 @@ class Konzepte(models.Model):
     video_url = models.CharField(max_length=200, blank=True, null=True)
     definition = models.TextField(blank=True, default="Um was geht es denn?")
     example = models.TextField(blank=True, default="immer ein Beispiel bringen")
-    image = models.ImageField(upload_to='concept_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='concept_images/', storage=media_storage, blank=True, null=True)
+    # denormalisiert: Anzahl aktiver Quizfragen, wird per Signal gepflegt
+    active_question_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.kurs} · {self.name or 'ohne Titel'}"
@@ -54,23 +61,36 @@ class QuizQuestion(models.Model):
     konzept = models.ForeignKey(Konzepte, on_delete=models.CASCADE, related_name="quizitems")  # ⬅️ plural
     title = models.CharField(max_length=200)
     text = models.TextField(blank=True)
-    image = models.ImageField(upload_to='quiz_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='quiz_images/', storage=media_storage, blank=True, null=True)
     question = models.TextField(blank=True)
     correct_answer = models.TextField(blank=True)
     gemini_feedback = models.BooleanField(default=False)
     feedback_prompt = models.TextField(blank=True)
     active = models.BooleanField(default=True)
+    reuse_threshold = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        verbose_name="Ähnlichkeitsschwelle",
+        help_text="Ab dieser Ähnlichkeit (0–1) wird die Bewertung einer früheren Antwort übernommen. "
+                  "Leer = Standard (aus), 0 = immer neu bewerten. Empfohlen: 0.99 oder höher – "
+                  "darunter gelten schon Antworten mit anderem Artikel oder fehlendem Komma als gleich.",
+    )
+    # Rasch-Schwierigkeit (Logits, Mittel 0) und Anzahl Erstversuche dahinter (calibrate_items)
+    difficulty = models.FloatField(null=True, blank=True, editable=False)
+    difficulty_n = models.PositiveIntegerField(default=0, editable=False)
+    # vorberechneter, für alle Schüler gleicher Prompt-Anfang (pre_save-Signal, utils/functions.py)
+    prompt_prefix = models.TextField(blank=True, editable=False)
+    prompt_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return self.question or f"QuizQuestion {self.item_id}"
 
 
 
-# Model for all log info: student answer, feedback
-class QuestionLog(models.Model):
-    session_id = models.CharField(max_length=200, db_index=True)          # kein Default
-    quiz_id    = models.CharField(max_length=200, db_index=True)          # Run-ID
-    item_id    = models.CharField(max_length=200, db_index=True)
+# Versionierter, inhaltsadressierter Stand einer Aufgabe (siehe utils/snapshots.py)
+class QuestionSnapshot(models.Model):
+    digest  = models.CharField(max_length=64, unique=True)   # sha256(item_id + Felder)
+    item_id = models.CharField(max_length=200, db_index=True)
+    version = models.PositiveIntegerField(default=1)
 
     fach    = models.CharField(max_length=200, blank=True, verbose_name="Fach")
     kurs    = models.CharField(max_length=200, blank=True, verbose_name="Kurs")
@@ -82,10 +102,25 @@ class QuestionLog(models.Model):
     gemini_feedback = models.BooleanField(default=False)
     feedback_prompt = models.TextField(blank=True)
 
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.item_id} v{self.version}"
+
+
+
+# Model for all log info: student answer, feedback
+class QuestionLog(models.Model):
+    session_id = models.CharField(max_length=200, db_index=True)          # kein Default
+    quiz_id    = models.CharField(max_length=200, db_index=True)          # Run-ID
+    item_id    = models.CharField(max_length=200, db_index=True)
+
+    # Aufgabenstand beim Bearbeiten (fach/kurs/konzept/text/... einmal pro Version statt pro Zeile)
+    snapshot = models.ForeignKey("QuestionSnapshot", on_delete=models.PROTECT, related_name="logs")
+
     started_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    attempts   = models.JSONField(default=list)     # Liste von Versuchen
     item_rating = models.IntegerField(null=True, blank=True)
 
     class Meta:
@@ -96,6 +131,132 @@ class QuestionLog(models.Model):
             models.Index(fields=["item_id"]),
             models.Index(fields=["quiz_id", "item_id"]),
         ]
+        constraints = [
+            # ein Log je Aufgabe und Lauf – doppelte Syncs/NEXTs werden übersprungen
+            models.UniqueConstraint(fields=["session_id", "quiz_id", "item_id"], name="uniq_questionlog_run_item")
+        ]
 
     def __str__(self):
         return f"{self.session_id} | quiz={self.quiz_id} | item={self.item_id}"
+
+
+
+# Feedbacktexte nur einmal speichern (gecachtes LLM-Feedback wiederholt sich oft)
+class FeedbackText(models.Model):
+    digest = models.CharField(max_length=64, unique=True)   # sha256(text)
+    text   = models.TextField()
+
+    def __str__(self):
+        return self.text[:80]
+
+
+# Ein Versuch zu einem QuestionLog (statt JSON-Liste im Log)
+class Attempt(models.Model):
+    log          = models.ForeignKey(QuestionLog, on_delete=models.CASCADE, related_name="attempts")
+    n            = models.PositiveSmallIntegerField()
+    answer       = models.TextField(blank=True)
+    feedback     = models.ForeignKey(FeedbackText, on_delete=models.PROTECT, null=True, blank=True,
+                                     related_name="+")
+    is_correct   = models.BooleanField(default=False)
+    score        = models.FloatField(default=0.0)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["log", "n"]
+        constraints = [
+            models.UniqueConstraint(fields=["log", "n"], name="uniq_attempt_log_n")
+        ]
+        indexes = [
+            models.Index(fields=["score"]),
+            models.Index(fields=["is_correct"]),
+        ]
+
+    def __str__(self):
+        return f"{self.log_id} #{self.n}"
+
+
+
+# Serverseitiger Zustand eines Quizlaufs (siehe utils/runs.py)
+class QuizRun(models.Model):
+    quiz_id    = models.CharField(max_length=200, unique=True)      # = QuestionLog.quiz_id
+    session_id = models.CharField(max_length=200, db_index=True)
+    # bewusst ohne FK: Läufe überleben gelöschte Kurse/Konzepte und werden nur aufgeräumt
+    kurs_id    = models.UUIDField(null=True, blank=True)
+    konzept_id = models.UUIDField(null=True, blank=True)
+
+    index         = models.PositiveIntegerField(default=0)
+    total         = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    score_sum     = models.FloatField(default=0.0)
+    items_scored  = models.PositiveIntegerField(default=0)
+    solved        = models.JSONField(default=list)   # item_ids, die schon einmal richtig waren
+
+    version     = models.PositiveIntegerField(default=0)   # optimistische Sperre
+    created_at  = models.DateTimeField(auto_now_add=True)
+    updated_at  = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result      = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.quiz_id} ({self.index}/{self.total})"
+
+
+# Idempotenz-Key je Lauf: Ergebnis eines POSTs für Wiederholungen
+class RunRequest(models.Model):
+    run        = models.ForeignKey(QuizRun, on_delete=models.CASCADE, related_name="requests")
+    key        = models.CharField(max_length=64)
+    action     = models.CharField(max_length=20)
+    done       = models.BooleanField(default=False)
+    result     = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "key"], name="uniq_runrequest_key")
+        ]
+
+    def __str__(self):
+        return f"{self.run_id}:{self.action}:{self.key}"
+
+
+
+# Lernstand je Lernendem und Aufgabe (Spaced Repetition, siehe utils/mastery.py)
+class ItemMastery(models.Model):
+    learner_key = models.CharField(max_length=64)             # Lern-Cookie bzw. user:<pk>
+    item_id     = models.CharField(max_length=200)            # = QuizQuestion.item_id
+    konzept_id  = models.UUIDField(null=True, blank=True)     # ohne FK wie QuizRun
+
+    box           = models.PositiveSmallIntegerField(default=0)   # Leitner-Box 0..5 (Anzeige)
+    easiness      = models.FloatField(default=2.5)                # SM-2 E-Faktor
+    interval_days = models.FloatField(default=0.0)
+    repetitions   = models.PositiveIntegerField(default=0)
+    last_score    = models.FloatField(default=0.0)
+    last_seen_at  = models.DateTimeField()
+    due_at        = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["learner_key", "item_id"], name="uniq_mastery_learner_item")
+        ]
+        indexes = [
+            models.Index(fields=["learner_key", "due_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.learner_key} | {self.item_id} (Box {self.box})"
+
+
+# Letzter Konzept-Score je Lernendem (vorher nur in der Session unter "konzept_scores")
+class KonzeptMastery(models.Model):
+    learner_key = models.CharField(max_length=64)
+    konzept_id  = models.UUIDField()
+    percent     = models.PositiveSmallIntegerField(default=0)
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["learner_key", "konzept_id"], name="uniq_mastery_learner_konzept")
+        ]
+
+    def __str__(self):
+        return f"{self.learner_key} | {self.konzept_id}: {self.percent}%"
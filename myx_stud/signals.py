@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Kurse, Konzepte, QuizQuestion
+from .utils.caching import bump_version
+from .utils.counts import refresh_question_counts
+from .utils.functions import prompt_fields
+from .utils import search
+from .utils.images import get_variants, schedule_variants
+
+
+# Denormalisierte Fragen-Zähler (Konzepte/Kurse.active_question_count).
+# Steht vor content_changed, damit die Seiten-Caches erst nach dem Update neu gebaut werden.
+@receiver(pre_save, sender=QuizQuestion)
+def quizquestion_remember_konzept(sender, instance, raw=False, **kwargs):
+    """Altes Konzept merken, falls die Frage verschoben wird."""
+    instance._old_konzept_id = None
+    if instance.pk and not raw:
+        instance._old_konzept_id = (QuizQuestion.objects
+                                    .filter(pk=instance.pk)
+                                    .values_list("konzept_id", flat=True)
+                                    .first())
+
+
+@receiver(pre_save, sender=QuizQuestion)
+def quizquestion_prompt_prefix(sender, instance, raw=False, **kwargs):
+    """Prompt-Präfix für die Gemini-Bewertung beim Speichern vorberechnen."""
+    for field, value in prompt_fields(instance).items():
+        setattr(instance, field, value)
+
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def quizquestion_counts(sender, instance, **kwargs):
+    refresh_question_counts({instance.konzept_id, getattr(instance, "_old_konzept_id", None)})
+
+
+@receiver(pre_save, sender=Konzepte)
+def konzept_remember_kurs(sender, instance, raw=False, **kwargs):
+    instance._old_kurs_id = None
+    if not raw:
+        instance._old_kurs_id = (Konzepte.objects
+                                 .filter(pk=instance.pk)
+                                 .values_list("kurs_id", flat=True)
+                                 .first())
+
+
+@receiver(post_save, sender=Konzepte)
+def konzept_counts(sender, instance, created=False, **kwargs):
+    old_kurs_id = getattr(instance, "_old_kurs_id", None)
+    if old_kurs_id and old_kurs_id != instance.kurs_id:
+        refresh_question_counts([instance.pk], kurs_ids=[old_kurs_id])
+
+
+@receiver(post_delete, sender=Konzepte)
+def konzept_deleted_counts(sender, instance, **kwargs):
+    refresh_question_counts([], kurs_ids=[instance.kurs_id])
+
+
+# Katalog (Fach → Kurse) ändert sich nur, wenn Kurse gespeichert/gelöscht werden
+@receiver([post_save, post_delete], sender=Kurse)
+def kurse_changed(sender, **kwargs):
+    bump_version("catalog")
+
+
+# Redakteursrechte (utils/permissions.py): gecachte Kurs-ID-Mengen verwerfen
+@receiver(m2m_changed, sender=Kurse.editors.through)
+def kurs_editors_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version("permissions")
+
+
+# Kurs-/Konzeptseiten (Objekt-Cache + Template-Fragmente) hängen an allen drei Tabellen
+@receiver([post_save, post_delete], sender=Kurse)
+@receiver([post_save, post_delete], sender=Konzepte)
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def content_changed(sender, **kwargs):
+    bump_version("content")
+
+
+# Volltextindex (utils/search.py) im selben Commit wie die Änderung nachziehen
+@receiver(post_save, sender=QuizQuestion)
+def quizquestion_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_questions([instance])
+
+
+@receiver(post_save, sender=Konzepte)
+def konzept_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_konzepte([instance])
+
+
+@receiver(post_delete, sender=QuizQuestion)
+def quizquestion_search_delete(sender, instance, **kwargs):
+    search.remove(search.QUESTION, instance.pk)
+
+
+@receiver(post_delete, sender=Konzepte)
+def konzept_search_delete(sender, instance, **kwargs):
+    search.remove(search.KONZEPT, instance.pk)
+
+
+# Bild-Varianten (WebP/AVIF) nach dem Upload im Hintergrund erzeugen
+@receiver(post_save, sender=Kurse)
+@receiver(post_save, sender=Konzepte)
+@receiver(post_save, sender=QuizQuestion)
+def image_variants(sender, instance, raw=False, **kwargs):
+    image = getattr(instance, "image", None)
+    if raw or not image:
+        return
+    name = image.name
+    if not get_variants(name):
+        transaction.on_commit(lambda: schedule_variants(name))
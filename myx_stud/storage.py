@@ -0,0 +1,32 @@
+import hashlib
+
+from django.core.files.storage import FileSystemStorage
+
+from .utils.images import shared_name
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    Uploads landen unter inhaltsadressierten Namen: quiz_images/freibad.jpg → quiz_images/<sha256[:16]>.jpg
+    Gleicher Inhalt = gleiche Datei (kein zweites Speichern), und weil sich der Inhalt hinter
+    einem Namen nie ändert, darf der Browser ihn dauerhaft cachen (siehe views/media.py).
+    """
+
+    def _save(self, name, content):
+        h = hashlib.sha256()
+        for chunk in content.chunks():
+            h.update(chunk)
+        content.seek(0)
+
+        target = shared_name(name, h.hexdigest())
+        if self.exists(target):
+            return target
+        return super()._save(target, content)
+
+
+_media_storage = HashedMediaStorage()
+
+
+def media_storage():
+    """Callable für ImageField(storage=...), damit Migrationen nur die Referenz speichern."""
+    return _media_storage
@@ -0,0 +1,46 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..utils.images import get_variants
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(image, alt="", sizes="100vw", **attrs):
+    """
+    <picture> mit AVIF/WebP-srcset aus den erzeugten Varianten, Original als Fallback.
+    Beispiel: {% responsive_img kurs.image alt=kurs.kurs sizes="150px" width=150 class="img-fluid" %}
+    Solange (noch) keine Varianten existieren, kommt ein normales <img> heraus.
+    """
+    if not image:
+        return ""
+
+    attrs.setdefault("loading", "lazy")
+    extra = format_html_join("", ' {}="{}"', ((k.replace("_", "-"), v) for k, v in attrs.items()))
+    img_tag = format_html('<img src="{}" alt="{}"{}>', image.url, alt, extra)
+
+    variants = get_variants(image.name)
+    if not variants:
+        return img_tag
+
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, ", ".join(f"{url} {w}w" for url, w in entries), sizes) for fmt, entries in variants.items()),
+    )
+    return format_html("<picture>{}{}</picture>", sources, img_tag)
+
+
+@register.simple_tag
+def prefetch_image_url(image, min_width=600):
+    """URL der kleinsten Variante ≥ min_width (bevorzugt WebP) für <link rel=prefetch>, sonst das Original."""
+    if not image:
+        return ""
+    variants = get_variants(image.name)
+    entries = variants.get("webp") or next(iter(variants.values()), [])
+    for url, width in entries:
+        if width >= min_width:
+            return url
+    return entries[-1][0] if entries else image.url
@@ -1,3 +1,1076 @@
-from django.test import TestCase
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .management.commands.cleanup_sessions import Command as CleanupSessionsCommand
+from .models import (Attempt, ItemMastery, Konzepte, Kurse, QuestionLog, QuestionSnapshot, QuizQuestion,
+                     QuizRun, RunRequest)
+from .utils import answer_reuse, bulk_edit, caching, functions, grading_schema, images, mastery, runs, search
+from .utils.attempts import save_questionlogs
+from .utils.gemini_stub import StubGenerativeModel
+from .utils.grading_batch import GradingBatcher
+from .views import offline
+from .views.quizview import SESSION_QUIZ_ID, _build_questionlog, _log_meta
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Importzeit-Budget (ms) für django.setup() + URLconf + Admin + eigene Management-Commands
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1200"))
+
+HEAVY_MODULES = ("google.generativeai", "grpc", "pandas", "pydantic", "PIL")
+
+_LINE_RE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|( +)(\S+)")
+
+
+def _importtime():
+    """{Modul: kumulierte Importzeit in µs} und Summe der Top-Level-Imports (µs) aus python -X importtime."""
+    code = (
+        "import django; django.setup(); import myx_stud.urls, myx_stud.admin\n"
+        "from django.core.management import get_commands, load_command_class\n"
+        "for name, app in get_commands().items():\n"
+        "    if app == 'myx_stud': load_command_class(app, name)\n"
+    )
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "masteryx.settings", "PYTHONPATH": str(BASE_DIR)}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    modules, total = {}, 0
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m is None:
+            continue
+        cumulative, indent, name = int(m.group(1)), m.group(2), m.group(3)
+        modules[name] = cumulative
+        if len(indent) == 1:
+            total += cumulative
+    return modules, total
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Worker-Start und manage.py-Aufrufe sollen schwere Abhängigkeiten erst bei Bedarf laden."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.modules, cls.total_us = _importtime()
+
+    def test_heavy_dependencies_are_lazy(self):
+        loaded = [m for m in HEAVY_MODULES if m in self.modules]
+        self.assertEqual(loaded, [], f"beim Start geladen: {loaded}")
+
+    def test_import_budget(self):
+        total_ms = self.total_us / 1000
+        self.assertLess(total_ms, IMPORT_BUDGET_MS,
+                        f"Importzeit {total_ms:.0f} ms über Budget {IMPORT_BUDGET_MS} ms")
+
+
+class GradingBatcherTests(SimpleTestCase):
+    """utils/grading_batch.GradingBatcher: Bündeln, Zeitlimit, Fehler an alle Wartenden."""
+
+    def _run_parallel(self, batcher, answers, item="item"):
+        results, errors = [None] * len(answers), [None] * len(answers)
+        start = threading.Barrier(len(answers))
+
+        def call(i):
+            start.wait()
+            try:
+                results[i] = batcher.grade(item, answers[i])
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(answers))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        return results, errors
+
+    def _mark_concurrent(self, batcher):
+        """Wie ein Thread-Worker, der schon gleichzeitige Bewertungen gesehen hat."""
+        batcher._concurrent_at = time.monotonic()
+
+    def test_concurrent_answers_share_one_call(self):
+        calls = []
+
+        def grade(item, answers):
+            calls.append(list(answers))
+            return [f"ok:{a}" for a in answers]
+
+        batcher = GradingBatcher(grade, window_ms=300, max_batch=4)
+        self._mark_concurrent(batcher)
+        results, errors = self._run_parallel(batcher, ["a", "b", "c", "d"])
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(results, ["ok:a", "ok:b", "ok:c", "ok:d"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(calls[0]), ["a", "b", "c", "d"])
+
+    def test_overlapping_calls_enable_the_window(self):
+        def slow(item, answers):
+            time.sleep(0.1)
+            return list(answers)
+
+        batcher = GradingBatcher(slow, window_ms=300, max_batch=2)
+        self.assertEqual(batcher.grade("item", "a"), "a")
+        self.assertEqual(batcher.batches, 1)
+        self._run_parallel(batcher, ["b", "c"], item="other")
+        self.assertLess(time.monotonic() - batcher._concurrent_at, 1)
+
+    def test_single_caller_does_not_wait_for_window(self):
+        batcher = GradingBatcher(lambda item, answers: [len(a) for a in answers], window_ms=2000)
+        t = time.perf_counter()
+        self.assertEqual(batcher.grade("item", "abc"), 3)
+        self.assertLess(time.perf_counter() - t, 0.5)
+
+    def test_window_zero_calls_directly(self):
+        calls = []
+        batcher = GradingBatcher(lambda item, answers: calls.append(answers) or ["x"], window_ms=0)
+        self.assertEqual(batcher.grade("item", "a"), "x")
+        self.assertEqual(calls, [["a"]])
+        self.assertEqual(batcher.batches, 0)
+
+    def test_follower_times_out(self):
+        release = threading.Event()
+
+        def slow(item, answers):
+            release.wait(5)
+            return ["late"] * len(answers)
+
+        batcher = GradingBatcher(slow, window_ms=300, max_batch=2, wait_timeout_s=0.2)
+        self._mark_concurrent(batcher)
+        try:
+            results, errors = self._run_parallel(batcher, ["a", "b"])
+        finally:
+            release.set()
+        self.assertEqual(sum(isinstance(e, TimeoutError) for e in errors), 1)
+        self.assertIn("late", results)
+
+    def test_failure_reaches_every_caller(self):
+        def broken(item, answers):
+            raise RuntimeError("provider down")
+
+        batcher = GradingBatcher(broken, window_ms=300, max_batch=3)
+        self._mark_concurrent(batcher)
+        results, errors = self._run_parallel(batcher, ["a", "b", "c"])
+        self.assertEqual(results, [None] * 3)
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+
+
+class SearchTests(TestCase):
+    """Kursfilter und Limit der Volltextsuche (utils/search.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        other = Kurse.objects.create(fach="Deutsch", kurs="B")
+        cls.own = Konzepte.objects.create(kurs=cls.kurs, name="Dativ")
+        crowd = [Konzepte.objects.create(kurs=other, name="Dativ") for _ in range(search.LIMIT + 5)]
+        QuizQuestion.objects.create(konzept=cls.own, title="Dativ nach Präpositionen")
+        QuizQuestion.objects.bulk_create(QuizQuestion(konzept=k, title="Dativ") for k in crowd)
+        search.rebuild()
+
+    def setUp(self):
+        if not search.available():
+            self.skipTest("kein Volltextindex für dieses Backend")
+
+    def test_course_filter_applies_before_limit(self):
+        ids = search.search_konzept_ids("dativ", within={self.own.pk})
+        self.assertEqual(ids, [self.own.pk])
+
+    def test_empty_course_finds_nothing(self):
+        self.assertEqual(search.search_konzept_ids("dativ", within=set()), [])
+
+    def test_admin_search_is_not_capped(self):
+        self.assertEqual(len(search.search_question_ids("dativ", limit=None)), search.LIMIT + 6)
+        self.assertEqual(len(search.search_question_ids("dativ")), search.LIMIT)
+
+
+class RecordResultsTests(TestCase):
+    """record_results: Upsert statt IntegrityError, wenn ein paralleler Request zuerst anlegt."""
+
+    def test_new_row_created_concurrently_is_updated(self):
+        now = timezone.now()
+        real_filter = ItemMastery.objects.filter
+
+        def racing_filter(*args, **kwargs):
+            # Zwischen SELECT und Insert legt "der andere Request" die Zeile an
+            qs = real_filter(*args, **kwargs)
+            result = list(qs)
+            ItemMastery.objects.create(learner_key="anon:x", item_id="i1", box=0,
+                                       last_seen_at=now, due_at=now)
+            return result
+
+        with mock.patch.object(ItemMastery.objects, "select_for_update") as sfu:
+            sfu.return_value.filter.side_effect = racing_filter
+            mastery.record_results("anon:x", [("i1", None, 1.0)], now=now)
+
+        m = ItemMastery.objects.get(learner_key="anon:x", item_id="i1")
+        self.assertEqual((m.repetitions, m.box, m.last_score), (1, 1, 1.0))
+
+    def test_existing_row_is_scheduled(self):
+        mastery.record_results("anon:y", [("i1", None, 1.0)])
+        mastery.record_results("anon:y", [("i1", None, 1.0)])
+        m = ItemMastery.objects.get(learner_key="anon:y", item_id="i1")
+        self.assertEqual((m.repetitions, m.interval_days), (2, 6.0))
+
+
+@override_settings(GEMINI_STUB=True, GEMINI_BATCH_WINDOW_MS=0)
+class AnswerReuseTests(TestCase):
+    """Wiederverwendung nur auf Wunsch und nur für praktisch identische Antworten."""
+
+    SENTENCE = ("Die Katze liegt auf dem Sofa im Wohnzimmer, weil sie nach dem langen "
+                "Spaziergang im Garten sehr müde ist.")
+    GRADED = {"feedback": "Sehr gut!", "score": 1.0}
+
+    def setUp(self):
+        answer_reuse._local.clear()
+        cache.clear()
+
+    def _feedback(self, answer, reuse_threshold=None):
+        return functions.get_gemini_feedback("", "Wo liegt die Katze?", answer, self.SENTENCE, "",
+                                             reuse_threshold=reuse_threshold)
+
+    def test_off_by_default(self):
+        calls = StubGenerativeModel.calls
+        self._feedback(self.SENTENCE)
+        self._feedback(self.SENTENCE)
+        self.assertEqual(StubGenerativeModel.calls - calls, 2)
+
+    def test_opt_in_per_question(self):
+        calls = StubGenerativeModel.calls
+        self._feedback(self.SENTENCE, answer_reuse.STRICT_THRESHOLD)
+        self._feedback(f"  {self.SENTENCE} ", answer_reuse.STRICT_THRESHOLD)
+        self.assertEqual(StubGenerativeModel.calls - calls, 1)
+
+    def test_near_miss_answers_are_not_reused(self):
+        answer_reuse.remember("digest", self.SENTENCE, self.GRADED)
+        near_misses = [
+            self.SENTENCE.replace("auf dem", "auf den"),   # falscher Kasus
+            self.SENTENCE.replace(",", ""),                 # Komma fehlt
+            self.SENTENCE.replace("Katze", "katze"),        # Kleinschreibung
+            self.SENTENCE[:-1],                             # Punkt fehlt
+        ]
+        for answer in near_misses:
+            with self.subTest(answer=answer):
+                self.assertIsNone(answer_reuse.lookup("digest", answer, answer_reuse.STRICT_THRESHOLD))
+
+    def test_whitespace_only_difference_is_reused(self):
+        answer_reuse.remember("digest", self.SENTENCE, self.GRADED)
+        answer = "  " + self.SENTENCE.replace(" ", "  ", 1)
+        self.assertEqual(answer_reuse.lookup("digest", answer, answer_reuse.STRICT_THRESHOLD), self.GRADED)
+
+
+class UpdateRunTests(TestCase):
+    """Optimistische Sperre auf QuizRun.version (utils/runs.py)."""
+
+    def setUp(self):
+        self.run = QuizRun.objects.create(quiz_id="q1", session_id="s1", total=3)
+
+    def test_write_bumps_version(self):
+        self.assertTrue(runs.update_run(self.run, lambda r: {"index": r.index + 1}))
+        self.run.refresh_from_db()
+        self.assertEqual((self.run.index, self.run.version), (1, 1))
+
+    def test_stale_copy_rereads_and_decides_again(self):
+        other = QuizRun.objects.get(pk=self.run.pk)
+        runs.update_run(other, lambda r: {"index": r.index + 1})
+
+        seen = []
+
+        def advance(r):
+            seen.append(r.index)
+            return {"index": r.index + 1}
+
+        self.assertTrue(runs.update_run(self.run, advance))
+        self.assertEqual(seen, [0, 1])   # erst veraltet, nach dem Neulesen aktuell
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.index, 2)
+
+    def test_none_means_nothing_to_do(self):
+        self.assertFalse(runs.update_run(self.run, lambda r: None))
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.version, 0)
+
+    def test_gives_up_after_max_retries(self):
+        def always_outrun(r):
+            QuizRun.objects.filter(pk=r.pk).update(version=r.version + 1)
+            return {"index": 99}
+
+        self.assertFalse(runs.update_run(self.run, always_outrun))
+        self.run.refresh_from_db()
+        self.assertEqual((self.run.index, self.run.version), (0, runs.MAX_RETRIES))
+
+
+class ClaimRequestTests(TestCase):
+    """Idempotenz-Keys: Duplikate bekommen das gespeicherte Ergebnis."""
+
+    def setUp(self):
+        self.run = QuizRun.objects.create(quiz_id="q1", session_id="s1")
+
+    def test_duplicate_gets_stored_result(self):
+        self.assertEqual(runs.claim_request(self.run, "k1", "submit"), (True, None))
+        runs.store_result(self.run, "k1", {"score": 1.0})
+        self.assertEqual(runs.claim_request(self.run, "k1", "submit"), (False, {"score": 1.0}))
+        self.assertTrue(runs.is_replay(self.run, "k1"))
+
+    def test_without_key_always_runs(self):
+        self.assertEqual(runs.claim_request(self.run, "", "submit"), (True, None))
+        self.assertEqual(runs.claim_request(self.run, "", "submit"), (True, None))
+        self.assertFalse(RunRequest.objects.exists())
+
+    def test_duplicate_of_running_request_times_out(self):
+        runs.claim_request(self.run, "k1", "submit")
+        with mock.patch.object(runs, "IDEMPOTENCY_WAIT_S", 0):
+            self.assertEqual(runs.claim_request(self.run, "k1", "submit"), (False, runs.IN_PROGRESS))
+
+    def test_released_key_runs_again(self):
+        runs.claim_request(self.run, "k1", "submit")
+        runs.release_request(self.run, "k1")
+        self.assertEqual(runs.claim_request(self.run, "k1", "submit"), (True, None))
+
+
+class FinishRunTests(TestCase):
+    """_finish_run: Ergebnis auch dann liefern, wenn update_run aufgibt."""
+
+    def setUp(self):
+        from .views.views import SESSION_QUIZ_ID
+
+        self.run = QuizRun.objects.create(quiz_id="q1", session_id="s1", total=2, correct_count=1,
+                                          score_sum=1.5, items_scored=2)
+        RunRequest.objects.create(run=self.run, key="k1", action="submit", done=True)
+        self.request = RequestFactory().get("/")
+        SessionMiddleware(lambda r: None).process_request(self.request)
+        self.request.session[SESSION_QUIZ_ID] = self.run.quiz_id
+
+    def _finish(self):
+        from .views.views import _finish_run
+
+        return _finish_run(self.request, None)
+
+    def test_stores_result_and_drops_keys(self):
+        result = self._finish()
+        self.assertEqual(result["percent"], 75)
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.result["percent"], 75)
+        self.assertIsNotNone(self.run.finished_at)
+        self.assertFalse(RunRequest.objects.exists())
+
+    def test_lock_given_up_uses_computed_result(self):
+        with mock.patch("myx_stud.views.views.update_run", return_value=False):
+            result = self._finish()
+        self.assertEqual(result["percent"], 75)
+        self.assertTrue(RunRequest.objects.exists())
+
+    def test_lock_given_up_prefers_parallel_result(self):
+        stored = {"correct": 2, "avg_score": 1.0, "percent": 100, "score_sum": 2.0}
+
+        def parallel_writer(run, changes_fn):
+            QuizRun.objects.filter(pk=run.pk).update(result=stored)
+            return False
+
+        with mock.patch("myx_stud.views.views.update_run", side_effect=parallel_writer):
+            result = self._finish()
+        self.assertEqual(result["percent"], 100)
+
+
+class GradingSchemaTests(SimpleTestCase):
+    """JSON-Ausgabe des Modells prüfen (utils/grading_schema.py)."""
+
+    def test_parse_grading(self):
+        result, error = grading_schema.parse_grading('```json\n{"feedback": " Gut. ", "score": 1.4}\n```')
+        self.assertIsNone(error)
+        self.assertEqual(result, {"feedback": "Gut.", "score": 1.0})
+
+    def test_invalid_grading(self):
+        for text in ('{"feedback": "Gut.", "score": 1', '{"feedback": "  ", "score": 0.5}', '{"score": 0.5}', ""):
+            with self.subTest(text=text):
+                result, error = grading_schema.parse_grading(text)
+                self.assertIsNone(result)
+                self.assertTrue(error)
+
+    def test_parse_batch_keeps_only_known_ids(self):
+        text = ('{"results": ['
+                '{"id": "ab12-1", "feedback": "A", "score": 1},'
+                '{"id": "ab12-1", "feedback": "doppelt", "score": 0},'
+                '{"id": "zz99-2", "feedback": "fremd", "score": 0},'
+                '{"id": "ab12-3", "feedback": "zu groß", "score": 0},'
+                '{"id": " ab12-2 ", "feedback": "B", "score": 0.5}]}')
+        results, error = grading_schema.parse_batch(text, "ab12", 2)
+        self.assertIsNone(error)
+        self.assertEqual(results, {1: {"feedback": "A", "score": 1.0}, 2: {"feedback": "B", "score": 0.5}})
+
+
+@override_settings(GEMINI_STUB=True, GEMINI_BATCH_WINDOW_MS=0, GEMINI_STUB_INVALID_EVERY=1)
+class RepairCallTests(TestCase):
+    """Ungültige Modellausgabe → genau ein Reparatur-Aufruf."""
+
+    def _feedback(self):
+        with self.assertLogs("myx_stud.utils.functions", "WARNING") as logs:
+            result = functions.get_gemini_feedback("", "Wer spielt?", "der Junge", "der Junge", "")
+        self.assertIn("Reparatur-Aufruf", logs.output[0])
+        return result
+
+    def test_invalid_output_is_repaired(self):
+        calls, repairs = StubGenerativeModel.calls, StubGenerativeModel.repairs
+        repaired = grading_schema.stats["repaired"]
+        result = self._feedback()
+        self.assertEqual(result["score"], 1.0)
+        self.assertEqual((StubGenerativeModel.calls - calls, StubGenerativeModel.repairs - repairs), (2, 1))
+        self.assertEqual(grading_schema.stats["repaired"] - repaired, 1)
+
+    def test_failed_repair_returns_error(self):
+        failed = grading_schema.stats["failed"]
+        with mock.patch("myx_stud.utils.gemini_stub._repair", return_value={"score": 1.0}):
+            result = self._feedback()
+        self.assertIsNone(result["score"])
+        self.assertIn("error", result)
+        self.assertEqual(grading_schema.stats["failed"] - failed, 1)
+
+
+class RaschTests(SimpleTestCase):
+    """utils/irt.py: bekannte Schwierigkeiten aus simulierten Antworten zurückgewinnen."""
+
+    def _simulate(self, n_learners=400, seed=1):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        b = np.linspace(-2.0, 2.0, 20)
+        theta = rng.normal(0, 1, n_learners)
+        rows, cols = np.meshgrid(np.arange(n_learners), np.arange(len(b)), indexing="ij")
+        rows, cols = rows.ravel(), cols.ravel()
+        correct = rng.random(len(rows)) < 1 / (1 + np.exp(b[cols] - theta[rows]))
+        return b, rows, cols, correct
+
+    def test_recovers_difficulties(self):
+        import numpy as np
+
+        from .utils import irt
+
+        b, rows, cols, correct = self._simulate()
+        theta_hat, b_hat, iterations, converged = irt.fit_rasch(*irt.aggregate(rows, cols, correct))
+        self.assertTrue(converged)
+        self.assertAlmostEqual(float(b_hat.mean()), 0.0, places=6)
+        self.assertLess(float(np.abs(b_hat - b).max()), 0.35)
+        self.assertGreater(float(np.corrcoef(b_hat, b)[0, 1]), 0.99)
+
+    def test_aggregate_counts_repeated_cells(self):
+        from .utils import irt
+
+        rows, cols, n, k = irt.aggregate([0, 0, 1], [1, 1, 0], [1, 0, 1])
+        self.assertEqual(list(zip(rows, cols, n, k)), [(0, 1, 2.0, 1.0), (1, 0, 1.0, 1.0)])
+
+
+class CalibrateItemsTests(TestCase):
+    """calibrate_items: Erstversuche → QuizQuestion.difficulty."""
+
+    @classmethod
+    def setUpTestData(cls):
+        kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        konzept = Konzepte.objects.create(kurs=kurs, name="Dativ")
+        cls.easy, cls.hard = (QuizQuestion.objects.create(konzept=konzept, title=t) for t in ("leicht", "schwer"))
+        snapshot = QuestionSnapshot.objects.create(digest="d", item_id="x")
+        logs, outcomes = [], []
+        for learner in range(40):
+            for q, correct in ((cls.easy, learner % 10 != 0), (cls.hard, learner % 10 < 3)):
+                logs.append(QuestionLog(session_id=f"s{learner}", quiz_id=f"q{learner}",
+                                        item_id=str(q.item_id), snapshot=snapshot))
+                outcomes.append(correct)
+        logs.append(QuestionLog(session_id="s0", quiz_id="q0", item_id="altbestand", snapshot=snapshot))
+        outcomes.append(True)
+        QuestionLog.objects.bulk_create(logs)
+        Attempt.objects.bulk_create(Attempt(log=log, n=1, is_correct=c) for log, c in zip(logs, outcomes))
+        # Zweitversuche zählen nicht
+        Attempt.objects.bulk_create(Attempt(log=log, n=2, is_correct=True) for log in logs)
+
+    def _calibrate(self, *args):
+        out = StringIO()
+        call_command("calibrate_items", "--min-responses", "10", *args, stdout=out)
+        return out.getvalue()
+
+    def test_writes_difficulties(self):
+        out = self._calibrate()
+        self.assertIn("saved: 2", out)
+        self.easy.refresh_from_db()
+        self.hard.refresh_from_db()
+        self.assertLess(self.easy.difficulty, self.hard.difficulty)
+        self.assertEqual((self.easy.difficulty_n, self.hard.difficulty_n), (40, 40))
+
+    def test_dry_run_saves_nothing(self):
+        self._calibrate("--dry-run")
+        self.assertFalse(QuizQuestion.objects.filter(difficulty__isnull=False).exists())
+
+
+class _MigrationTestCase(TransactionTestCase):
+    """Datenmigration zwischen `before` und `after` vorwärts und zurück ausführen."""
+
+    before = after = None
+
+    def _migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        call_command("migrate", "myx_stud", verbosity=0)
+
+    def _logs(self, apps, rows):
+        QuestionLog = apps.get_model("myx_stud", "QuestionLog")
+        meta = dict(fach="Deutsch", kurs="A", konzept="Dativ", text="", question="Wem?",
+                    correct_answer="dem Mann", feedback_prompt="", gemini_feedback=False)
+        for session, changes in rows:
+            QuestionLog.objects.create(session_id=session, quiz_id="q", item_id="i1", **{**meta, **changes})
+
+
+class AttemptMigrationTests(_MigrationTestCase):
+    """0006: QuestionLog.attempts (JSON) ↔ Attempt-Zeilen mit gemeinsamen Feedback-Texten."""
+
+    before = ("myx_stud", "0005_hashed_media_storage")
+    after = ("myx_stud", "0006_attempt_table")
+
+    ATTEMPTS = [
+        {"answer": "den Mann", "feedback": "Fast.", "is_correct": False, "score": 0.5,
+         "submitted_at": "2026-10-19T10:00:00+00:00"},
+        {"answer": "dem Mann", "feedback": "Richtig.", "is_correct": True, "score": 1.0,
+         "submitted_at": "2026-10-19T10:01:00+00:00"},
+    ]
+
+    def test_round_trip(self):
+        self._logs(self._migrate(self.before), [("s1", {"attempts": self.ATTEMPTS}),
+                                                ("s2", {"attempts": self.ATTEMPTS}),
+                                                ("s3", {"attempts": []})])
+
+        apps = self._migrate(self.after)
+        Attempt = apps.get_model("myx_stud", "Attempt")
+        self.assertEqual(Attempt.objects.count(), 4)
+        self.assertEqual(apps.get_model("myx_stud", "FeedbackText").objects.count(), 2)
+        self.assertEqual(list(Attempt.objects.order_by("log_id", "n").values_list("n", "is_correct"))[:2],
+                         [(1, False), (2, True)])
+
+        apps = self._migrate(self.before)
+        logs = apps.get_model("myx_stud", "QuestionLog").objects.order_by("pk")
+        self.assertEqual([(a["n"], a["answer"], a["feedback"], a["score"]) for a in logs[0].attempts],
+                         [(1, "den Mann", "Fast.", 0.5), (2, "dem Mann", "Richtig.", 1.0)])
+        self.assertEqual(logs[2].attempts, [])
+
+
+class SnapshotMigrationTests(_MigrationTestCase):
+    """0007: kopierte Aufgabenfelder der Logs ↔ versionierte QuestionSnapshots."""
+
+    before = ("myx_stud", "0006_attempt_table")
+    after = ("myx_stud", "0007_question_snapshots")
+
+    def test_round_trip(self):
+        self._logs(self._migrate(self.before), [("s1", {}), ("s2", {}), ("s3", {"question": "Wem genau?"})])
+
+        apps = self._migrate(self.after)
+        QuestionSnapshot = apps.get_model("myx_stud", "QuestionSnapshot")
+        self.assertEqual(sorted(QuestionSnapshot.objects.values_list("question", "version")),
+                         [("Wem genau?", 2), ("Wem?", 1)])
+        logs = apps.get_model("myx_stud", "QuestionLog").objects.order_by("pk")
+        self.assertEqual(len({log.snapshot_id for log in logs}), 2)
+
+        apps = self._migrate(self.before)
+        logs = apps.get_model("myx_stud", "QuestionLog").objects.order_by("pk")
+        self.assertEqual([(log.question, log.correct_answer) for log in logs],
+                         [("Wem?", "dem Mann"), ("Wem?", "dem Mann"), ("Wem genau?", "dem Mann")])
+
+
+class CsvImportTests(TestCase):
+    """CSV-Round-Trip im Admin (utils/bulk_edit.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        cls.konzept = Konzepte.objects.create(kurs=kurs, name="Dativ")
+        cls.q1 = QuizQuestion.objects.create(konzept=cls.konzept, title="Eins", question="Wem?")
+        cls.q2 = QuizQuestion.objects.create(konzept=cls.konzept, title="Zwei", question="Wem genau?")
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.editor = User.objects.create_user("editor", password="pw", is_staff=True)
+
+    def _export(self):
+        """Wie der Upload im Admin: Bytes (UTF-8 mit BOM)."""
+        return bulk_edit.export_csv(QuizQuestion.objects.all()).encode("utf-8")
+
+    def test_round_trip_updates_changed_rows(self):
+        data = self._export().replace(b"Wem genau?", b"Wem ganz genau?").replace(b",1\r\n", b",0\r\n", 1)
+        digest = self.q2.prompt_digest
+        n, errors = bulk_edit.import_csv(data, self.admin)
+        self.assertEqual((n, errors), (2, []))
+        self.q1.refresh_from_db()
+        self.q2.refresh_from_db()
+        self.assertEqual(self.q2.question, "Wem ganz genau?")
+        self.assertNotEqual(self.q2.prompt_digest, digest)
+        self.assertFalse(self.q1.active)
+
+    def test_unchanged_export_changes_nothing(self):
+        self.assertEqual(bulk_edit.import_csv(self._export(), self.admin), (0, []))
+
+    def test_semicolon_export_from_excel(self):
+        data = f"item_id;title\n{self.q1.item_id};Neu\n"
+        self.assertEqual(bulk_edit.import_csv(data.encode("utf-8-sig"), self.admin), (1, []))
+        self.q1.refresh_from_db()
+        self.assertEqual(self.q1.title, "Neu")
+
+    def test_errors_save_nothing(self):
+        data = (f"item_id,title,active\n{self.q1.item_id},Neu,1\n"
+                f"{self.q2.item_id},Auch neu,vielleicht\nkaputt,x,1\n")
+        n, errors = bulk_edit.import_csv(data, self.admin)
+        self.assertEqual(n, 0)
+        self.assertEqual(len(errors), 2)
+        self.q1.refresh_from_db()
+        self.assertEqual(self.q1.title, "Eins")
+
+    def test_missing_item_id_column(self):
+        self.assertEqual(bulk_edit.import_csv("title\nx\n", self.admin), (0, ["Spalte 'item_id' fehlt."]))
+
+    def test_editor_without_course_cannot_import(self):
+        n, errors = bulk_edit.import_csv(f"item_id,title\n{self.q1.item_id},Neu\n", self.editor)
+        self.assertEqual(n, 0)
+        self.assertIn("nicht freigegeben", errors[0])
+
+
+class AdminActionPermissionTests(TestCase):
+    """Ändernde Massenaktionen nur für Benutzer mit change-/add-Recht."""
+
+    MUTATING = {"activate", "deactivate", "toggle_gemini_feedback", "move_to_konzept",
+                "replace_feedback_prompt", "duplicate_to_konzept"}
+
+    @classmethod
+    def setUpTestData(cls):
+        kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        Konzepte.objects.create(kurs=kurs, name="Dativ")
+        User = get_user_model()
+        cls.viewer = User.objects.create_user("viewer", password="pw", is_staff=True)
+        cls.editor = User.objects.create_user("editor", password="pw", is_staff=True)
+        cls.viewer.user_permissions.add(Permission.objects.get(codename="view_quizquestion"))
+        cls.editor.user_permissions.add(*Permission.objects.filter(
+            codename__in=["view_quizquestion", "change_quizquestion", "add_quizquestion"]))
+        kurs.editors.add(cls.viewer, cls.editor)
+
+    def _actions(self, user):
+        request = RequestFactory().get("/admin/myx_stud/quizquestion/")
+        request.user = get_user_model().objects.get(pk=user.pk)   # frischer Permission-Cache
+        return set(admin.site._registry[QuizQuestion].get_actions(request))
+
+    def test_view_only_user_gets_no_mutating_actions(self):
+        actions = self._actions(self.viewer)
+        self.assertFalse(actions & self.MUTATING)
+        self.assertIn("export_csv", actions)
+
+    def test_editor_gets_all_actions(self):
+        self.assertLessEqual(self.MUTATING, self._actions(self.editor))
+
+
+class CatalogTests(TestCase):
+    """Kurskatalog: ein Query pro Katalog-Version, warm keiner."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Kurse.objects.create(fach="Deutsch", kurs="A")
+        Kurse.objects.create(fach="Deutsch", kurs="B")
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("get_kurse_for_fach") + "?fach=Deutsch"
+
+    def test_catalog_read_once_per_request(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json(), {"kurse": ["A", "B"]})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_new_course_bumps_catalog(self):
+        etag = self.client.get(self.url)["ETag"]
+        Kurse.objects.create(fach="Deutsch", kurs="C")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json(), {"kurse": ["A", "B", "C"]})
+
+
+class ContentPageTests(TestCase):
+    """Kurs-/Konzeptseiten: warm nur Session und Lernstand, content_version einmal pro Request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        cls.konzept = Konzepte.objects.create(kurs=cls.kurs, name="Dativ")
+        QuizQuestion.objects.create(konzept=cls.konzept, title="Eins")
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session["current_kurs_id"] = str(self.kurs.id)
+        session.save()
+
+    def _warm(self, url, queries):
+        self.client.get(url)
+        with mock.patch("myx_stud.utils.caching.get_version", wraps=caching.get_version) as get_version:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_version.call_count, 1)
+        return response
+
+    def test_kurs_page(self):
+        # Session, Konzept-Scores, fällige Aufgaben
+        response = self._warm(reverse("kurs"), 3)
+        self.assertContains(response, "Dativ")
+
+    def test_konzept_page(self):
+        # Session, Konzept-Score; die Konzeptauswahl ändert sich nicht → kein Session-UPDATE
+        self._warm(reverse("konzept", args=[self.konzept.id]), 2)
+
+
+class QuizApiTests(TestCase):
+    """JSON-API des Quizlaufs (views/quizapi.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        cls.konzept = Konzepte.objects.create(kurs=cls.kurs, name="Dativ")
+        cls.questions = [QuizQuestion.objects.create(konzept=cls.konzept, title=t, question="Wem?",
+                                                     correct_answer="dem Mann")
+                         for t in ("Eins", "Zwei")]
+
+    def setUp(self):
+        session = self.client.session
+        session["current_kurs_id"] = str(self.kurs.id)
+        session["current_konzept_id"] = str(self.konzept.id)
+        session.save()
+
+    def _post(self, name, payload=None, raw=None):
+        body = raw if raw is not None else json.dumps(payload or {})
+        return self.client.post(reverse(name), body, content_type="application/json")
+
+    def _start(self):
+        return self._post("quiz_api_start").json()
+
+    def test_start_returns_first_item(self):
+        item = self._start()
+        self.assertEqual((item["done"], item["index"], item["total"]), (False, 1, 2))
+        self.assertEqual(item["item_id"], str(self.questions[0].item_id))
+        self.assertIn("Wem?", item["html"])
+
+    def test_submit_is_idempotent(self):
+        item = self._start()
+        payload = {"answer": "dem Mann", "item_id": item["item_id"], "idem_key": "k1"}
+        first = self._post("quiz_api_submit", payload).json()
+        self.assertTrue(first["feedback"]["is_correct"])
+        again = self._post("quiz_api_submit", {**payload, "answer": "den Mann"}).json()
+        self.assertEqual(again, first)
+        self.assertEqual(RunRequest.objects.filter(key="k1").count(), 1)
+
+    def test_next_requires_rating_then_advances(self):
+        item = self._start()
+        self._post("quiz_api_submit", {"answer": "dem Mann", "item_id": item["item_id"], "idem_key": "k1"})
+        response = self._post("quiz_api_next", {"item_id": item["item_id"], "idem_key": "k2"})
+        self.assertEqual((response.status_code, response.json()), (409, {"error": "rating_required"}))
+
+        payload = {"item_id": item["item_id"], "idem_key": "k3", "rating": 4}
+        second = self._post("quiz_api_next", payload).json()
+        self.assertEqual((second["index"], second["item_id"]), (2, str(self.questions[1].item_id)))
+        # Retry desselben NEXT (Antwort ging verloren) → aktueller Stand statt 409
+        self.assertEqual(self._post("quiz_api_next", payload).json()["index"], 2)
+
+    def test_stale_item(self):
+        self._start()
+        response = self._post("quiz_api_submit", {"answer": "x", "item_id": str(self.questions[1].item_id)})
+        self.assertEqual((response.status_code, response.json()), (409, {"error": "stale_item"}))
+
+    def test_invalid_rating(self):
+        self._start()
+        response = self._post("quiz_api_rate", {"rating": 9})
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "invalid_rating"}))
+
+    def test_non_object_body_is_rejected(self):
+        self._start()
+        for name in ("quiz_api_start", "quiz_api_submit", "quiz_api_rate", "quiz_api_next"):
+            for raw in ("[]", '"x"', "{kaputt"):
+                with self.subTest(name=name, body=raw):
+                    response = self._post(name, raw=raw)
+                    self.assertEqual((response.status_code, response.json()), (400, {"error": "invalid_body"}))
+
+    def test_without_course(self):
+        session = self.client.session
+        del session["current_kurs_id"]
+        session.save()
+        response = self._post("quiz_api_start")
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "no_kurs"}))
+
+    def test_complete(self):
+        item = self._start()
+        for question in self.questions:
+            item_id = str(question.item_id)
+            self._post("quiz_api_submit", {"answer": "dem Mann", "item_id": item_id})
+            item = self._post("quiz_api_next", {"item_id": item_id, "rating": 5}).json()
+        self.assertTrue(item["done"])
+        result = self._post("quiz_api_complete").json()
+        self.assertEqual((result["correct"], result["percent"]), (2, 100))
+
+
+@override_settings(GEMINI_STUB=True, GEMINI_BATCH_WINDOW_MS=0)
+class OfflineSyncTests(TestCase):
+    """Offline-Bundle und gebündelter Sync (views/offline.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kurs = Kurse.objects.create(fach="Deutsch", kurs="A")
+        cls.konzept = Konzepte.objects.create(kurs=cls.kurs, name="Dativ")
+        cls.questions = [QuizQuestion.objects.create(konzept=cls.konzept, title=t, question="Wem?",
+                                                     correct_answer="dem Mann")
+                         for t in ("Eins", "Zwei")]
+
+    def setUp(self):
+        session = self.client.session
+        session["current_konzept_id"] = str(self.konzept.id)
+        session.save()
+
+    def _bundle(self):
+        return self.client.get(reverse("quiz_offline_bundle")).json()
+
+    def _sync(self, payload=None, raw=None):
+        body = raw if raw is not None else json.dumps(payload)
+        return self.client.post(reverse("quiz_offline_sync"), body, content_type="application/json")
+
+    def _items(self, questions, answer="dem Mann"):
+        return [{"item_id": str(q.item_id), "rating": 4, "attempts": [{"answer": answer}]} for q in questions]
+
+    def test_bundle_hashes_solution(self):
+        bundle = self._bundle()
+        item = bundle["items"][0]
+        self.assertEqual(item["answer_hash"], offline.answer_hash(bundle["salt"], " Dem Mann "))
+        self.assertNotIn("dem Mann", json.dumps(bundle))
+
+    def test_resend_saves_nothing_new(self):
+        quiz_id = self._bundle()["quiz_id"]
+        payload = {"quiz_id": quiz_id, "items": self._items(self.questions)}
+        first = self._sync(payload).json()
+        self.assertEqual(len(first["saved"]), 2)
+        self.assertEqual(self._sync(payload).json()["saved"], [])
+        self.assertEqual(QuestionLog.objects.filter(quiz_id=quiz_id).count(), 2)
+        self.assertEqual(Attempt.objects.filter(log__quiz_id=quiz_id).count(), 2)
+
+    def test_llm_budget_defers_rest(self):
+        llm = [QuizQuestion.objects.create(konzept=self.konzept, title=f"LLM {n}", question="Wem?",
+                                           correct_answer="dem Mann", gemini_feedback=True)
+               for n in range(offline.MAX_LLM_GRADES_PER_SYNC + 2)]
+        quiz_id = self._bundle()["quiz_id"]
+        response = self._sync({"quiz_id": quiz_id, "items": self._items(llm), "complete": True}).json()
+        self.assertEqual(len(response["saved"]), offline.MAX_LLM_GRADES_PER_SYNC)
+        self.assertEqual(len(response["deferred"]), 2)
+        self.assertNotIn("result", response)   # complete erst ohne Rückstand
+
+        deferred = [q for q in llm if str(q.item_id) in response["deferred"]]
+        response = self._sync({"quiz_id": quiz_id, "items": self._items(deferred), "complete": True}).json()
+        self.assertEqual((len(response["saved"]), response["deferred"]), (2, []))
+        self.assertIn("result", response)
+
+    def test_complete_scores_and_closes_run(self):
+        quiz_id = self._bundle()["quiz_id"]
+        items = self._items(self.questions[:1]) + self._items(self.questions[1:], answer="den Mann")
+        result = self._sync({"quiz_id": quiz_id, "items": items, "complete": True}).json()["result"]
+        self.assertEqual((result["correct"], result["percent"]), (1, 50))
+        self.assertNotIn(quiz_id, self.client.session[offline.OFFLINE_RUNS_KEY])
+        self.assertEqual(self._sync({"quiz_id": quiz_id, "items": []}).status_code, 404)
+
+    def test_non_object_body_is_rejected(self):
+        for raw in ("[]", '"x"', "1"):
+            with self.subTest(body=raw):
+                response = self._sync(raw=raw)
+                self.assertEqual((response.status_code, response.json()), (400, {"error": "invalid_body"}))
+
+    def test_open_runs_are_capped(self):
+        quiz_ids = [self._bundle()["quiz_id"] for _ in range(offline.MAX_OFFLINE_RUNS + 2)]
+        self.assertEqual(list(self.client.session[offline.OFFLINE_RUNS_KEY]), quiz_ids[2:])
+
+    def test_concurrently_saved_log_is_skipped(self):
+        question, other = (QuizQuestion.objects.select_related("konzept__kurs").get(pk=q.pk)
+                           for q in self.questions)
+        bucket = [{"n": 1, "answer": "dem Mann", "feedback_text": "", "correct_answer": "dem Mann",
+                   "is_correct": True, "score": 1.0, "submitted_at": timezone.now().isoformat()}]
+
+        def entry(q):
+            return _build_questionlog(_log_meta(q, "s1"), "run1", str(q.item_id), None, bucket)
+
+        save_questionlogs([entry(question)])   # ein paralleler Sync war schneller
+        saved = save_questionlogs([entry(question), entry(other)])
+        self.assertEqual([log.item_id for log in saved], [str(other.item_id)])
+        self.assertEqual(QuestionLog.objects.filter(quiz_id="run1").count(), 2)
+
+
+class CleanupSessionsTests(TestCase):
+    """Verwaiste Versuchs-Buckets und alte Läufe (cleanup_sessions)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        konzept = Konzepte.objects.create(kurs=Kurse.objects.create(fach="Deutsch", kurs="A"), name="Dativ")
+        cls.question = QuizQuestion.objects.create(konzept=konzept, title="Eins", question="Wem?",
+                                                   correct_answer="dem Mann")
+
+    def _session(self, key, data, expired=False):
+        expire = timezone.now() + timedelta(days=-1 if expired else 1)
+        return Session.objects.create(session_key=key, session_data=Session.objects.encode(data),
+                                      expire_date=expire)
+
+    def _bucket(self, quiz_id):
+        return {f"qlog_{quiz_id}_{self.question.item_id}": [
+            {"n": 1, "answer": "dem Mann", "is_correct": True, "score": 1.0, "rating": 4}
+        ]}
+
+    def _cleanup(self, *args):
+        out = StringIO()
+        call_command("cleanup_sessions", *args, stdout=out)
+        return dict(re.findall(r"^(\w+): (\d+)", out.getvalue(), re.M))
+
+    def test_orphaned_bucket_is_flushed_active_run_kept(self):
+        QuizRun.objects.create(quiz_id="aa", session_id="s1")
+        self._session("s1", {SESSION_QUIZ_ID: "aa", **self._bucket("aa"), **self._bucket("bb")})
+        stats = self._cleanup()
+        self.assertEqual((stats["buckets_flushed"], stats["sessions_cleaned"]), ("1", "1"))
+
+        log = QuestionLog.objects.get(session_id="s1")
+        self.assertEqual((log.quiz_id, log.item_rating), ("bb", 4))
+        self.assertEqual(log.attempts.count(), 1)
+        data = Session.objects.get(session_key="s1").get_decoded()
+        self.assertEqual(sorted(data), sorted([SESSION_QUIZ_ID, *self._bucket("aa")]))
+
+    def test_dry_run_only_counts(self):
+        self._session("s1", self._bucket("bb"), expired=True)
+        QuizRun.objects.create(quiz_id="old", session_id="s1")
+        QuizRun.objects.filter(quiz_id="old").update(updated_at=timezone.now() - timedelta(days=60))
+        stats = self._cleanup("--dry-run")
+        self.assertEqual((stats["sessions_deleted"], stats["buckets_flushed"], stats["runs_deleted"]),
+                         ("1", "1", "1"))
+        self.assertTrue(Session.objects.filter(session_key="s1").exists())
+        self.assertTrue(QuizRun.objects.filter(quiz_id="old").exists())
+        self.assertFalse(QuestionLog.objects.exists())
+
+    def test_concurrently_changed_session_is_not_overwritten(self):
+        self._session("s1", self._bucket("bb"))
+        collect = CleanupSessionsCommand._collect
+
+        def racing(command, session_key, data, entries, expired):
+            cleaned = collect(command, session_key, data, entries, expired)
+            # ein Request schreibt die Session, während der Sweep noch läuft
+            Session.objects.filter(session_key=session_key).update(
+                session_data=Session.objects.encode({**data, "touched": True}))
+            return cleaned
+
+        with mock.patch.object(CleanupSessionsCommand, "_collect", racing):
+            stats = self._cleanup()
+        self.assertEqual(stats["sessions_cleaned"], "0")
+        self.assertTrue(Session.objects.get(session_key="s1").get_decoded()["touched"])
+
+
+class QuestionCountTests(TestCase):
+    """
+    Quizläufe zählen nur über active_question_count (views/quizview._run_questions) –
+    nach jedem Änderungsweg muss der Zähler der echten Anzahl aktiver Fragen entsprechen.
+    """
+
+    def setUp(self):
+        self.kurse = [Kurse.objects.create(fach="Deutsch", kurs=k) for k in ("A", "B")]
+        self.konzepte = [Konzepte.objects.create(kurs=self.kurse[0], name=n) for n in ("Dativ", "Akkusativ")]
+        for n in range(3):
+            QuizQuestion.objects.create(konzept=self.konzepte[0], title=f"Frage {n}", question="Wem?")
+
+    def _assert_counts(self):
+        for konzept in Konzepte.objects.all():
+            self.assertEqual(konzept.active_question_count,
+                             QuizQuestion.objects.filter(active=True, konzept=konzept).count(), konzept)
+        for kurs in Kurse.objects.all():
+            self.assertEqual(kurs.active_question_count,
+                             QuizQuestion.objects.filter(active=True, konzept__kurs=kurs).count(), kurs)
+
+    def test_counters_follow_every_change(self):
+        dativ, akkusativ = self.konzepte
+        first, second, _ = QuizQuestion.objects.filter(konzept=dativ).order_by("id")
+
+        def move_konzept():
+            konzept = Konzepte.objects.get(pk=akkusativ.pk)
+            konzept.kurs = self.kurse[1]
+            konzept.save()
+
+        steps = [
+            ("deaktivieren", lambda: bulk_edit.update_questions(QuizQuestion.objects.filter(pk=first.pk),
+                                                                active=False)),
+            ("verschieben", lambda: bulk_edit.update_questions(QuizQuestion.objects.filter(pk=second.pk),
+                                                               konzept=akkusativ)),
+            ("duplizieren", lambda: bulk_edit.duplicate_questions(QuizQuestion.objects.filter(active=True),
+                                                                  akkusativ)),
+            ("Konzept umhängen", move_konzept),
+            ("Frage löschen", lambda: QuizQuestion.objects.get(pk=second.pk).delete()),
+            ("Konzept löschen", lambda: Konzepte.objects.get(pk=dativ.pk).delete()),
+        ]
+        self._assert_counts()
+        for name, step in steps:
+            with self.subTest(step=name):
+                step()
+                self._assert_counts()
+
+    def test_quiz_total_matches_active_questions(self):
+        session = self.client.session
+        session["current_kurs_id"] = str(self.kurse[0].id)
+        session["current_konzept_id"] = str(self.konzepte[0].id)
+        session.save()
+        bulk_edit.update_questions(QuizQuestion.objects.filter(title="Frage 0"), active=False)
+
+        item = self.client.post(reverse("quiz_api_start"), "{}", content_type="application/json").json()
+        self.assertEqual(item["total"],
+                         QuizQuestion.objects.filter(active=True, konzept=self.konzepte[0]).count())
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=(8,))
+class ImageVariantTests(SimpleTestCase):
+    """Varianten je Original (utils/images.py)."""
+
+    def setUp(self):
+        from PIL import Image
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = FileSystemStorage(location=tmp.name, base_url="/media/")
+        for name, fmt in (("quiz_images/foo.png", "PNG"), ("quiz_images/foo.jpg", "JPEG")):
+            buf = BytesIO()
+            Image.new("RGB", (16, 16), "red").save(buf, format=fmt)
+            self.storage.save(name, ContentFile(buf.getvalue()))
+
+    def test_same_stem_different_extension(self):
+        self.assertNotEqual(images.variant_name("quiz_images/foo.png", 8, "webp"),
+                            images.variant_name("quiz_images/foo.jpg", 8, "webp"))
+        images.generate_variants("quiz_images/foo.png", self.storage)
+        self.assertTrue(images.get_variants("quiz_images/foo.png", self.storage))
+        self.assertEqual(images.get_variants("quiz_images/foo.jpg", self.storage), {})
+
+        images.generate_variants("quiz_images/foo.jpg", self.storage)
+        images.delete_variants("quiz_images/foo.png", self.storage)
+        self.assertEqual(images.get_variants("quiz_images/foo.png", self.storage), {})
+        self.assertTrue(images.get_variants("quiz_images/foo.jpg", self.storage))
@@ -1,7 +1,14 @@
 from django.urls import path
-from .views.views import home, kurs, konzept, get_kurse_for_fach, kurswahl, quiz_complete
+from .views.views import (
+    home, kurs, konzept, konzept_suche, get_kurse_for_fach, kurswahl, quiz_complete, wiederholen,
+)
 
 from .views.quizview import quiz_view
+from .views.perfview import perf_stats
+from .views.offline import quiz_offline, quiz_offline_bundle, quiz_offline_sync
+from .views.quizapi import (
+    quiz_api_start, quiz_api_item, quiz_api_submit, quiz_api_rate, quiz_api_next, quiz_api_complete,
+)
 
 
 urlpatterns = [
@@ -9,7 +16,19 @@ urlpatterns = [
     path("kurswahl/", kurswahl, name="kurswahl"),
     path("kurs/", kurs, name="kurs"),
     path("konzept/<uuid:konzept_id>/", konzept, name="konzept"),  # <- int -> uuid
+    path("kurs/suche/", konzept_suche, name="konzept_suche"),
+    path("wiederholen/", wiederholen, name="wiederholen"),
     path("quiz/view/", quiz_view, name="quiz_view"),
     path('quiz/complete/', quiz_complete, name='quiz_complete'),
     path("quiz/ajax/get-kurse/", get_kurse_for_fach, name="get_kurse_for_fach"),
-]
\ No newline at end of file
+    path("quiz/api/start/", quiz_api_start, name="quiz_api_start"),
+    path("quiz/api/item/", quiz_api_item, name="quiz_api_item"),
+    path("quiz/api/submit/", quiz_api_submit, name="quiz_api_submit"),
+    path("quiz/api/rate/", quiz_api_rate, name="quiz_api_rate"),
+    path("quiz/api/next/", quiz_api_next, name="quiz_api_next"),
+    path("quiz/api/complete/", quiz_api_complete, name="quiz_api_complete"),
+    path("quiz/offline/", quiz_offline, name="quiz_offline"),
+    path("quiz/api/offline/bundle/", quiz_offline_bundle, name="quiz_offline_bundle"),
+    path("quiz/api/offline/sync/", quiz_offline_sync, name="quiz_offline_sync"),
+    path("perf/", perf_stats, name="perf_stats"),
+]
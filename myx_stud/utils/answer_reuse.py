@@ -0,0 +1,141 @@
+"""
+Wiederverwendung von LLM-Bewertungen für fast gleiche Antworten ("der Junge" ≈ "der  Junge ").
+
+Pro Aufgabe (Schlüssel: prompt_digest – ändert sich die Aufgabe, fängt der Index neu an)
+liegen die bereits bewerteten Antworten als L2-normierte Zeichen-n-Gramm-Vektoren (3–5,
+gehasht auf DIM Spalten) in einer NumPy-Matrix. Eine neue Antwort ist ein Treffer, wenn die
+Kosinus-Ähnlichkeit zur nächsten Antwort mindestens die Schwelle erreicht
+(QuizQuestion.reuse_threshold, sonst settings.ANSWER_REUSE_THRESHOLD; 0 = aus, Standard).
+Groß-/Kleinschreibung und Satzzeichen bleiben im Vektor – "auf dem"/"auf den" oder ein
+fehlendes Komma können die Bewertung ändern. Auch so liegt ein einzelnes abweichendes Zeichen
+in einer langen Antwort noch bei ~0.98, daher nur mit STRICT_THRESHOLD oder strenger einschalten.
+Läuft komplett lokal; die Einträge liegen prozesslokal und im Django-Cache (für andere Worker).
+"""
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+NGRAMS = (3, 4, 5)
+DIM = 4096
+MAX_ENTRIES = 200     # bewertete Antworten je Aufgabe
+MAX_ITEMS = 500       # Aufgaben im Prozess-Speicher (LRU)
+TTL = 60 * 60 * 24 * 7
+
+STRICT_THRESHOLD = 0.99   # empfohlener Wert für QuizQuestion.reuse_threshold
+
+_KEY = "myx:answers:v2:{}"   # v2: Einträge ohne Kleinschreibung/Satzzeichen-Filter
+_DUPLICATE = 0.999    # praktisch gleiche Antwort → nicht nochmal speichern
+
+_local = OrderedDict()   # digest → _ItemIndex
+_lock = threading.Lock()
+
+stats = {"lookups": 0, "hits": 0, "added": 0}
+
+
+def _np():
+    import numpy as np
+    return np
+
+
+def normalize(answer):
+    """Nur Leerzeichen am Rand und Mehrfach-Leerzeichen egal."""
+    return " ".join((answer or "").split())
+
+
+def vectorize(texts):
+    """Normalisierte Texte → float32-Matrix (len(texts) × DIM), Zeilen L2-normiert."""
+    np = _np()
+    matrix = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {text} "
+        cols = [zlib.crc32(padded[i:i + n].encode("utf-8")) % DIM
+                for n in NGRAMS for i in range(max(1, len(padded) - n + 1))]
+        np.add.at(matrix[row], cols, 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+class _ItemIndex:
+    def __init__(self, answers=(), results=()):
+        self.answers = list(answers)
+        self.results = list(results)
+        self.matrix = vectorize(self.answers)
+
+    def nearest(self, vector):
+        """(Ähnlichkeit, Position) der ähnlichsten gespeicherten Antwort."""
+        if not self.answers:
+            return 0.0, None
+        sims = self.matrix @ vector
+        i = int(sims.argmax())
+        return float(sims[i]), i
+
+    def add(self, answer, vector, result):
+        np = _np()
+        self.answers.append(answer)
+        self.results.append(result)
+        self.matrix = np.vstack([self.matrix, vector[None, :]])
+        if len(self.answers) > MAX_ENTRIES:
+            self.answers, self.results, self.matrix = (
+                self.answers[-MAX_ENTRIES:], self.results[-MAX_ENTRIES:], self.matrix[-MAX_ENTRIES:])
+
+
+def _index(digest):
+    with _lock:
+        index = _local.get(digest)
+        if index is not None:
+            _local.move_to_end(digest)
+            return index
+    stored = cache.get(_KEY.format(digest)) or {}
+    index = _ItemIndex(stored.get("answers", ()), stored.get("results", ()))
+    with _lock:
+        index = _local.setdefault(digest, index)
+        while len(_local) > MAX_ITEMS:
+            _local.popitem(last=False)
+    return index
+
+
+def threshold_for(question_threshold):
+    if question_threshold is not None:
+        return question_threshold
+    return getattr(settings, "ANSWER_REUSE_THRESHOLD", 0.0)
+
+
+def lookup(digest, answer, threshold):
+    """Gespeicherte Bewertung {"feedback", "score"} einer ähnlichen Antwort oder None."""
+    if not threshold or not digest:
+        return None
+    text = normalize(answer)
+    if not text:
+        return None
+    stats["lookups"] += 1
+    index = _index(digest)
+    with _lock:
+        sim, i = index.nearest(vectorize([text])[0])
+        if i is None or sim < threshold:
+            return None
+        stats["hits"] += 1
+        return dict(index.results[i])
+
+
+def remember(digest, answer, result):
+    """Erfolgreiche LLM-Bewertung (score nicht None, kein Fehler) für spätere Antworten merken."""
+    if not digest or result.get("score") is None or result.get("error"):
+        return
+    text = normalize(answer)
+    if not text:
+        return
+    vector = vectorize([text])[0]
+    index = _index(digest)
+    with _lock:
+        sim, _ = index.nearest(vector)
+        if sim >= _DUPLICATE:
+            return
+        index.add(text, vector, {"feedback": result.get("feedback") or "", "score": result["score"]})
+        stats["added"] += 1
+        # letzter Schreiber gewinnt – parallele Worker verlieren höchstens einzelne Einträge
+        payload = {"answers": list(index.answers), "results": list(index.results)}
+    cache.set(_KEY.format(digest), payload, TTL)
@@ -0,0 +1,109 @@
+"""
+Versuche als eigene Zeilen (Attempt) statt JSON-Liste in QuestionLog.
+
+Feedbacktexte landen dedupliziert in FeedbackText (Schlüssel: sha256 des Textes);
+gleiche LLM-Antworten belegen so nur einmal Platz.
+"""
+import hashlib
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .snapshots import snapshot_ids
+
+
+def feedback_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def intern_feedback(texts):
+    """{text: FeedbackText.pk} für alle nicht-leeren Texte; fehlende werden per bulk_create angelegt."""
+    from ..models import FeedbackText
+
+    by_digest = {feedback_digest(t): t for t in set(texts) if t}
+    if not by_digest:
+        return {}
+    ids = dict(FeedbackText.objects.filter(digest__in=list(by_digest)).values_list("digest", "pk"))
+    missing = [d for d in by_digest if d not in ids]
+    if missing:
+        # ignore_conflicts: parallele Requests dürfen denselben Text gleichzeitig anlegen
+        FeedbackText.objects.bulk_create(
+            [FeedbackText(digest=d, text=by_digest[d]) for d in missing], ignore_conflicts=True,
+        )
+        ids.update(FeedbackText.objects.filter(digest__in=missing).values_list("digest", "pk"))
+    return {by_digest[d]: pk for d, pk in ids.items()}
+
+
+def _parse_submitted_at(value):
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = parse_datetime(str(value or ""))
+        if dt is None:
+            return None
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def build_attempts(log_id, attempts, feedback_ids):
+    """Ungespeicherte Attempt-Objekte aus normalisierten Versuchs-Dicts (n, answer, feedback, ...)."""
+    from ..models import Attempt
+
+    return [
+        Attempt(
+            log_id=log_id,
+            n=idx,   # fortlaufend, passend zu uniq_attempt_log_n
+            answer=a.get("answer") or "",
+            feedback_id=feedback_ids.get(a.get("feedback") or ""),
+            is_correct=bool(a.get("is_correct", False)),
+            score=float(a.get("score", 0.0) or 0.0),
+            submitted_at=_parse_submitted_at(a.get("submitted_at")),
+        )
+        for idx, a in enumerate(attempts, start=1)
+    ]
+
+
+MAX_RETRIES = 3
+
+
+def save_questionlogs(entries):
+    """
+    entries = [(ungespeichertes QuestionLog, snapshot_values, [Versuchs-Dict, ...]), ...]
+    Konstante Anzahl Statements, egal wie viele Logs/Versuche: Snapshots, Logs, Feedbacktexte, Versuche.
+    Logs, die ein paralleler Request schon gespeichert hat (uniq_questionlog_run_item), werden
+    übersprungen; zurück kommen nur die hier gespeicherten.
+    """
+    from ..models import QuestionLog
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            return _save_questionlogs(entries)
+        except IntegrityError:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            # alles zurückgerollt → vorhandene Logs herausnehmen und neu versuchen
+            existing = set(QuestionLog.objects
+                           .filter(quiz_id__in={log.quiz_id for log, _, _ in entries},
+                                   item_id__in={log.item_id for log, _, _ in entries})
+                           .values_list("session_id", "quiz_id", "item_id"))
+            entries = [e for e in entries if (e[0].session_id, e[0].quiz_id, e[0].item_id) not in existing]
+
+
+def _save_questionlogs(entries):
+    from ..models import Attempt, QuestionLog
+
+    if not entries:
+        return []
+    with transaction.atomic():
+        snapshots = snapshot_ids([(log.item_id, values) for log, values, _ in entries])
+        for (log, _, _), snapshot_id in zip(entries, snapshots):
+            log.snapshot_id = snapshot_id
+        logs = QuestionLog.objects.bulk_create([log for log, _, _ in entries])
+        feedback_ids = intern_feedback(a.get("feedback") or "" for _, _, attempts in entries for a in attempts)
+        Attempt.objects.bulk_create([
+            row
+            for log, (_, _, attempts) in zip(logs, entries)
+            for row in build_attempts(log.pk, attempts, feedback_ids)
+        ])
+    return logs
@@ -0,0 +1,182 @@
+"""
+Massenbearbeitung von Quizfragen im Admin (Aktionen + CSV-Round-Trip).
+
+Alles läuft als queryset.update()/bulk_create()/bulk_update() – dabei feuern keine
+Signals, deshalb werden Fragen-Zähler und Content-Cache hier von Hand nachgezogen.
+"""
+import csv
+import io
+import uuid
+
+from django.db import transaction
+
+from . import search
+from .caching import bump_version
+from .counts import refresh_question_counts
+from .functions import prompt_fields
+from .permissions import allowed_kurs_ids
+
+
+CSV_FIELDS = ["item_id", "konzept_id", "title", "text", "question", "correct_answer",
+              "gemini_feedback", "feedback_prompt", "active"]
+BOOL_FIELDS = {"gemini_feedback", "active"}
+COPY_FIELDS = ["title", "text", "image", "question", "correct_answer", "gemini_feedback",
+               "feedback_prompt", "active", "reuse_threshold", "prompt_prefix", "prompt_digest"]
+PROMPT_FIELDS = {"text", "question", "correct_answer", "feedback_prompt"}
+
+_TRUE = {"1", "true", "ja", "yes", "x"}
+_FALSE = {"0", "false", "nein", "no", ""}
+
+BATCH_SIZE = 500
+
+
+def content_updated(konzept_ids):
+    """Nach Massenänderungen: Zähler der betroffenen Konzepte/Kurse + Seiten-Caches."""
+    refresh_question_counts(konzept_ids)
+    bump_version("content")
+
+
+def update_questions(qs, **changes):
+    """Ein UPDATE für alle Fragen in qs → Anzahl geänderter Zeilen."""
+    konzept_ids = set(qs.order_by().values_list("konzept_id", flat=True).distinct())
+    pks = list(qs.values_list("pk", flat=True)) if "konzept" in changes else []
+    with transaction.atomic():
+        n = qs.update(**changes)
+        if pks:
+            # Index kennt das Konzept der Frage (für die Konzeptsuche)
+            search.index_questions(qs.model.objects.filter(pk__in=pks))
+    if "konzept" in changes:
+        konzept_ids.add(changes["konzept"].pk)
+    if PROMPT_FIELDS & changes.keys():
+        refresh_prompt_prefixes(qs)
+    content_updated(konzept_ids)
+    return n
+
+
+def refresh_prompt_prefixes(qs):
+    """QuizQuestion.prompt_prefix nach queryset.update() neu berechnen (pre_save feuert dort nicht)."""
+    questions = list(qs.select_related(None).only("text", "question", "correct_answer", "feedback_prompt"))
+    for q in questions:
+        for field, value in prompt_fields(q).items():
+            setattr(q, field, value)
+    qs.model.objects.bulk_update(questions, ["prompt_prefix", "prompt_digest"], batch_size=BATCH_SIZE)
+
+
+def duplicate_questions(qs, konzept):
+    """Kopien (neue item_id) aller Fragen in qs im Konzept `konzept` anlegen, ein INSERT je Batch."""
+    from ..models import QuizQuestion
+
+    copies = [
+        QuizQuestion(konzept=konzept, **{f: getattr(q, f) for f in COPY_FIELDS})
+        for q in qs.select_related(None).only(*COPY_FIELDS)
+    ]
+    with transaction.atomic():
+        QuizQuestion.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+        search.index_questions(copies)
+    content_updated([konzept.pk])
+    return len(copies)
+
+
+def export_csv(qs):
+    """CSV (UTF-8 mit BOM, damit Excel Umlaute erkennt) für den Round-Trip."""
+    out = io.StringIO()
+    out.write("\ufeff")
+    writer = csv.writer(out)
+    writer.writerow(CSV_FIELDS)
+    for row in qs.order_by("konzept_id", "created_at").values_list(*CSV_FIELDS):
+        writer.writerow(["1" if v is True else "0" if v is False else v for v in row])
+    return out.getvalue()
+
+
+def _parse_bool(value):
+    v = (value or "").strip().lower()
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    raise ValueError(f"kein Wahrheitswert: {value!r}")
+
+
+def _read_rows(data):
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.DictReader(io.StringIO(text), dialect=dialect)
+
+
+def import_csv(data, user):
+    """
+    Änderungen aus einer exportierten (und bearbeiteten) CSV übernehmen.
+    Nur vorhandene Spalten werden geschrieben; Zeilen ohne Änderung werden übersprungen.
+    Alles-oder-nichts: bei Fehlern wird nichts gespeichert.
+    → (Anzahl geänderter Fragen, Liste von Fehlermeldungen)
+    """
+    from ..models import Konzepte, QuizQuestion
+
+    reader = _read_rows(data)
+    columns = [c for c in (reader.fieldnames or []) if c in CSV_FIELDS[1:]]
+    if "item_id" not in (reader.fieldnames or []):
+        return 0, ["Spalte 'item_id' fehlt."]
+
+    rows, errors = {}, []
+    for line, row in enumerate(reader, start=2):
+        try:
+            rows[uuid.UUID((row.get("item_id") or "").strip())] = (line, row)
+        except ValueError:
+            errors.append(f"Zeile {line}: ungültige item_id {row.get('item_id')!r}")
+
+    kurs_ids = allowed_kurs_ids(user)
+    questions = QuizQuestion.objects.filter(item_id__in=rows)
+    konzepte = Konzepte.objects.all()
+    if kurs_ids is not None:
+        questions = questions.filter(konzept__kurs_id__in=kurs_ids)
+        konzepte = konzepte.filter(kurs_id__in=kurs_ids)
+    by_item = {q.item_id: q for q in questions}
+    konzept_ids = set(konzepte.values_list("pk", flat=True)) if "konzept_id" in columns else set()
+
+    changed, fields, touched = [], set(), set()
+    for item_id, (line, row) in rows.items():
+        q = by_item.get(item_id)
+        if q is None:
+            errors.append(f"Zeile {line}: Frage {item_id} nicht gefunden oder nicht freigegeben.")
+            continue
+        old_konzept = q.konzept_id
+        diff = set()
+        for col in columns:
+            raw = row.get(col)
+            if raw is None:
+                continue
+            try:
+                if col in BOOL_FIELDS:
+                    value = _parse_bool(raw)
+                elif col == "konzept_id":
+                    value = uuid.UUID(raw.strip())
+                    if value not in konzept_ids:
+                        raise ValueError(f"Konzept {value} nicht freigegeben")
+                else:
+                    value = raw
+            except ValueError as e:
+                errors.append(f"Zeile {line}, {col}: {e}")
+                continue
+            if getattr(q, col) != value:
+                setattr(q, col, value)
+                diff.add(col)
+        if diff & PROMPT_FIELDS:
+            for field, value in prompt_fields(q).items():
+                setattr(q, field, value)
+            diff |= {"prompt_prefix", "prompt_digest"}
+        if diff:
+            changed.append(q)
+            fields |= diff
+            touched |= {old_konzept, q.konzept_id}
+
+    if errors:
+        return 0, errors
+    if changed:
+        with transaction.atomic():
+            QuizQuestion.objects.bulk_update(changed, sorted(fields), batch_size=BATCH_SIZE)
+            search.index_questions(changed)
+        content_updated(touched)
+    return len(changed), []
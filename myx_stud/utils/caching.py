@@ -0,0 +1,117 @@
+"""
+Versionierte Caches für selten geänderte Inhalte (Katalog, Kurs-/Konzeptseiten).
+
+Jeder Bereich hat einen Versionszähler (ms-Zeitstempel der letzten Änderung) im geteilten
+Cache `versions` (settings.CACHES); die Daten selbst liegen im Default-Cache des Workers.
+Signals (siehe signals.py) bumpen die Version beim Speichern im Admin; alte Einträge
+werden nicht gelöscht, sondern laufen unter ihrem alten Key einfach aus.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache, caches
+
+
+CATALOG_TIMEOUT = 60 * 60 * 24
+CONTENT_TIMEOUT = 60 * 60 * 24
+
+_VERSION_KEY = "myx:version:{}"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Aktuelle Version eines Bereichs; wird beim ersten Zugriff initialisiert."""
+    versions = caches["versions"]
+    key = _VERSION_KEY.format(name)
+    version = versions.get(key)
+    if version is None:
+        versions.add(key, _now_ms(), None)
+        version = versions.get(key)
+    return version
+
+
+def bump_version(name):
+    """Neue Version setzen (monoton, auch bei zwei Änderungen in derselben ms)."""
+    versions = caches["versions"]
+    key = _VERSION_KEY.format(name)
+    old = versions.get(key) or 0
+    versions.set(key, max(_now_ms(), old + 1), None)
+
+
+def version_datetime(version):
+    """Version (ms-Zeitstempel) als aware datetime, z. B. für Last-Modified."""
+    return datetime.fromtimestamp(version / 1000, tz=dt_timezone.utc)
+
+
+# =========================
+# Kurskatalog (Fach → Kurse)
+# =========================
+
+def get_catalog():
+    """
+    {"version": int, "faecher": {fach: [kurs, ...]}} – sortiert wie bisher per DB-order_by.
+    Ein Query pro Katalog-Version statt DISTINCT-Queries bei jedem Seitenaufruf.
+    """
+    from ..models import Kurse
+
+    version = get_version("catalog")
+    key = f"myx:catalog:{version}"
+    data = cache.get(key)
+    if data is None:
+        faecher = {}
+        for fach, kurs in Kurse.objects.order_by("fach", "kurs").values_list("fach", "kurs"):
+            faecher.setdefault(fach, []).append(kurs)   # (fach, kurs) ist unique
+        data = {"version": version, "faecher": faecher}
+        cache.set(key, data, CATALOG_TIMEOUT)
+    return data
+
+
+# =========================
+# Kurs-/Konzeptseiten (pro Objekt)
+# =========================
+
+def content_version():
+    """Version aller Seiteninhalte (Kurse, Konzepte, Quizfragen) – auch Teil der Fragment-Keys."""
+    return get_version("content")
+
+
+def _cached(key, build, version=None):
+    key = f"myx:{key}:{content_version() if version is None else version}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        if data is not None:          # 404er nicht cachen
+            cache.set(key, data, CONTENT_TIMEOUT)
+    return data
+
+
+def get_kurs_page(kurs_id, version=None):
+    """
+    (kurs, [konzepte]) oder None – ohne DB-Zugriff, solange sich der Inhalt nicht ändert.
+    version = schon gelesene content_version() (dieselbe wie für die Template-Fragmente).
+    """
+    from ..models import Kurse
+
+    def build():
+        k = Kurse.objects.filter(id=kurs_id).first()
+        if k is None:
+            return None
+        return k, list(k.konzepte.all())
+
+    return _cached(f"kurs:{kurs_id}", build, version)
+
+
+def get_konzept_page(konzept_id, version=None):
+    """(konzept, kurs, has_quiz) oder None."""
+    from ..models import Konzepte
+
+    def build():
+        k = Konzepte.objects.select_related("kurs").filter(id=konzept_id).first()
+        if k is None:
+            return None
+        return k, k.kurs, k.active_question_count > 0
+
+    return _cached(f"konzept:{konzept_id}", build, version)
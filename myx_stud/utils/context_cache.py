@@ -0,0 +1,98 @@
+"""
+Serverseitiges Context-Caching (Gemini) für den Prompt-Präfix einer Aufgabe.
+
+Der Präfix (Tutor-Anweisung, Aufgabentext, Frage, Lösung, Vorgaben) ist für alle Schüler
+gleich. Ab GEMINI_CONTEXT_CACHE_MIN_CHARS Zeichen (das Modell cacht erst ab einigen tausend
+Tokens) wird er einmal als CachedContent angelegt; danach geht pro Bewertung nur noch die
+Antwort raus. Cache-Namen liegen prozesslokal und im Django-Cache (für andere Worker).
+Mit GEMINI_STUB emuliert utils/gemini_stub.py dasselbe API.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+_KEY = "myx:gemini:ctx:{}"
+_EXPIRY_MARGIN_S = 60   # lokal etwas früher verwerfen als der Provider
+
+_local = {}             # digest → (CachedContent, Ablauf als time.monotonic())
+_lock = threading.Lock()
+
+stats = {"hits": 0, "created": 0, "errors": 0}
+
+
+def _api():
+    """(CachedContent, GenerativeModel) – echt oder Stub."""
+    if getattr(settings, "GEMINI_STUB", False):
+        from .gemini_stub import StubCachedContent, StubGenerativeModel
+        return StubCachedContent, StubGenerativeModel
+    from .functions import _genai
+    genai = _genai()
+    from google.generativeai import caching
+    return caching.CachedContent, genai.GenerativeModel
+
+
+def _ttl_s():
+    return int(getattr(settings, "GEMINI_CONTEXT_CACHE_TTL", 3600))
+
+
+def _remember(digest, cached, ttl_s):
+    _local[digest] = (cached, time.monotonic() + ttl_s - _EXPIRY_MARGIN_S)
+
+
+def _lookup(digest, CachedContent):
+    with _lock:
+        entry = _local.get(digest)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    name = cache.get(_KEY.format(digest))
+    if not name:
+        return None
+    try:
+        cached = CachedContent.get(name)   # von einem anderen Worker angelegt
+    except Exception:
+        cache.delete(_KEY.format(digest))
+        return None
+    with _lock:
+        _remember(digest, cached, _ttl_s())
+    return cached
+
+
+def _create(model_name, prefix, digest, CachedContent):
+    ttl_s = _ttl_s()
+    cached = CachedContent.create(
+        model=f"models/{model_name}",
+        display_name=f"myx-{digest[:16]}",
+        contents=[prefix],
+        ttl=timedelta(seconds=ttl_s),
+    )
+    cache.set(_KEY.format(digest), cached.name, max(ttl_s - _EXPIRY_MARGIN_S, 1))
+    with _lock:
+        _remember(digest, cached, ttl_s)
+    stats["created"] += 1
+    return cached
+
+
+def cached_model(model_name, prefix, digest):
+    """GenerativeModel auf dem gecachten Präfix – oder None (zu kurz, abgeschaltet, Fehler)."""
+    min_chars = int(getattr(settings, "GEMINI_CONTEXT_CACHE_MIN_CHARS", 0))
+    if min_chars <= 0 or len(prefix) < min_chars:
+        return None
+    CachedContent, GenerativeModel = _api()
+    try:
+        cached = _lookup(digest, CachedContent)
+        if cached is None:
+            cached = _create(model_name, prefix, digest, CachedContent)
+        else:
+            stats["hits"] += 1
+        return GenerativeModel.from_cached_content(cached)
+    except Exception:
+        stats["errors"] += 1
+        logger.warning("Context-Cache für %s nicht verfügbar, sende vollen Prompt", digest[:16], exc_info=True)
+        return None
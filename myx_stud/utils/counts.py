@@ -0,0 +1,35 @@
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def refresh_question_counts(konzept_ids=None, kurs_ids=()):
+    """
+    Rechnet Konzepte.active_question_count und Kurse.active_question_count neu.
+    konzept_ids=None → alle; kurs_ids = zusätzlich zu aktualisierende Kurse
+    (z. B. der alte Kurs eines verschobenen Konzepts).
+    Nach queryset.update()/bulk_create() auf QuizQuestion aufrufen – dort feuern keine Signals.
+    """
+    from ..models import Kurse, Konzepte, QuizQuestion
+
+    konzepte = Konzepte.objects.all()
+    kurse = Kurse.objects.all()
+    if konzept_ids is not None:
+        konzepte = konzepte.filter(pk__in=[k for k in konzept_ids if k])
+        kurs_ids = set(kurs_ids) | set(konzepte.values_list("kurs_id", flat=True))
+        kurse = kurse.filter(pk__in=kurs_ids)
+
+    active = (QuizQuestion.objects
+              .filter(konzept=OuterRef("pk"), active=True)
+              .order_by()
+              .values("konzept")
+              .annotate(c=Count("pk"))
+              .values("c"))
+    konzepte.update(active_question_count=Coalesce(Subquery(active), 0))
+
+    per_kurs = (Konzepte.objects
+                .filter(kurs=OuterRef("pk"))
+                .order_by()
+                .values("kurs")
+                .annotate(s=Sum("active_question_count"))
+                .values("s"))
+    kurse.update(active_question_count=Coalesce(Subquery(per_kurs), 0))
@@ -1,80 +1,258 @@
-import google.generativeai as genai
-import re
+import hashlib
+import logging
+import secrets
+
+from django.conf import settings
+
+from . import answer_reuse, perf
+from .context_cache import cached_model
+from .grading_batch import GradingBatcher
+
+
+logger = logging.getLogger(__name__)
 
 SCORE_THRESHOLD = 0.8  # ggf. anpassen
+MODEL_NAME = "gemini-2.0-flash"
 
 
-def get_gemini_feedback(text, question, user_answer, correct_answer, feedback_prompt):
-    """
-    Ruft Gemini auf und liefert:
-      {"feedback": <str>, "score": <float|None>, "error": <optional str>}
-    Parser erwartet Antwort im Format:
-        FEEDBACK: ...
-        SCORE: 0.87
-    und ist tolerant bzgl. Komma/Dezimalpunkt, zusätzlichem Text etc.
-    """
-    model = genai.GenerativeModel("gemini-2.0-flash")
+def _genai():
+    """google.generativeai erst beim ersten echten Aufruf laden (grpc/protobuf: ~1 s Importzeit)."""
+    import google.generativeai as genai
+    return genai
 
-    prompt = f"""
-        Du bist ein Tutor und gibst konstruktives, kurzes Feedback. 
-        Der Schüler darf seine Antwort nach deinem Feedback überarbeiten.
 
-        Aufgabentext: {text}
-        Frage: {question}
-        Antwort des Schülers: {user_answer}
-        Korrekte Antwort: {correct_answer}
+def _get_model(name):
+    """Echtes Gemini-Modell oder (settings.GEMINI_STUB) den Offline-Stub."""
+    if getattr(settings, "GEMINI_STUB", False):
+        from .gemini_stub import StubGenerativeModel
+        return StubGenerativeModel(name)
+    return _genai().GenerativeModel(name)
+
 
-        Erstelle dein Feedback nach diesen Vorgaben: {feedback_prompt}
+GRADING_INTRO = """
+        Du bist ein Tutor und gibst konstruktives, kurzes Feedback. 
+        Der Schüler darf seine Antwort nach deinem Feedback überarbeiten.
+"""
 
+SCORE_RULES = """
         Zusätzlich: Schätze die Korrektheit der Schüler-Antwort als Score zwischen 0 und 1:
         - 1.0 = vollkommen korrekt
         - 0.0 = völlig falsch
         - dazwischen = teilweise korrekt
+"""
+
+_batcher = None
+
+
+def _get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = GradingBatcher(_grade_answers)
+    # Settings bei jedem Aufruf übernehmen (override_settings in Tests/Benchmarks)
+    _batcher.window_ms = getattr(settings, "GEMINI_BATCH_WINDOW_MS", 0)
+    _batcher.max_batch = getattr(settings, "GEMINI_BATCH_MAX", 1)
+    return _batcher
+
 
-        Antworte AUSSCHLIESSLICH in genau diesem Format (ohne Zusatztext davor/danach):
+def _response_text(response):
+    """Text robust aus der Modell-Antwort extrahieren."""
+    text_out = (getattr(response, "text", None) or "").strip()
+    if not text_out and getattr(response, "candidates", None):
+        parts = []
+        for p in getattr(response.candidates[0].content, "parts", []):
+            t = getattr(p, "text", None)
+            if t:
+                parts.append(t)
+        text_out = "\n".join(parts).strip()
+    return text_out
 
-        FEEDBACK: <dein kurzer Feedbacktext>
-        SCORE: <Zahl zwischen 0 und 1>
+
+def build_prompt_prefix(text, question, correct_answer, feedback_prompt):
+    """
+    Für alle Schüler gleicher Prompt-Anfang einer Aufgabe (Tutor-Anweisung, Aufgabe, Lösung,
+    Vorgaben). Wird beim Speichern der Frage vorberechnet (QuizQuestion.prompt_prefix) und bei
+    langen Texten serverseitig gecacht; pro Aufruf kommt nur noch die Antwort dazu.
+    """
+    return f"""
+        {GRADING_INTRO.strip()}
+
+        Aufgabentext: {text or ""}
+        Frage: {question or ""}
+        Korrekte Antwort: {correct_answer or ""}
+
+        Erstelle dein Feedback nach diesen Vorgaben: {feedback_prompt or ""}
+
+        {SCORE_RULES.strip()}
+        """.strip()
+
+
+def prompt_digest(prefix):
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def prompt_fields(q):
+    """{"prompt_prefix", "prompt_digest"} für eine QuizQuestion (pre_save-Signal, Bulk-Pfade)."""
+    prefix = build_prompt_prefix(q.text, q.question, q.correct_answer, q.feedback_prompt)
+    return {"prompt_prefix": prefix, "prompt_digest": prompt_digest(prefix)}
+
+
+def _single_prompt(user_answer):
+    """Variabler Teil für eine Antwort (hängt hinter dem Präfix)."""
+    return f"""
+        Antwort des Schülers: {user_answer}
+
+        Antworte als JSON-Objekt mit "feedback" (dein kurzer Feedbacktext, höchstens drei Sätze)
+        und "score" (Zahl zwischen 0 und 1).
         """.strip()
 
-    def _clamp_score(x):
+
+def _batch_prompt(answers, marker):
+    """
+    Variabler Teil für mehrere Schülerantworten zur selben Aufgabe. Einträge sind mit einem
+    zufälligen Marker nummeriert, damit eine Antwort keine fremden Einträge vortäuschen kann.
+    """
+    listed = "\n".join(
+        f"        [{marker}-{i}] {' '.join((a or '').split())}" for i, a in enumerate(answers, start=1)
+    )
+    return f"""
+        Bewerte JEDE der folgenden Antworten verschiedener Schüler einzeln.
+        Antworten der Schüler:
+{listed}
+
+        Antworte als JSON-Objekt {{"results": [...]}} mit einem Eintrag je Antwort in derselben
+        Reihenfolge: "id" (die Nummer in eckigen Klammern, z. B. "{marker}-1"), "feedback"
+        (kurzer Feedbacktext, höchstens drei Sätze) und "score" (Zahl zwischen 0 und 1).
+        """.strip()
+
+
+def _repair_prompt(text_out, error):
+    """Kurzer Reparatur-Auftrag: nur die kaputte Ausgabe, nicht der ganze Aufgaben-Prompt."""
+    return f"""
+        Die folgende Ausgabe entspricht nicht dem geforderten JSON-Schema ({error}).
+        Gib denselben Inhalt als gültiges JSON nach dem Schema zurück, ohne Zusatztext.
+        Kürze das Feedback falls nötig auf höchstens drei Sätze.
+
+        Ausgabe:
+        {text_out[:4000]}
+        """.strip()
+
+
+def _generation_config(schema, n=1):
+    """JSON-Modus mit Schema; Ausgabe auf GEMINI_MAX_OUTPUT_TOKENS je Antwort begrenzt."""
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": schema,
+        "max_output_tokens": getattr(settings, "GEMINI_MAX_OUTPUT_TOKENS", 256) * n,
+    }
+
+
+def _generate(model, prompt, schema, parse, n=1):
+    """
+    Ein begrenzter Aufruf, Antwort gegen das Schema prüfen; ist sie ungültig, genau ein
+    Reparatur-Aufruf. → geparstes Ergebnis oder None
+    """
+    from . import grading_schema   # pydantic erst beim ersten Bewerten laden
+
+    config = _generation_config(schema, n)
+    text_out = _response_text(model.generate_content(prompt, generation_config=config))
+    result, error = parse(text_out)
+    if result is not None:
+        return result
+
+    logger.warning("Ungültige Bewertungsausgabe (%s), Reparatur-Aufruf", error)
+    try:
+        repaired = _response_text(_get_model(MODEL_NAME).generate_content(
+            _repair_prompt(text_out, error), generation_config=config,
+        ))
+        result, error = parse(repaired)
+    except Exception as e:
+        result, error = None, str(e)
+    grading_schema.stats["repaired" if result is not None else "failed"] += 1
+    if result is None:
+        logger.warning("Reparatur fehlgeschlagen: %s", error)
+    return result
+
+
+def _error_feedback(e):
+    return {"feedback": "We had trouble generating feedback. Try again later.", "score": None, "error": str(e)}
+
+
+def _grade_answers(item, answers):
+    """
+    item = (Digest, Präfix). Eine Antwort → Einzel-Prompt; mehrere → ein Batch-Prompt
+    (Lücken einzeln nachbewerten). Ist der Präfix serverseitig gecacht, geht nur der variable Teil raus.
+    """
+    from . import grading_schema
+
+    digest, prefix = item
+    model = cached_model(MODEL_NAME, prefix, digest)
+    if model is None:
+        model = _get_model(MODEL_NAME)
+
+        def prompt(suffix):
+            return f"{prefix}\n\n{suffix}"
+    else:
+        def prompt(suffix):
+            return suffix
+
+    if len(answers) == 1:
         try:
-            v = float(x)
-        except (TypeError, ValueError):
-            return None
-        if v < 0.0:
-            v = 0.0
-        if v > 1.0:
-            v = 1.0
-        return v
+            result = _generate(model, prompt(_single_prompt(answers[0])),
+                               grading_schema.GRADING_SCHEMA, grading_schema.parse_grading)
+        except Exception as e:
+            return [_error_feedback(e)]
+        return [result or _error_feedback("ungültige Modellausgabe")]
 
+    marker = secrets.token_hex(3)
     try:
-        response = model.generate_content(prompt)
-        # Text robust extrahieren
-        text_out = (getattr(response, "text", None) or "").strip()
-        if not text_out and getattr(response, "candidates", None):
-            parts = []
-            for p in getattr(response.candidates[0].content, "parts", []):
-                t = getattr(p, "text", None)
-                if t:
-                    parts.append(t)
-            text_out = "\n".join(parts).strip()
-
-        # FEEDBACK:
-        fb_match = re.search(r"FEEDBACK:\s*(.*?)(?=SCORE:|$)", text_out, re.S | re.IGNORECASE)
-        feedback = (fb_match.group(1).strip() if fb_match else "") or "Feedback konnte nicht extrahiert werden."
-
-        # SCORE:
-        score_match = re.search(r"SCORE:\s*([-+]?\d*[\.,]?\d+)", text_out, re.IGNORECASE)
-        score = None
-        if score_match:
-            raw = score_match.group(1).replace(",", ".")
-            score = _clamp_score(raw)
-
-        return {"feedback": feedback, "score": score}
+        parsed = _generate(model, prompt(_batch_prompt(answers, marker)), grading_schema.BATCH_SCHEMA,
+                           lambda text: grading_schema.parse_batch(text, marker, len(answers)),
+                           n=len(answers)) or {}
+    except Exception:
+        parsed = {}
+
+    results = []
+    for i, answer in enumerate(answers, start=1):
+        if i in parsed:
+            results.append(parsed[i])
+        else:
+            results.extend(_grade_answers(item, [answer]))
+    return results
 
+
+def get_gemini_feedback(text, question, user_answer, correct_answer, feedback_prompt,
+                        prefix=None, digest=None, reuse_threshold=None):
+    """
+    Ruft Gemini auf und liefert:
+      {"feedback": <str>, "score": <float|None>, "error": <optional str>}
+    Das Modell antwortet im JSON-Modus ({"feedback", "score"}, utils/grading_schema.py);
+    ungültige Ausgaben bekommen einen Reparatur-Aufruf, danach gibt es eine Fehlermeldung.
+    prefix/digest = vorberechneter Prompt-Anfang der Frage (QuizQuestion.prompt_prefix), sonst neu gebaut.
+    Gleichzeitige Aufrufe zur selben Aufgabe werden gebündelt (utils/grading_batch.py).
+    Ist schon eine ähnliche Antwort bewertet (≥ reuse_threshold, utils/answer_reuse.py),
+    kommt deren Bewertung ohne Modell-Aufruf zurück.
+    """
+    if not prefix:
+        prefix = build_prompt_prefix(text, question, correct_answer, feedback_prompt)
+        digest = None
+    item = (digest or prompt_digest(prefix), prefix)
+    threshold = answer_reuse.threshold_for(reuse_threshold)
+    reused = answer_reuse.lookup(item[0], user_answer, threshold)
+    if reused is not None:
+        return reused
+    try:
+        with perf.timed("llm"):
+            result = _get_batcher().grade(item, user_answer)
     except Exception as e:
-        return {"feedback": "We had trouble generating feedback. Try again later.", "score": None, "error": str(e)}
+        return _error_feedback(e)
+    if threshold:
+        answer_reuse.remember(item[0], user_answer, result)
+    return result
+
+
+def normalize_answer(answer):
+    """Vergleichsform für statisch bewertete Antworten (muss zu offline_quiz im Browser passen)."""
+    return (answer or "").strip().lower()
 
 
 def get_feedback_unified(current_question, user_answer):
@@ -95,6 +273,9 @@ def get_feedback_unified(current_question, user_answer):
             user_answer or "",
             getattr(current_question, "correct_answer", "") or "",
             getattr(current_question, "feedback_prompt", "") or "",
+            prefix=getattr(current_question, "prompt_prefix", "") or None,
+            digest=getattr(current_question, "prompt_digest", "") or None,
+            reuse_threshold=getattr(current_question, "reuse_threshold", None),
         )
 
         score = fb.get("score")
@@ -108,8 +289,8 @@ def get_feedback_unified(current_question, user_answer):
         }
 
     # --- Fallback (exakter Vergleich) ---
-    ua = (user_answer or "").strip().lower()
-    ca = (getattr(current_question, "correct_answer", "") or "").strip().lower()
+    ua = normalize_answer(user_answer)
+    ca = normalize_answer(getattr(current_question, "correct_answer", ""))
     is_correct = (ua == ca)
 
     return {
@@ -0,0 +1,133 @@
+"""
+Offline-Ersatz für google.generativeai.GenerativeModel (Benchmarks, Tests, Entwicklung ohne Key).
+
+Aktiv, wenn settings.GEMINI_STUB = True. Liefert deterministisches Feedback im selben
+Format wie das echte Modell (JSON bei response_mime_type="application/json") und kann per
+GEMINI_STUB_LATENCY_MS eine Provider-Latenz, per GEMINI_STUB_INVALID_EVERY kaputte Ausgaben
+(für den Reparatur-Pfad) simulieren.
+Context-Caching (utils/context_cache.py) wird mit StubCachedContent nachgebildet: der gecachte
+Präfix wird vor den gesendeten Prompt gestellt, gezählt wird nur, was tatsächlich gesendet wurde.
+"""
+import json
+import re
+import time
+
+from django.conf import settings
+
+
+def _extract(label, prompt):
+    m = re.search(rf"{label}:\s*(.*)", prompt)
+    return (m.group(1).strip() if m else "")
+
+
+def _norm(s):
+    return re.sub(r"[^\w\s]", "", (s or "").lower()).split()
+
+
+def _grade(answer, correct):
+    if not correct:
+        score = 0.5
+    else:
+        score = len(set(answer) & set(correct)) / len(set(correct))
+    feedback = "Sehr gut!" if score > 0.8 else "Schau dir die Aufgabe noch einmal genau an."
+    return {"feedback": feedback, "score": round(score, 2)}
+
+
+def _text(result):
+    return f"FEEDBACK: {result['feedback']}\nSCORE: {result['score']:.2f}"
+
+
+def _repair(prompt):
+    """Reparatur-Prompt (utils/functions._repair_prompt): kaputtes JSON wieder geradebiegen."""
+    broken = prompt.split("Ausgabe:", 1)[1].strip()
+    return json.loads(re.sub(r",\s*([}\]])", r"\1", broken))
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = []
+
+
+class StubCachedContent:
+    """Minimal-API wie google.generativeai.caching.CachedContent (create/get)."""
+
+    _store = {}    # name → gecachter Text
+    created = 0
+
+    def __init__(self, name, model, text):
+        self.name = name
+        self.model = model
+        self.text = text
+
+    @classmethod
+    def create(cls, model, contents, ttl=None, display_name=None, **kwargs):
+        cls.created += 1
+        name = f"cachedContents/stub-{cls.created}"
+        cls._store[name] = "\n".join(contents)
+        return cls(name, model, cls._store[name])
+
+    @classmethod
+    def get(cls, name):
+        return cls(name, "stub", cls._store[name])   # KeyError wie NotFound beim Provider
+
+
+class StubGenerativeModel:
+    """Minimal-API wie genai.GenerativeModel: generate_content(prompt) und from_cached_content."""
+
+    calls = 0             # Zähler über alle Instanzen (für Benchmarks)
+    batched_answers = 0   # davon per Batch-Prompt bewertete Antworten
+    prompt_chars = 0      # tatsächlich gesendete Prompt-Zeichen
+    cached_chars = 0      # aus dem Context-Cache gelesene Zeichen
+    responses = 0         # Antworten insgesamt (Zähler für GEMINI_STUB_INVALID_EVERY)
+    repairs = 0           # davon Reparatur-Aufrufe
+
+    def __init__(self, model_name="stub", **kwargs):
+        self.model_name = model_name
+        self.cached_text = ""
+
+    @classmethod
+    def from_cached_content(cls, cached_content, **kwargs):
+        model = cls(cached_content.model)
+        model.cached_text = cached_content.text
+        return model
+
+    def generate_content(self, prompt, **kwargs):
+        StubGenerativeModel.calls += 1
+        StubGenerativeModel.prompt_chars += len(prompt)
+        StubGenerativeModel.cached_chars += len(self.cached_text)
+        latency_ms = getattr(settings, "GEMINI_STUB_LATENCY_MS", 0)
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        if self.cached_text:
+            prompt = f"{self.cached_text}\n\n{prompt}"
+
+        config = kwargs.get("generation_config") or {}
+        as_json = config.get("response_mime_type") == "application/json"
+        StubGenerativeModel.responses += 1
+
+        if as_json and "entspricht nicht dem geforderten JSON-Schema" in prompt:
+            StubGenerativeModel.repairs += 1
+            return StubResponse(json.dumps(_repair(prompt), ensure_ascii=False))
+
+        correct = _norm(_extract("Korrekte Antwort", prompt))
+
+        # Batch-Prompt (utils/functions._batch_prompt): "[marker-i] Antwort" je Zeile
+        batch = re.findall(r"^\s*\[(\w+-\d+)\]\s*(.*)$", prompt, re.M)
+        if batch:
+            StubGenerativeModel.batched_answers += len(batch)
+            results = [(label, _grade(_norm(answer), correct)) for label, answer in batch]
+            if not as_json:
+                return StubResponse("\n".join(f"### {label}\n{_text(r)}" for label, r in results))
+            out = {"results": [{"id": label, **r} for label, r in results]}
+        else:
+            result = _grade(_norm(_extract("Antwort des Schülers", prompt)), correct)
+            if not as_json:
+                return StubResponse(_text(result))
+            out = result
+
+        text = json.dumps(out, ensure_ascii=False)
+        every = getattr(settings, "GEMINI_STUB_INVALID_EVERY", 0)
+        if every and StubGenerativeModel.responses % every == 0:
+            text = text[:-1] + ",}"   # wie ein Modell, das sich nicht ganz ans Schema hält
+        return StubResponse(text)
@@ -0,0 +1,98 @@
+"""
+Micro-Batching für Gemini-Bewertungen derselben Aufgabe.
+
+Schickt eine Klasse gleichzeitig Antworten zur selben Aufgabe, sammelt der erste Request
+("Leader") GEMINI_BATCH_WINDOW_MS lang weitere Antworten ein und bewertet alle mit EINEM
+Prompt; die übrigen Requests warten auf ihr Teilergebnis. Wirkt pro Prozess über Threads
+(runserver, gunicorn --threads); bei reinen Sync-Workern bleibt es beim Einzelaufruf.
+Gab es im Prozess in der letzten Minute keine gleichzeitigen Bewertungen (z. B. Sync-Worker
+mit einem Request pro Prozess), wartet der Leader nicht erst das Fenster ab – dazustoßen
+könnte ohnehin niemand.
+"""
+import threading
+import time
+
+
+CONCURRENCY_MEMORY_S = 60
+
+
+class _Batch:
+    def __init__(self):
+        self.answers = []
+        self.results = None
+        self.error = None
+        self.closed = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class GradingBatcher:
+    """
+    grade_fn(item, answers) → Liste von Ergebnissen in derselben Reihenfolge wie answers.
+    item muss hashbar sein (z. B. Tupel aus Prompt-Digest und Prompt-Präfix der Aufgabe).
+    """
+
+    def __init__(self, grade_fn, window_ms=200, max_batch=10, wait_timeout_s=60):
+        self.grade_fn = grade_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.wait_timeout_s = wait_timeout_s
+        self._lock = threading.Lock()
+        self._open = {}
+        self._inflight = 0                                   # laufende grade()-Aufrufe
+        self._concurrent_at = -CONCURRENCY_MEMORY_S - 1.0    # zuletzt mehrere gleichzeitig
+        self.batches = 0
+        self.answers = 0
+
+    def grade(self, item, answer):
+        if self.window_ms <= 0 or self.max_batch <= 1:
+            return self.grade_fn(item, [answer])[0]
+
+        with self._lock:
+            self._inflight += 1
+            if self._inflight > 1:
+                self._concurrent_at = time.monotonic()
+        try:
+            return self._grade(item, answer)
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _grade(self, item, answer):
+        with self._lock:
+            batch = self._open.get(item)
+            leader = batch is None or batch.closed or len(batch.answers) >= self.max_batch
+            if leader:
+                batch = _Batch()
+                self._open[item] = batch
+            position = len(batch.answers)
+            batch.answers.append(answer)
+            if len(batch.answers) >= self.max_batch:
+                batch.full.set()   # voll → Leader muss nicht bis zum Fensterende warten
+
+        if leader:
+            self._lead(item, batch)
+        elif not batch.done.wait(self.wait_timeout_s):
+            raise TimeoutError("Bewertung im Batch hat zu lange gedauert.")
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[position]
+
+    def _lead(self, item, batch):
+        with self._lock:
+            concurrent = time.monotonic() - self._concurrent_at < CONCURRENCY_MEMORY_S
+        if concurrent:
+            batch.full.wait(self.window_ms / 1000)
+        with self._lock:
+            batch.closed = True
+            if self._open.get(item) is batch:
+                del self._open[item]
+            self.batches += 1
+            self.answers += len(batch.answers)
+        try:
+            batch.results = self.grade_fn(item, list(batch.answers))
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
@@ -0,0 +1,108 @@
+"""
+Strukturierte Bewertungsausgabe des Modells (JSON-Modus statt FEEDBACK:/SCORE:-Freitext).
+
+GRADING_SCHEMA/BATCH_SCHEMA gehen als response_schema an Gemini, die Antwort wird mit den
+pydantic-Modellen geprüft. Ungültige Ausgaben (abgeschnitten, falsches Format) werden in
+`stats` gezählt und bekommen in utils/functions.py genau einen Reparatur-Aufruf.
+"""
+import re
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+
+GRADING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {"type": "string"},
+        "score": {"type": "number"},
+    },
+    "required": ["feedback", "score"],
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "feedback": {"type": "string"},
+                    "score": {"type": "number"},
+                },
+                "required": ["id", "feedback", "score"],
+            },
+        },
+    },
+    "required": ["results"],
+}
+
+# responses = geprüfte Modell-Antworten, invalid = davon ungültig,
+# repaired/failed = Ausgang des Reparatur-Aufrufs
+stats = {"responses": 0, "invalid": 0, "repaired": 0, "failed": 0}
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.S)
+
+
+class Grading(BaseModel):
+    feedback: str = Field(min_length=1)
+    score: float
+
+    @field_validator("feedback")
+    @classmethod
+    def _strip(cls, v):
+        v = v.strip()
+        if not v:
+            raise ValueError("leeres Feedback")
+        return v
+
+    @field_validator("score")
+    @classmethod
+    def _clamp(cls, v):
+        return min(1.0, max(0.0, v))
+
+
+class BatchGrading(Grading):
+    id: str
+
+
+class BatchResult(BaseModel):
+    results: list[BatchGrading]
+
+
+def _unfence(text):
+    m = _FENCE_RE.match(text or "")
+    return m.group(1) if m else (text or "")
+
+
+def validate(model, text):
+    """(Objekt, None) oder (None, Fehlertext) – zählt jede geprüfte Antwort in stats."""
+    stats["responses"] += 1
+    try:
+        return model.model_validate_json(_unfence(text)), None
+    except ValidationError as e:
+        stats["invalid"] += 1
+        return None, "; ".join(f"{'.'.join(map(str, err['loc'])) or 'json'}: {err['msg']}"
+                               for err in e.errors()[:3])
+
+
+def parse_grading(text):
+    """→ ({"feedback", "score"} oder None, Fehlertext)"""
+    obj, error = validate(Grading, text)
+    if obj is None:
+        return None, error
+    return {"feedback": obj.feedback, "score": obj.score}, None
+
+
+def parse_batch(text, marker, n):
+    """→ ({Nummer: Ergebnis} für alle Einträge mit gültigem Marker oder None, Fehlertext)"""
+    obj, error = validate(BatchResult, text)
+    if obj is None:
+        return None, error
+    results = {}
+    for entry in obj.results:
+        m = re.fullmatch(rf"\s*{re.escape(marker)}-(\d+)\s*", entry.id)
+        if m and 1 <= int(m.group(1)) <= n and int(m.group(1)) not in results:
+            results[int(m.group(1))] = {"feedback": entry.feedback, "score": entry.score}
+    return results, None
@@ -0,0 +1,157 @@
+"""
+Bild-Varianten für Uploads (Kurse.image, Konzepte.image, QuizQuestion.image).
+
+Zu jedem Original entstehen verkleinerte WebP- (und, falls Pillow es kann, AVIF-)Dateien:
+    quiz_images/skateboard.jpg → quiz_images/variants/skateboard.jpg.640w.webp
+Die Endung des Originals bleibt im Namen, damit foo.png und foo.jpg nicht kollidieren.
+Erzeugt wird nach dem Speichern im Hintergrund-Thread (schedule_variants); das Template-Tag
+`responsive_img` (templatetags/media_tags.py) baut daraus <picture>/srcset.
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .caching import bump_version
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+QUALITY = {"webp": 80, "avif": 60}
+
+_executor = None
+
+
+def variant_widths():
+    return tuple(getattr(settings, "IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS))
+
+
+def variant_formats():
+    """Bevorzugte Reihenfolge für <source>: AVIF vor WebP."""
+    from PIL import features   # Pillow erst bei Bedarf laden (Importzeit beim Worker-Start)
+
+    formats = []
+    if features.check("avif"):
+        formats.append("avif")
+    if features.check("webp"):
+        formats.append("webp")
+    return formats
+
+
+def variant_name(name, width, fmt):
+    folder, filename = os.path.split(name)
+    return f"{folder}/variants/{filename}.{width}w.{fmt}" if folder else f"variants/{filename}.{width}w.{fmt}"
+
+
+def _target_widths(original_width):
+    """Nur verkleinern; ist das Original schmaler als alle Stufen, eine Variante in Originalbreite."""
+    widths = [w for w in variant_widths() if w < original_width]
+    return widths or [original_width]
+
+
+def generate_variants(name, storage=None):
+    """Erzeugt alle Varianten zu `name` (überschreibt vorhandene). Gibt die Variantennamen zurück."""
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    with storage.open(name, "rb") as fh:
+        img = Image.open(fh)
+        img.load()
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    created = []
+    for width in _target_widths(img.width):
+        resized = img
+        if width < img.width:
+            height = round(img.height * width / img.width)
+            resized = img.resize((width, height), Image.LANCZOS)
+        for fmt in variant_formats():
+            buf = BytesIO()
+            resized.save(buf, format=fmt.upper(), quality=QUALITY[fmt])
+            vname = variant_name(name, width, fmt)
+            if storage.exists(vname):
+                storage.delete(vname)
+            created.append(storage.save(vname, ContentFile(buf.getvalue())))
+    return created
+
+
+def get_variants(name, storage=None):
+    """{fmt: [(url, width), ...]} für alle vorhandenen Varianten (leer, solange noch nichts erzeugt ist)."""
+    storage = storage or default_storage
+    folder, filename = os.path.split(name)
+    vdir = f"{folder}/variants" if folder else "variants"
+    try:
+        _, files = storage.listdir(vdir)    # ein Verzeichnis-Listing statt exists() pro Variante
+    except (FileNotFoundError, NotImplementedError):
+        return {}
+
+    pattern = re.compile(rf"^{re.escape(filename)}\.(\d+)w\.(\w+)$")
+    formats = variant_formats()
+    found = {}
+    for f in files:
+        m = pattern.match(f)
+        if m and m.group(2) in formats:
+            found.setdefault(m.group(2), []).append((storage.url(f"{vdir}/{f}"), int(m.group(1))))
+    for entries in found.values():
+        entries.sort(key=lambda e: e[1])
+    return {fmt: found[fmt] for fmt in formats if fmt in found}
+
+
+def delete_variants(name, storage=None):
+    """Entfernt alle Varianten zu `name` (z. B. wenn das Original verschoben/gelöscht wurde)."""
+    storage = storage or default_storage
+    for entries in get_variants(name, storage).values():
+        for url, width in entries:
+            for fmt in variant_formats():
+                vname = variant_name(name, width, fmt)
+                if storage.exists(vname):
+                    storage.delete(vname)
+
+
+def file_digest(name, storage=None):
+    """SHA-256 des Dateiinhalts (hex), blockweise gelesen."""
+    storage = storage or default_storage
+    h = hashlib.sha256()
+    with storage.open(name, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def shared_name(name, digest):
+    """Inhaltsadressierter Speicherpfad: quiz_images/freibad.jpg → quiz_images/<hash16>.jpg"""
+    folder, filename = os.path.split(name)
+    ext = os.path.splitext(filename)[1].lower()
+    base = f"{digest[:16]}{ext}"
+    return f"{folder}/{base}" if folder else base
+
+
+def _run(name):
+    try:
+        generate_variants(name)
+    except Exception:
+        logger.exception("Bild-Varianten für %s fehlgeschlagen", name)
+        return
+    # Seiten-Fragmente, die vorher nur ein <img> ohne Varianten gecacht haben, neu rendern
+    bump_version("content")
+
+
+def schedule_variants(name):
+    """Varianten im Hintergrund erzeugen (IMAGE_VARIANTS_SYNC=True → sofort, z. B. in Tests)."""
+    global _executor
+    if getattr(settings, "IMAGE_VARIANTS_SYNC", False):
+        _run(name)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, "IMAGE_WORKERS", 1),
+                                       thread_name_prefix="myx-images")
+    _executor.submit(_run, name)
@@ -0,0 +1,66 @@
+"""
+Rasch-Modell (1PL) für die Kalibrierung der Aufgaben (management/commands/calibrate_items.py).
+Importiert numpy auf Modulebene – nur lazy aus dem Command laden.
+
+P(richtig | Lernender i, Aufgabe j) = σ(θ_i − b_j)
+
+Die Antwortmatrix ist dünn besetzt und liegt im COO-Format vor: je belegter Zelle
+(Zeile, Spalte, Versuche, davon richtig). Geschätzt wird per Joint-Maximum-Likelihood mit
+schwachem Normal-Prior (MAP), damit Lernende/Aufgaben mit nur richtigen oder nur falschen
+Antworten endliche Werte bekommen. Jede Iteration ist ein vektorisierter Newton-Schritt
+für alle θ und alle b (np.bincount über die Zellen); die b werden auf Mittelwert 0 zentriert.
+"""
+import numpy as np
+
+
+PRIOR_SD = 3.0
+MAX_STEP = 1.0   # Logits je Iteration (dämpft die ersten Schritte)
+
+
+def aggregate(rows, cols, correct):
+    """
+    Rohe Antworten (ggf. mehrfach je Zelle) → COO-Zellen (rows, cols, n, k).
+    rows/cols: int-Arrays, correct: bool/0-1-Array gleicher Länge.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    n_cols = int(cols.max()) + 1 if len(cols) else 1
+    keys, inverse = np.unique(rows * n_cols + cols, return_inverse=True)
+    n = np.bincount(inverse).astype(np.float64)
+    k = np.bincount(inverse, weights=np.asarray(correct, dtype=np.float64))
+    return keys // n_cols, keys % n_cols, n, k
+
+
+def _residuals(theta, b, rows, cols, n, k):
+    """Je Zelle: beobachtet − erwartet und Information n·p·(1−p)."""
+    p = 1.0 / (1.0 + np.exp(b[cols] - theta[rows]))
+    return k - n * p, n * p * (1.0 - p)
+
+
+def fit_rasch(rows, cols, n, k, n_rows=None, n_cols=None, max_iter=100, tol=1e-4):
+    """COO-Zellen → (θ je Zeile, b je Spalte, Iterationen, konvergiert?)"""
+    n_rows = n_rows or int(rows.max()) + 1
+    n_cols = n_cols or int(cols.max()) + 1
+    theta = np.zeros(n_rows)
+    b = np.zeros(n_cols)
+    prior = 1.0 / PRIOR_SD ** 2
+
+    for it in range(1, max_iter + 1):
+        resid, info = _residuals(theta, b, rows, cols, n, k)
+        d_theta = np.clip((np.bincount(rows, resid, n_rows) - prior * theta)
+                          / (np.bincount(rows, info, n_rows) + prior), -MAX_STEP, MAX_STEP)
+        theta += d_theta
+
+        resid, info = _residuals(theta, b, rows, cols, n, k)
+        d_b = np.clip((-np.bincount(cols, resid, n_cols) - prior * b)
+                      / (np.bincount(cols, info, n_cols) + prior), -MAX_STEP, MAX_STEP)
+        b += d_b
+
+        # Änderung erst nach dem Zentrieren messen: die Verschiebung, die der Prior auf θ
+        # jede Runde anstößt, nimmt das Zentrieren wieder zurück
+        shift = b.mean()
+        b -= shift
+        theta -= shift
+        if max(np.abs(d_theta - shift).max(), np.abs(d_b - shift).max()) < tol:
+            return theta, b, it, True
+    return theta, b, max_iter, False
@@ -0,0 +1,147 @@
+"""
+Dauerhafter Lernstand pro Lernendem (statt nur in der Session).
+
+- ItemMastery: Wiederholungsplan je Aufgabe nach SM-2 (E-Faktor, Intervall) mit Leitner-Box
+  zur Anzeige; "was ist fällig?" ist eine Range-Abfrage auf dem Index (learner_key, due_at).
+- KonzeptMastery: letzter Konzept-Score (0..100) aus quiz_complete bzw. Offline-Sync.
+
+Lernende werden über ein langlebiges, signiertes Cookie erkannt (LearnerMiddleware),
+angemeldete Benutzer über ihre ID.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+LEARNER_COOKIE = "myx_learner"
+LEARNER_COOKIE_AGE = 60 * 60 * 24 * 365
+
+MAX_BOX = 5
+MIN_EASINESS = 1.3
+DUE_LIMIT = 50
+
+_STATE_FIELDS = ["konzept_id", "box", "easiness", "interval_days", "repetitions",
+                 "last_score", "last_seen_at", "due_at"]
+
+
+def learner_key(request):
+    """
+    Schlüssel des Lernenden: "user:<pk>" oder "anon:<Cookie>". Fehlt das Cookie, wird eins
+    vergeben, das die LearnerMiddleware an die Antwort hängt.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    cookie = getattr(request, "learner_cookie", None) or getattr(request, "new_learner_cookie", None)
+    if not cookie:
+        cookie = request.new_learner_cookie = uuid.uuid4().hex
+    return f"anon:{cookie}"
+
+
+def _quality(score):
+    """Score 0..1 → SM-2-Qualität 0..5."""
+    return max(0, min(5, int(round(float(score or 0.0) * 5))))
+
+
+def schedule(m, score, now):
+    """SM-2-Schritt auf einem ItemMastery-Objekt (ungespeichert)."""
+    q = _quality(score)
+    if q < 3:
+        m.repetitions = 0
+        m.interval_days = 1.0
+    else:
+        m.repetitions += 1
+        if m.repetitions == 1:
+            m.interval_days = 1.0
+        elif m.repetitions == 2:
+            m.interval_days = 6.0
+        else:
+            m.interval_days = round(m.interval_days * m.easiness, 1)
+    m.easiness = max(MIN_EASINESS, m.easiness + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    m.box = min(m.repetitions, MAX_BOX)
+    m.last_score = float(score or 0.0)
+    m.last_seen_at = now
+    m.due_at = now + timedelta(days=m.interval_days)
+    return m
+
+
+def record_results(key, results, now=None):
+    """
+    results = [(item_id, konzept_id, score), ...] – je bearbeiteter Aufgabe der letzte Score.
+    Ein SELECT + höchstens ein Upsert und ein bulk_update. select_for_update sperrt nur
+    vorhandene Zeilen (unter SQLite gar nichts) – legt ein paralleler Request dieselbe
+    (learner_key, item_id) zuerst an, überschreibt der Upsert sie statt an der
+    UniqueConstraint zu scheitern.
+    """
+    from ..models import ItemMastery
+
+    if not results:
+        return
+    now = now or timezone.now()
+    results = {str(item_id): (konzept_id, score) for item_id, konzept_id, score in results}
+    with transaction.atomic():
+        existing = {m.item_id: m for m in (ItemMastery.objects
+                                           .select_for_update()
+                                           .filter(learner_key=key, item_id__in=list(results)))}
+        new, changed = [], []
+        for item_id, (konzept_id, score) in results.items():
+            m = existing.get(item_id)
+            if m is None:
+                m = ItemMastery(learner_key=key, item_id=item_id)
+                new.append(m)
+            else:
+                changed.append(m)
+            m.konzept_id = konzept_id
+            schedule(m, score, now)
+        if new:
+            ItemMastery.objects.bulk_create(new, update_conflicts=True,
+                                            unique_fields=["learner_key", "item_id"],
+                                            update_fields=_STATE_FIELDS)
+        if changed:
+            ItemMastery.objects.bulk_update(changed, _STATE_FIELDS)
+
+
+def due_items(key, now=None, limit=DUE_LIMIT):
+    """Fällige Aufgaben, am längsten überfällige zuerst (Index learner_key + due_at)."""
+    from ..models import ItemMastery
+
+    now = now or timezone.now()
+    return list(ItemMastery.objects
+                .filter(learner_key=key, due_at__lte=now)
+                .order_by("due_at")[:limit])
+
+
+def due_counts(key, now=None):
+    """{konzept_id (str): Anzahl fälliger Aufgaben}"""
+    from ..models import ItemMastery
+
+    now = now or timezone.now()
+    rows = (ItemMastery.objects
+            .filter(learner_key=key, due_at__lte=now)
+            .values("konzept_id")
+            .annotate(n=Count("pk")))
+    return {str(r["konzept_id"]): r["n"] for r in rows}
+
+
+def save_konzept_score(key, konzept_id, percent):
+    from ..models import KonzeptMastery
+
+    KonzeptMastery.objects.update_or_create(
+        learner_key=key, konzept_id=konzept_id,
+        defaults={"percent": max(0, min(100, int(percent)))},
+    )
+
+
+def konzept_scores(request, session_key):
+    """{"<konzept_id>": 0..100} aus der DB, ergänzt um Scores, die nur in der Session stehen."""
+    from ..models import KonzeptMastery
+
+    scores = {str(kid): pct for kid, pct in (KonzeptMastery.objects
+                                             .filter(learner_key=learner_key(request))
+                                             .values_list("konzept_id", "percent"))}
+    for kid, pct in request.session.get(session_key, {}).items():
+        scores.setdefault(kid, pct)
+    return scores
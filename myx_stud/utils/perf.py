@@ -0,0 +1,151 @@
+"""
+Leichtgewichtige Laufzeit-Messung pro Request (ohne externes APM).
+
+- `timed("llm")` misst einen Abschnitt im aktuellen Request (no-op ohne Request)
+- `db_execute_wrapper` zählt DB-Queries; Zugriffe auf django_session laufen als "session"
+- `histogram` sammelt die letzten N Requests pro Endpoint für p50/p95/p99
+"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+_current = ContextVar("myx_perf_timings", default=None)
+
+
+class RequestTimings:
+    """Summen (Sekunden) und Zähler aller gemessenen Abschnitte eines Requests."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, name, seconds, count=1):
+        self.spans[name] += seconds
+        self.counts[name] += count
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def begin_request():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    return timings, token
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """Misst die Dauer des Blocks unter `name` (summiert bei mehrfacher Nutzung)."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """Für connection.execute_wrapper: Zeit + Anzahl je Query (db vs. session)."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        name = "session" if "django_session" in sql else "db"
+        timings.add(name, time.perf_counter() - start)
+
+
+def server_timing_header(total, timings):
+    """Baut den Server-Timing-Header (Werte in ms)."""
+    parts = [f"total;dur={total * 1000:.1f}"]
+    for name in sorted(timings.spans):
+        dur = timings.spans[name] * 1000
+        count = timings.counts[name]
+        parts.append(f'{name};dur={dur:.1f};desc="{count}x"')
+    return ", ".join(parts)
+
+
+# =========================
+# Rollendes Histogramm
+# =========================
+
+def _percentile(sorted_values, p):
+    """Nearest-Rank-Perzentil auf einer sortierten Liste."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class RollingHistogram:
+    """Hält pro Endpoint die letzten `size` Messungen (thread-safe, nur im Prozess)."""
+
+    def __init__(self, size=None):
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def _maxlen(self):
+        return self.size or getattr(settings, "PERF_HISTOGRAM_SIZE", 1000)
+
+    def record(self, endpoint, total, timings):
+        sample = {"total": total, "queries": timings.counts.get("db", 0)}
+        sample.update(timings.spans)
+        with self._lock:
+            bucket = self._samples.get(endpoint)
+            if bucket is None:
+                bucket = self._samples[endpoint] = deque(maxlen=self._maxlen())
+            bucket.append(sample)
+
+    def snapshot(self):
+        """Liste von Zeilen (pro Endpoint) mit Perzentilen und Mittelwerten in ms."""
+        with self._lock:
+            data = {ep: list(samples) for ep, samples in self._samples.items()}
+
+        rows = []
+        for endpoint, samples in sorted(data.items()):
+            totals = sorted(s["total"] for s in samples)
+            n = len(samples)
+
+            def mean_ms(key):
+                return 1000 * sum(s.get(key, 0.0) for s in samples) / n
+
+            rows.append({
+                "endpoint": endpoint,
+                "count": n,
+                "p50": 1000 * _percentile(totals, 50),
+                "p95": 1000 * _percentile(totals, 95),
+                "p99": 1000 * _percentile(totals, 99),
+                "db": mean_ms("db"),
+                "queries": sum(s["queries"] for s in samples) / n,
+                "session": mean_ms("session"),
+                "llm": mean_ms("llm"),
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+histogram = RollingHistogram()
@@ -0,0 +1,38 @@
+"""
+Welche Kurse darf ein Redakteur bearbeiten? (Kurse.editors)
+
+Die Kurs-IDs werden pro Request am User-Objekt gemerkt und kurz im Cache gehalten;
+eine Änderung an Kurse.editors (m2m_changed, siehe signals.py) bumpt die Version
+"permissions" und macht damit alle gecachten Mengen ungültig.
+"""
+from django.core.cache import cache
+
+from .caching import get_version
+
+
+PERMISSIONS_TIMEOUT = 60 * 5
+
+_MEMO_ATTR = "_myx_allowed_kurs_ids"
+
+
+def allowed_kurs_ids(user):
+    """frozenset der Kurs-IDs, die `user` bearbeiten darf (Superuser: None = alle)."""
+    if not user.is_active or not user.is_staff:
+        return frozenset()
+    if user.is_superuser:
+        return None
+
+    memo = getattr(user, _MEMO_ATTR, None)
+    if memo is not None:
+        return memo
+
+    from ..models import Kurse
+
+    key = f"myx:perm:kurse:{user.pk}:{get_version('permissions')}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Kurse.objects.filter(editors=user).values_list("pk", flat=True))
+        cache.set(key, ids, PERMISSIONS_TIMEOUT)
+    setattr(user, _MEMO_ATTR, ids)
+    return ids
+
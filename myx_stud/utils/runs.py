@@ -0,0 +1,99 @@
+"""
+Quizlauf-Zustand in der DB (QuizRun) statt Read-Modify-Write auf Session-Werten.
+
+- update_run: optimistische Sperre über QuizRun.version – ein UPDATE ... WHERE version=v
+  gewinnt, der Verlierer liest neu und entscheidet erneut (z. B. "schon weiter").
+- Idempotenz-Keys (RunRequest): doppelt abgeschickte POSTs (Doppelklick, zweiter Tab,
+  Retry nach Timeout) bekommen das gespeicherte Ergebnis statt einer neuen Bewertung.
+"""
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+MAX_RETRIES = 5
+# So lange wartet ein Duplikat auf das Ergebnis des ersten Requests (LLM-Bewertung läuft noch)
+IDEMPOTENCY_WAIT_S = 15
+IDEMPOTENCY_POLL_S = 0.1
+
+IN_PROGRESS = object()
+
+
+def update_run(run, changes_fn):
+    """
+    changes_fn(run) → dict mit neuen Feldwerten oder None (= nichts tun).
+    Schreibt nur, wenn seit dem Lesen niemand sonst geschrieben hat; sonst neu lesen und
+    changes_fn erneut fragen. Gibt True zurück, wenn geschrieben wurde.
+    """
+    from ..models import QuizRun
+
+    for _ in range(MAX_RETRIES):
+        changes = changes_fn(run)
+        if not changes:
+            return False
+        now = timezone.now()
+        updated = (QuizRun.objects
+                   .filter(pk=run.pk, version=run.version)
+                   .update(version=F("version") + 1, updated_at=now, **changes))
+        if updated:
+            for field, value in changes.items():
+                setattr(run, field, value)
+            run.version += 1
+            run.updated_at = now
+            return True
+        run.refresh_from_db()
+    return False
+
+
+def claim_request(run, key, action):
+    """
+    (True, None)    → dieser Request führt die Aktion aus (danach store_result aufrufen)
+    (False, result) → Duplikat: gespeichertes Ergebnis des ersten Requests
+                      (oder IN_PROGRESS, wenn der noch nach IDEMPOTENCY_WAIT_S läuft).
+    Ohne Key (alte Formulare, Skripte) wird immer ausgeführt.
+    """
+    from ..models import RunRequest
+
+    if not key:
+        return True, None
+    try:
+        with transaction.atomic():
+            RunRequest.objects.create(run=run, key=key, action=action)
+        return True, None
+    except IntegrityError:
+        pass
+
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_S
+    while True:
+        done, result = (RunRequest.objects
+                        .filter(run=run, key=key)
+                        .values_list("done", "result").first() or (True, None))
+        if done:
+            return False, result
+        if time.monotonic() >= deadline:
+            return False, IN_PROGRESS
+        time.sleep(IDEMPOTENCY_POLL_S)
+
+
+def is_replay(run, key):
+    """Key wurde in diesem Lauf schon benutzt (Wiederholung eines bereits verarbeiteten POSTs)."""
+    from ..models import RunRequest
+
+    return bool(key) and RunRequest.objects.filter(run=run, key=key).exists()
+
+
+def store_result(run, key, result):
+    from ..models import RunRequest
+
+    if key:
+        RunRequest.objects.filter(run=run, key=key).update(done=True, result=result)
+
+
+def release_request(run, key):
+    """Aktion ist fehlgeschlagen → Key freigeben, damit ein Retry neu ausführt."""
+    from ..models import RunRequest
+
+    if key:
+        RunRequest.objects.filter(run=run, key=key, done=False).delete()
@@ -0,0 +1,169 @@
+"""
+Volltextsuche über den Aufgabenpool (QuizQuestion) und die Konzepte.
+
+Eine Index-Tabelle `myx_stud_search` je Backend (angelegt in Migration 0009):
+  - SQLite:     FTS5-Tabelle (unicode61, Umlaute/Akzente egal), Ranking per bm25
+  - PostgreSQL: Tabelle mit generierter tsvector-Spalte ('german') + GIN-Index
+Gepflegt per Signals (signals.py); bulk_create/update() rufen index_questions() selbst auf.
+Andere Backends: search_* liefert None → Aufrufer fallen auf icontains zurück.
+"""
+import re
+import uuid
+
+from django.db import connection
+
+
+TABLE = "myx_stud_search"
+QUESTION = "question"
+KONZEPT = "konzept"
+LIMIT = 200
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def available():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def _key(value):
+    return value.hex if isinstance(value, uuid.UUID) else str(value)
+
+
+# ---------- Pflege ----------
+
+def _question_row(q):
+    body = "\n".join(filter(None, [q.text, q.question, q.correct_answer]))
+    return (QUESTION, _key(q.pk), _key(q.konzept_id), q.title or "", body)
+
+
+def _konzept_row(k):
+    body = "\n".join(filter(None, [k.definition, k.example]))
+    return (KONZEPT, _key(k.pk), _key(k.pk), k.name or "", body)
+
+
+def _replace(rows, kind, keys):
+    with connection.cursor() as cursor:
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE kind = %s AND obj_id IN ({', '.join(['%s'] * len(chunk))})",
+                [kind, *chunk],
+            )
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (kind, obj_id, konzept_id, title, body) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def index_questions(questions):
+    """Index-Einträge für die gegebenen QuizQuestion-Objekte (neu) schreiben."""
+    if not available():
+        return
+    questions = list(questions)
+    _replace([_question_row(q) for q in questions], QUESTION, [_key(q.pk) for q in questions])
+
+
+def index_konzepte(konzepte):
+    if not available():
+        return
+    konzepte = list(konzepte)
+    _replace([_konzept_row(k) for k in konzepte], KONZEPT, [_key(k.pk) for k in konzepte])
+
+
+def remove(kind, pk):
+    if available():
+        _replace([], kind, [_key(pk)])
+
+
+def rebuild():
+    """Index komplett neu aufbauen (nach Massenimporten)."""
+    from ..models import Konzepte, QuizQuestion
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    index_konzepte(Konzepte.objects.only("name", "definition", "example").iterator())
+    for start in range(0, QuizQuestion.objects.count(), 2000):
+        batch = (QuizQuestion.objects.order_by("pk")
+                 .only("konzept_id", "title", "text", "question", "correct_answer")[start:start + 2000])
+        index_questions(batch)
+
+
+# ---------- Suche ----------
+
+def _match(term):
+    """Suchbegriff → (Prefix-)Query; nur Wortzeichen, damit keine Query-Syntax durchrutscht."""
+    tokens = _TOKEN_RE.findall(term or "")[:10]
+    if not tokens:
+        return None
+    if connection.vendor == "sqlite":
+        return " ".join(f'"{t}"*' for t in tokens)
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+def _hits(term, kind=None, limit=LIMIT, konzept_ids=None):
+    """
+    [(kind, obj_id, konzept_id)] nach Relevanz; None = kein Index verfügbar.
+    konzept_ids schränkt schon im SQL ein (vor dem LIMIT), limit=None = alle Treffer.
+    """
+    if not available():
+        return None
+    query = _match(term)
+    if query is None:
+        return []
+    where, params = [], []
+    if kind:
+        where.append("AND kind = %s")
+        params.append(kind)
+    if konzept_ids is not None:
+        keys = [_key(k) for k in konzept_ids]
+        if not keys:
+            return []
+        where.append(f"AND konzept_id IN ({', '.join(['%s'] * len(keys))})")
+        params += keys
+    filter_sql = " ".join(where)
+    limit_sql = "" if limit is None else "LIMIT %s"
+    if connection.vendor == "sqlite":
+        sql = (f"SELECT kind, obj_id, konzept_id FROM {TABLE} WHERE {TABLE} MATCH %s {filter_sql} "
+               f"ORDER BY bm25({TABLE}, 0, 0, 0, 10.0, 1.0) {limit_sql}")
+    else:
+        sql = (f"SELECT kind, obj_id, konzept_id FROM {TABLE}, to_tsquery('german', %s) q "
+               f"WHERE tsv @@ q {filter_sql} ORDER BY ts_rank(tsv, q) DESC {limit_sql}")
+    params = [query, *params] + ([] if limit is None else [limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_question_ids(term, limit=LIMIT):
+    """pks der passendsten Fragen (limit=None: alle, für den Admin) oder None ohne Index."""
+    hits = _hits(term, QUESTION, limit)
+    if hits is None:
+        return None
+    return [int(obj_id) for _, obj_id, _ in hits]
+
+
+def search_konzept_ids(term, within=None, limit=20):
+    """
+    Konzept-IDs nach Relevanz: Treffer im Konzept selbst oder in einer seiner aktiven Fragen.
+    within = optionale Menge erlaubter Konzept-IDs (z. B. die des aktuellen Kurses), wird im
+    SQL vor dem LIMIT angewendet; limit=None = alle Treffer. None ohne Index.
+    """
+    from ..models import QuizQuestion
+
+    hits = _hits(term, limit=LIMIT if limit is not None else None, konzept_ids=within)
+    if hits is None:
+        return None
+    question_ids = [int(obj_id) for kind, obj_id, _ in hits if kind == QUESTION]
+    active = set(QuizQuestion.objects.filter(pk__in=question_ids, active=True).values_list("pk", flat=True))
+
+    ids = []
+    for kind, obj_id, konzept_id in hits:
+        if kind == QUESTION and int(obj_id) not in active:
+            continue
+        konzept_id = uuid.UUID(konzept_id)
+        if konzept_id not in ids:
+            ids.append(konzept_id)
+            if limit is not None and len(ids) >= limit:
+                break
+    return ids
@@ -0,0 +1,56 @@
+"""
+Aufgabenstand zum Zeitpunkt des Logs (QuestionSnapshot) statt Kopie in jeder QuestionLog-Zeile.
+
+Ein Snapshot pro (item_id, Inhalt): Schlüssel ist sha256 über item_id + alle Felder.
+Ändert sich eine Aufgabe im Admin, entsteht beim nächsten Log eine neue Version;
+alte Logs zeigen weiter auf den Stand, den der Schüler damals gesehen hat.
+"""
+import hashlib
+import json
+
+from django.db.models import Max
+
+
+SNAPSHOT_FIELDS = ("fach", "kurs", "konzept", "text", "question", "correct_answer", "feedback_prompt",
+                   "gemini_feedback")
+
+
+def snapshot_values(meta):
+    """Normalisierte Snapshot-Felder aus den Log-Metadaten (views.quizview._log_meta)."""
+    values = {f: (meta.get(f) or "") for f in SNAPSHOT_FIELDS}
+    values["gemini_feedback"] = bool(meta.get("gemini_feedback", False))
+    return values
+
+
+def snapshot_digest(item_id, values):
+    payload = json.dumps([str(item_id)] + [values[f] for f in SNAPSHOT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def snapshot_ids(entries):
+    """
+    entries = [(item_id, snapshot_values), ...] → Liste der QuestionSnapshot-pks (gleiche Reihenfolge).
+    Vorhandene Stände werden nur gelesen; fehlende per bulk_create mit nächster Version angelegt.
+    """
+    from ..models import QuestionSnapshot
+
+    digests = [snapshot_digest(item_id, values) for item_id, values in entries]
+    ids = dict(QuestionSnapshot.objects.filter(digest__in=set(digests)).values_list("digest", "pk"))
+
+    missing = {}
+    for digest, (item_id, values) in zip(digests, entries):
+        if digest not in ids:
+            missing.setdefault(digest, (str(item_id), values))
+    if missing:
+        versions = dict(QuestionSnapshot.objects
+                        .filter(item_id__in={item_id for item_id, _ in missing.values()})
+                        .order_by().values("item_id").annotate(v=Max("version")).values_list("item_id", "v"))
+        new = []
+        for digest, (item_id, values) in missing.items():
+            versions[item_id] = versions.get(item_id, 0) + 1
+            new.append(QuestionSnapshot(digest=digest, item_id=item_id, version=versions[item_id], **values))
+        # ignore_conflicts: parallele Requests dürfen denselben Stand gleichzeitig anlegen
+        QuestionSnapshot.objects.bulk_create(new, ignore_conflicts=True)
+        ids.update(QuestionSnapshot.objects.filter(digest__in=list(missing)).values_list("digest", "pk"))
+
+    return [ids[d] for d in digests]
@@ -0,0 +1,43 @@
+"""
+Warm-up beim Worker-Start (masteryx/wsgi.py), damit nicht der erste echte Request
+die teuren Imports (google.generativeai, numpy), das Kompilieren der Templates und den
+ersten Katalog-Query bezahlt. Abschaltbar mit WARMUP_ON_START = False.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = (
+    "base.html", "home.html", "kurswahl.html", "kurs.html", "konzept.html",
+    "quiz/quiz_view.html", "quiz/_question.html", "quiz/quiz_complete.html",
+)
+
+
+def warm_up():
+    """Gibt die Dauer in ms zurück; Fehler (z. B. DB noch nicht migriert) werden nur geloggt."""
+    start = time.perf_counter()
+    try:
+        if not getattr(settings, "GEMINI_STUB", False):
+            from .functions import _genai
+            _genai()
+        from .answer_reuse import _np
+        _np()
+        for name in TEMPLATES:
+            get_template(name)
+
+        from .caching import get_catalog
+        get_catalog()
+    except Exception:
+        logger.exception("Warm-up fehlgeschlagen")
+    finally:
+        # keine offene DB-Verbindung in geforkte Worker (gunicorn --preload) mitnehmen
+        connections.close_all()
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info("Warm-up in %.0f ms", elapsed)
+    return elapsed
@@ -0,0 +1,127 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+# Inhaltsadressierte Namen (storage.HashedMediaStorage) und deren Varianten ändern sich nie
+HASHED_NAME_RE = re.compile(r"(^|/)[0-9a-f]{16}(\.\d+w)?\.\w+$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_MAX_AGE = 60 * 60
+
+# Vorkomprimierte Geschwister-Dateien (foo.svg.br / foo.svg.gz), bevorzugte Reihenfolge
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _cache_control(path):
+    if HASHED_NAME_RE.search(path):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={DEFAULT_MAX_AGE}"
+
+
+def _pick_encoding(request, fullpath):
+    accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding in accepted and os.path.exists(fullpath + suffix):
+            return encoding, fullpath + suffix
+    return None, fullpath
+
+
+def _file_chunks(fh, length, chunk_size=64 * 1024):
+    try:
+        while length > 0:
+            data = fh.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Auslieferung von MEDIA-Dateien, auch ohne DEBUG.
+    MEDIA_SERVE_BACKEND:
+      - "python"     : direkt aus Django (ETag/304, Range-Requests, .br/.gz-Varianten)
+      - "x-accel"    : nginx übernimmt via X-Accel-Redirect (MEDIA_ACCEL_PREFIX)
+      - "x-sendfile" : Apache/lighttpd übernimmt via X-Sendfile
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Datei nicht gefunden.")
+    if not os.path.isfile(fullpath):
+        raise Http404("Datei nicht gefunden.")
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+    backend = getattr(settings, "MEDIA_SERVE_BACKEND", "python")
+
+    if backend in ("x-accel", "x-sendfile"):
+        response = HttpResponse(content_type=content_type)
+        if backend == "x-accel":
+            prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + path.lstrip("/")
+        else:
+            response["X-Sendfile"] = fullpath
+        response["Cache-Control"] = _cache_control(path)
+        return response
+
+    encoding, served_path = _pick_encoding(request, fullpath)
+    stat = os.stat(served_path)
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size}{"-" + encoding if encoding else ""}"'
+
+    # Conditional GET
+    if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+        return _finish(HttpResponseNotModified(), path, etag, stat)
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    if "HTTP_IF_NONE_MATCH" not in request.META and since is not None and int(stat.st_mtime) <= since:
+        return _finish(HttpResponseNotModified(), path, etag, stat)
+
+    size = stat.st_size
+    range_header = request.META.get("HTTP_RANGE", "")
+    m = RANGE_RE.match(range_header)     # Mehrfach-Ranges → einfach komplette Datei (200)
+    if m and not encoding and m.group() != "bytes=-" and request.META.get("HTTP_IF_RANGE", etag) == etag:
+        if m.group(1) == "":                       # bytes=-500 → letzte 500 Bytes
+            start, end = max(0, size - int(m.group(2))), size - 1
+        else:
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+        if start >= size or start > end:
+            return _range_not_satisfiable(size)
+
+        fh = open(served_path, "rb")
+        fh.seek(start)
+        response = StreamingHttpResponse(_file_chunks(fh, end - start + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        return _finish(response, path, etag, stat)
+
+    response = FileResponse(open(served_path, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return _finish(response, path, etag, stat)
+
+
+def _finish(response, path, etag, stat):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = _cache_control(path)
+    response["Accept-Ranges"] = "bytes"
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _range_not_satisfiable(size):
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return response
@@ -0,0 +1,219 @@
+"""
+Offline-Modus für ein Konzept.
+
+1) bundle: alle aktiven Aufgaben eines Konzepts auf einmal (statisch bewertete mit gesalzenem
+   Hash der normalisierten Lösung, Bild-URLs zum Vorladen) → der Browser bewertet selbst.
+2) sync:   gesammelte Versuche kommen gebündelt zurück und werden per bulk_create als
+   QuestionLog gespeichert. Statische Antworten prüft der Server nach; LLM-Aufgaben werden
+   erst hier (also sobald wieder online) bewertet und das Feedback zurückgegeben.
+"""
+import hashlib
+import json
+import secrets
+import uuid
+from datetime import datetime
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from ..models import Attempt, QuestionLog, QuizQuestion
+from ..templatetags.media_tags import prefetch_image_url
+from ..utils import perf
+from ..utils.attempts import save_questionlogs
+from ..utils.functions import get_feedback_unified, normalize_answer
+from ..utils.mastery import learner_key, record_results, save_konzept_score
+from .quizview import SESSION_KONZEPT_KEY, _build_questionlog, _ensure_session_id, _log_meta
+from .views import SCORES_KEY
+
+
+OFFLINE_RUNS_KEY = "offline_runs"   # { "<quiz_id>": "<konzept_id>" }, älteste zuerst
+MAX_OFFLINE_RUNS = 10                # offene Offline-Läufe je Session; ältere verfallen
+MAX_ATTEMPTS_PER_ITEM = 20
+MAX_LLM_GRADES_PER_SYNC = 5          # LLM-Bewertungen pro Sync-Request; der Rest kommt in "deferred"
+
+
+def answer_hash(salt, answer):
+    return hashlib.sha256(f"{salt}:{normalize_answer(answer)}".encode("utf-8")).hexdigest()
+
+
+def _parse_dt(value):
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def quiz_offline(request):
+    """Seite für den Offline-Modus (lädt das Bundle per JS)."""
+    if not request.session.get(SESSION_KONZEPT_KEY):
+        messages.info(request, "Bitte zuerst ein Konzept auswählen.")
+        return redirect("kurs")
+    return render(request, "quiz/quiz_offline.html", {"konzept_id": request.session[SESSION_KONZEPT_KEY]})
+
+
+@require_GET
+def quiz_offline_bundle(request):
+    konzept_id = request.session.get(SESSION_KONZEPT_KEY)
+    if not konzept_id:
+        return JsonResponse({"error": "no_konzept"}, status=400)
+
+    questions = list(QuizQuestion.objects.filter(active=True, konzept_id=konzept_id).order_by("id"))
+    if not questions:
+        return JsonResponse({"error": "no_questions"}, status=404)
+
+    # Eigener Run pro Bundle; Salt verhindert, dass Hashes zwischen Läufen wiederverwendbar sind
+    quiz_id = uuid.uuid4().hex
+    salt = secrets.token_hex(8)
+    runs = request.session.get(OFFLINE_RUNS_KEY, {})
+    runs[quiz_id] = str(konzept_id)
+    # jedes Bundle öffnet einen Lauf – nur die neuesten behalten, sonst wächst die Session endlos
+    request.session[OFFLINE_RUNS_KEY] = dict(list(runs.items())[-MAX_OFFLINE_RUNS:])
+    _ensure_session_id(request)
+
+    items = []
+    for q in questions:
+        item = {
+            "item_id": str(q.item_id),
+            "text": q.text or "",
+            "question": q.question or "",
+            "image": prefetch_image_url(q.image) if q.image else None,
+            "llm": bool(q.gemini_feedback),
+        }
+        if not q.gemini_feedback:
+            # nur der Hash geht raus – die Lösung selbst kommt erst mit der Sync-Antwort
+            item["answer_hash"] = answer_hash(salt, q.correct_answer)
+        items.append(item)
+
+    return JsonResponse({
+        "quiz_id": quiz_id,
+        "salt": salt,
+        "created_at": timezone.now().isoformat(),
+        "items": items,
+    })
+
+
+@require_POST
+def quiz_offline_sync(request):
+    """
+    Body: {"quiz_id": ..., "complete": bool,
+           "items": [{"item_id", "started_at", "rating", "attempts": [{"answer", "submitted_at"}]}]}
+    Antwort: {"saved": [item_id, ...], "graded": {item_id: {...}}, "deferred": [item_id, ...],
+              "result": {...}?}
+    Pro Request höchstens MAX_LLM_GRADES_PER_SYNC LLM-Bewertungen; zurückgestellte Items
+    ("deferred") schickt der Browser gleich erneut, "complete" greift erst ohne Rückstand.
+    Wiederholtes Senden ist harmlos: bereits gespeicherte Items werden übersprungen, auch bei
+    parallelen Requests (uniq_questionlog_run_item).
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "invalid_json"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "invalid_body"}, status=400)
+
+    quiz_id = str(data.get("quiz_id") or "")
+    konzept_id = request.session.get(OFFLINE_RUNS_KEY, {}).get(quiz_id)
+    if not konzept_id:
+        return JsonResponse({"error": "unknown_run"}, status=404)
+    session_id = _ensure_session_id(request)
+
+    items = data.get("items") or []
+    if not isinstance(items, list) or not all(
+        isinstance(i, dict) and isinstance(i.get("attempts") or [], list)
+        and all(isinstance(a, dict) for a in i.get("attempts") or [])
+        for i in items
+    ):
+        return JsonResponse({"error": "invalid_items"}, status=400)
+
+    submitted = {str(i.get("item_id")): i for i in items if i.get("attempts")}
+    questions = {
+        str(q.item_id): q
+        for q in QuizQuestion.objects.select_related("konzept__kurs")
+                                     .filter(konzept_id=konzept_id, item_id__in=list(submitted))
+    } if submitted else {}
+    already = set(QuestionLog.objects
+                  .filter(session_id=session_id, quiz_id=quiz_id, item_id__in=list(questions))
+                  .values_list("item_id", flat=True))
+
+    entries, graded, deferred = [], {}, []
+    llm_budget = MAX_LLM_GRADES_PER_SYNC
+    for item_id, item in submitted.items():
+        q = questions.get(item_id)
+        if q is None or item_id in already:
+            continue
+
+        attempts = item["attempts"][:MAX_ATTEMPTS_PER_ITEM]
+        if q.gemini_feedback:
+            # ein Item mit mehr Versuchen als das Budget geht allein durch, sonst käme es nie dran
+            if len(attempts) > llm_budget and llm_budget < MAX_LLM_GRADES_PER_SYNC:
+                deferred.append(item_id)
+                continue
+            llm_budget -= len(attempts)
+
+        bucket = []
+        for n, a in enumerate(attempts, start=1):
+            answer = str(a.get("answer") or "").strip()
+            with perf.timed("grade"):
+                fb = get_feedback_unified(q, answer)
+            score = min(max(float(fb.get("score") or 0.0), 0.0), 1.0)
+            is_correct = fb.get("is_correct")
+            if is_correct is None:
+                is_correct = score > 0.8
+            bucket.append({
+                "n": n,
+                "answer": answer,
+                "feedback_text": fb.get("feedback_ai") or "",
+                "correct_answer": fb.get("correct_answer") or "",
+                "is_correct": bool(is_correct),
+                "score": score,
+                "submitted_at": a.get("submitted_at") or timezone.now().isoformat(),
+            })
+        bucket[-1]["rating"] = item.get("rating")
+
+        last = bucket[-1]
+        graded[item_id] = {"feedback_ai": last["feedback_text"], "correct_answer": last["correct_answer"],
+                           "score": last["score"], "is_correct": last["is_correct"]}
+
+        entries.append(_build_questionlog(_log_meta(q, session_id), quiz_id, item_id,
+                                       _parse_dt(item.get("started_at")), bucket))
+
+    with perf.timed("flush"):
+        logs = save_questionlogs(entries)
+        saved = {log.item_id for log in logs}
+        record_results(learner_key(request), [
+            (item_id, questions[item_id].konzept_id, g["score"]) for item_id, g in graded.items() if item_id in saved
+        ])
+
+    response = {"saved": [log.item_id for log in logs], "graded": graded, "deferred": deferred}
+    if data.get("complete") and not deferred:
+        response["result"] = _complete_offline_run(request, quiz_id, konzept_id, session_id)
+    return JsonResponse(response)
+
+
+def _complete_offline_run(request, quiz_id, konzept_id, session_id):
+    """Score wie quiz_complete: Durchschnitt des letzten Versuchs über alle Aufgaben des Konzepts."""
+    total = QuizQuestion.objects.filter(active=True, konzept_id=konzept_id).count() or 1
+    last_score, solved = {}, set()
+    for log_id, score, is_correct in (Attempt.objects
+                                      .filter(log__session_id=session_id, log__quiz_id=quiz_id)
+                                      .order_by("log_id", "n")
+                                      .values_list("log_id", "score", "is_correct")):
+        last_score[log_id] = score
+        if is_correct:
+            solved.add(log_id)
+    score_sum, correct = sum(last_score.values()), len(solved)
+    percent = max(0, min(100, int(round(100 * score_sum / total))))
+
+    scores = request.session.get(SCORES_KEY, {})
+    scores[str(konzept_id)] = percent
+    request.session[SCORES_KEY] = scores
+    save_konzept_score(learner_key(request), konzept_id, percent)
+
+    runs = request.session.get(OFFLINE_RUNS_KEY, {})
+    runs.pop(quiz_id, None)
+    request.session[OFFLINE_RUNS_KEY] = runs
+    return {"correct": correct, "percent": percent, "score_sum": round(score_sum, 3)}
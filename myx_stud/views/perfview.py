@@ -0,0 +1,24 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+
+from ..utils import answer_reuse, context_cache, perf
+
+
+@staff_member_required
+def perf_stats(request):
+    """Nur für Staff: Perzentile pro Endpoint aus dem In-Process-Histogramm."""
+    from ..utils import grading_schema   # importiert pydantic
+
+    if request.method == "POST" and "reset" in request.POST:
+        perf.histogram.reset()
+        for stats in (grading_schema.stats, context_cache.stats, answer_reuse.stats):
+            stats.update(dict.fromkeys(stats, 0))
+        return redirect("perf_stats")
+
+    return render(request, "perf_stats.html", {
+        "rows": perf.histogram.snapshot(),
+        "grading": grading_schema.stats,
+        "context_cache": context_cache.stats,
+        "reuse": answer_reuse.stats,
+        "reuse_rate": answer_reuse.stats["hits"] / answer_reuse.stats["lookups"] if answer_reuse.stats["lookups"] else None,
+    })
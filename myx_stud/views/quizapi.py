@@ -0,0 +1,189 @@
+"""
+JSON-API für den Quizlauf (gleicher Session-State wie quiz_view).
+
+Statt POST → 302 → GET mit komplettem Seiten-Render pro Klick:
+    POST quiz/api/start/     {restart?}           → aktuelle Aufgabe
+    GET  quiz/api/item/                           → aktuelle Aufgabe
+    POST quiz/api/submit/    {answer}             → Feedback
+    POST quiz/api/rate/      {rating}             → ok
+    POST quiz/api/next/      {rating?}            → nächste Aufgabe oder {"done": true}
+    POST quiz/api/complete/                       → Ergebnis (wie quiz_complete)
+Body als JSON-Objekt oder Formular (sonst 400 invalid_body); CSRF per X-CSRFToken-Header.
+submit/next nehmen optional item_id (→ 409 stale_item, wenn die Aufgabe schon erledigt ist)
+und idem_key (Wiederholung liefert das gespeicherte Ergebnis) entgegen.
+"""
+import json
+
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET, require_POST
+
+from ..templatetags.media_tags import prefetch_image_url
+from ..utils import perf
+from ..utils.caching import content_version
+from ..utils.runs import is_replay
+from .quizview import (
+    SESSION_KONZEPT_KEY, SESSION_KURS_KEY, SESSION_QUIZ_ID,
+    _advance, _current_question, _ensure_run, _ensure_session_id, _is_stale, _parse_rating,
+    _prepare_next_question, _rating_required, _run_questions, _set_created_at_once,
+    _set_rating_on_last_attempt, _submit_answer,
+)
+from .views import _finish_run
+
+
+def _data(request):
+    """Body als dict (JSON-Objekt oder Formular) oder 400 invalid_body."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return _error("invalid_body")
+        return data if isinstance(data, dict) else _error("invalid_body")
+    return request.POST
+
+
+def _error(code, status=400):
+    return JsonResponse({"error": code}, status=status)
+
+
+def _idem_key(request, data):
+    """Aus dem Body oder dem üblichen Idempotency-Key-Header."""
+    key = data.get("idem_key") or request.headers.get("Idempotency-Key") or ""
+    return str(key)[:64] or None
+
+
+def _load_state(request):
+    """(run, questions_qs, total, index, question) oder eine Fehler-Response."""
+    if not request.session.get(SESSION_KURS_KEY):
+        return _error("no_kurs")
+    run = _ensure_run(request)
+    questions_qs, total = _run_questions(request, run)
+    if total == 0:
+        return _error("no_questions", status=404)
+    index, question = _current_question(run, questions_qs, total)
+    return run, questions_qs, total, index, question
+
+
+def _item_payload(request, run, total, index, question):
+    """Kompakte Antwort: Fortschritt + vorgerendertes (gecachtes) Aufgaben-Fragment."""
+    if question is None:
+        return {"done": True, "total": total}
+    _set_created_at_once(request, run.quiz_id, str(question.item_id))
+    return {
+        "done": False,
+        "index": index + 1,
+        "total": total,
+        "item_id": str(question.item_id),
+        "html": render_to_string("quiz/_question.html", {
+            "question": question,
+            "content_version": content_version(),
+        }),
+    }
+
+
+def _current_item_response(request):
+    state = _load_state(request)
+    if isinstance(state, JsonResponse):
+        return state
+    run, _, total, index, question = state
+    _ensure_session_id(request)
+    return JsonResponse(_item_payload(request, run, total, index, question))
+
+
+@require_POST
+def quiz_api_start(request):
+    data = _data(request)
+    if isinstance(data, JsonResponse):
+        return data
+    if data.get("restart"):
+        # neuer Lauf; der alte bleibt (unabgeschlossen) liegen
+        request.session.pop(SESSION_QUIZ_ID, None)
+    return _current_item_response(request)
+
+
+@require_GET
+def quiz_api_item(request):
+    return _current_item_response(request)
+
+
+@require_POST
+def quiz_api_submit(request):
+    state = _load_state(request)
+    if isinstance(state, JsonResponse):
+        return state
+    run, questions_qs, total, index, question = state
+    if question is None:
+        return _error("done", status=409)
+    data = _data(request)
+    if isinstance(data, JsonResponse):
+        return data
+    if _is_stale(data.get("item_id"), question):
+        return _error("stale_item", status=409)
+    _ensure_session_id(request)
+
+    user_answer = (data.get("answer") or "").strip()
+    fb = _submit_answer(request, run, question, user_answer, _idem_key(request, data))
+
+    with perf.timed("prefetch"):
+        next_question = _prepare_next_question(questions_qs, index)
+
+    return JsonResponse({
+        "feedback": {
+            "is_correct": fb.get("is_correct"),
+            "feedback_ai": fb.get("feedback_ai"),
+            "correct_answer": fb.get("correct_answer"),
+            "score": fb.get("score"),
+        },
+        "next_image": prefetch_image_url(next_question.image) if next_question and next_question.image else None,
+    })
+
+
+@require_POST
+def quiz_api_rate(request):
+    state = _load_state(request)
+    if isinstance(state, JsonResponse):
+        return state
+    run, _, _, _, question = state
+    data = _data(request)
+    if isinstance(data, JsonResponse):
+        return data
+    rating_int = _parse_rating(data.get("rating"))
+    if question is None or rating_int is None or not (1 <= rating_int <= 5):
+        return _error("invalid_rating")
+    _set_rating_on_last_attempt(request, run.quiz_id, str(question.item_id), rating_int)
+    return JsonResponse({"ok": True})
+
+
+@require_POST
+def quiz_api_next(request):
+    state = _load_state(request)
+    if isinstance(state, JsonResponse):
+        return state
+    run, questions_qs, total, index, question = state
+    if question is None:
+        return JsonResponse({"done": True, "total": total})
+    data = _data(request)
+    if isinstance(data, JsonResponse):
+        return data
+    idem_key = _idem_key(request, data)
+    if _is_stale(data.get("item_id"), question):
+        if is_replay(run, idem_key):
+            # Wiederholung eines schon ausgeführten NEXT → einfach den aktuellen Stand
+            return JsonResponse(_item_payload(request, run, total, index, question))
+        return _error("stale_item", status=409)
+
+    rating_int = _parse_rating(data.get("rating"))
+    if _rating_required(request, run.quiz_id, str(question.item_id), rating_int):
+        return _error("rating_required", status=409)
+
+    _advance(request, run, question, index, rating_int, idem_key)
+    index, question = _current_question(run, questions_qs, total)
+    return JsonResponse(_item_payload(request, run, total, index, question))
+
+
+@require_POST
+def quiz_api_complete(request):
+    konzept_id = request.session.get(SESSION_KONZEPT_KEY)
+    if not request.session.get(SESSION_KURS_KEY) or not konzept_id:
+        return _error("no_konzept")
+    return JsonResponse(_finish_run(request, konzept_id))
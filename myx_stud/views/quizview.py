@@ -3,10 +3,17 @@ from datetime import datetime
 
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404, render
+from django.template.loader import render_to_string
 from django.utils import timezone
 
-from ..models import QuizQuestion, QuestionLog, Kurse
+from ..models import QuizQuestion, QuestionLog, QuizRun, Kurse, Konzepte
 from ..utils.functions import get_feedback_unified
+from ..utils import perf
+from ..utils.attempts import save_questionlogs
+from ..utils.mastery import learner_key, record_results
+from ..utils.snapshots import snapshot_values
+from ..utils.caching import content_version
+from ..utils.runs import IN_PROGRESS, claim_request, is_replay, release_request, store_result, update_run
 
 
 SESSION_KURS_KEY = "current_kurs_id"
@@ -75,26 +82,12 @@ def _pop_created_at(request, quiz_id, item_id):
     return None
 
 
-def _flush_session_to_questionlog(request, quiz_id, item_id, meta):
+def _build_questionlog(meta, quiz_id, item_id, started_at, bucket):
     """
-    Persistiert ALLE Versuche aus der Session in QuestionLog.attempts (JSON-Liste).
-    Speichert EIN finales Rating (vom letzten Versuch) in item_rating.
-    Erwartet in meta: session_id, fach, kurs, konzept, text, image (str/None),
-                      question, correct_answer, feedback_prompt, gemini_feedback (bool)
+    (ungespeichertes QuestionLog, Snapshot-Felder, normalisierte Versuche) aus einem Versuchs-Bucket
+    (Session oder Offline-Sync) – gespeichert wird mit utils.attempts.save_questionlogs.
+    EIN finales Rating (vom letzten Versuch) landet in item_rating.
     """
-    key = _session_key(quiz_id, item_id)
-    bucket = request.session.get(key, [])
-
-    # nichts zu persistieren → Startzeit ggf. aufräumen und raus
-    if not bucket:
-        _pop_created_at(request, quiz_id, item_id)
-        if key in request.session:
-            del request.session[key]
-            request.session.modified = True
-        return
-
-    started_at = _pop_created_at(request, quiz_id, item_id)
-
     last = bucket[-1] if bucket else None
     final_rating = last.get("rating") if last else None
     try:
@@ -117,26 +110,55 @@ def _flush_session_to_questionlog(request, quiz_id, item_id, meta):
             "submitted_at": a.get("submitted_at"),
         })
 
-    # Ein Create mit JSON-Liste
-    QuestionLog.objects.create(
+    log = QuestionLog(
         session_id=meta["session_id"],
         quiz_id=quiz_id,
         item_id=item_id,
-
-        fach=meta.get("fach", ""),
-        kurs=meta.get("kurs", ""),
-        konzept=meta.get("konzept", ""),
-
-        text=meta.get("text", ""),
-        question=meta.get("question", ""),
-        correct_answer=meta.get("correct_answer", ""),
-        gemini_feedback=bool(meta.get("gemini_feedback", False)),
-        feedback_prompt=meta.get("feedback_prompt", ""),
-
         started_at=started_at,
-        attempts=normalized_attempts,
         item_rating=final_rating,
     )
+    return log, snapshot_values(meta), normalized_attempts
+
+
+def _log_meta(question, session_id):
+    """Metadaten fürs Log (aus Kurs/Konzept/Frage)."""
+    kurs_obj = question.konzept.kurs
+    return {
+        "session_id": session_id,
+        "fach": kurs_obj.fach,
+        "kurs": kurs_obj.kurs,
+        "konzept": (question.konzept.name or ""),
+        "text": question.text,
+        # nur Dateiname/Path speichern (string) oder None
+        "image": (question.image.name if question.image else None),
+        "question": question.question,
+        "correct_answer": question.correct_answer,
+        "feedback_prompt": getattr(question, "feedback_prompt", "") or "",
+        "gemini_feedback": bool(getattr(question, "gemini_feedback", False)),
+    }
+
+
+def _flush_session_to_questionlog(request, quiz_id, item_id, meta):
+    """
+    Persistiert ALLE Versuche aus der Session als QuestionLog + Attempt-Zeilen.
+    Speichert EIN finales Rating (vom letzten Versuch) in item_rating.
+    Erwartet in meta: session_id, fach, kurs, konzept, text, image (str/None),
+                      question, correct_answer, feedback_prompt, gemini_feedback (bool)
+    """
+    key = _session_key(quiz_id, item_id)
+    bucket = request.session.get(key, [])
+
+    # nichts zu persistieren → Startzeit ggf. aufräumen und raus
+    if not bucket:
+        _pop_created_at(request, quiz_id, item_id)
+        if key in request.session:
+            del request.session[key]
+            request.session.modified = True
+        return
+
+    started_at = _pop_created_at(request, quiz_id, item_id)
+
+    save_questionlogs([_build_questionlog(meta, quiz_id, item_id, started_at, bucket)])
 
     # Session-Bucket leeren
     if key in request.session:
@@ -144,171 +166,284 @@ def _flush_session_to_questionlog(request, quiz_id, item_id, meta):
         request.session.modified = True
 
 
+def _prepare_next_question(questions_qs, current_index):
+    """
+    Lädt die nächste Aufgabe und rendert ihr Fragment vorab in den Cache
+    (gleicher Key wie in quiz/_question.html) – der Klick auf "weiter" muss dann
+    nur noch den Rahmen rendern. Das Bild wird per <link rel=prefetch> geladen.
+    """
+    next_question = questions_qs[current_index + 1:current_index + 2].first()
+    if next_question is not None:
+        render_to_string("quiz/_question.html", {
+            "question": next_question,
+            "content_version": content_version(),
+        })
+    return next_question
+
+
 # =========================
-# Eigentliche Quiz-View
+# Quizlauf-Helfer (gemeinsam für quiz_view und die JSON-API)
 # =========================
 
-def quiz_view(request):
-    # Kurs aus der Session holen
-    kurs_id = request.session.get(SESSION_KURS_KEY)
-    if not kurs_id:
-        messages.info(request, "Bitte zuerst einen Kurs auswählen.")
-        return redirect("kurswahl")
-    
-
-    # Run/Progress initialisieren (fach/kurs NICHT mehr in Session nötig)
-    if request.session.get('quiz_index') is None:
-        request.session['quiz_index'] = 0
-        request.session['score_sum'] = 0.0
-        request.session['items_scored'] = 0
-        request.session['correct_count'] = 0   # <— NEU
-        request.session.modified = True
-
+def _session_run(request):
+    """QuizRun der Session (ohne Neuanlage) oder None."""
     quiz_id = request.session.get(SESSION_QUIZ_ID)
-    if not quiz_id:
-        quiz_id = uuid.uuid4().hex
-        request.session[SESSION_QUIZ_ID] = quiz_id
+    return QuizRun.objects.filter(quiz_id=quiz_id).first() if quiz_id else None
+
+
+def _ensure_run(request):
+    """
+    Aktuellen QuizRun holen; neu anlegen, wenn es keinen gibt, er abgeschlossen ist
+    oder inzwischen ein anderer Kurs/ein anderes Konzept gewählt wurde.
+    """
+    kurs_id = str(request.session.get(SESSION_KURS_KEY) or "")
+    konzept_id = str(request.session.get(SESSION_KONZEPT_KEY) or "")
+    run = _session_run(request)
+    if (run is None or run.finished_at is not None
+            or str(run.kurs_id or "") != kurs_id or str(run.konzept_id or "") != konzept_id):
+        run = QuizRun.objects.create(
+            quiz_id=uuid.uuid4().hex,
+            session_id=_ensure_session_id(request),
+            kurs_id=kurs_id or None,
+            konzept_id=konzept_id or None,
+        )
+        request.session[SESSION_QUIZ_ID] = run.quiz_id
         request.session.modified = True
+    return run
 
-    # Fragen zum Kurs laden
-    # === NEU: Erst versuchen, über KONZEPT zu filtern ===
+
+def _run_questions(request, run):
+    """
+    (questions_qs, total_questions) für das gewählte Konzept, sonst für den ganzen Kurs.
+    Anzahl kommt aus dem denormalisierten Zähler, geladen wird später nur die aktuelle Frage.
+    """
+    kurs_id = request.session.get(SESSION_KURS_KEY)
     konzept_id = request.session.get(SESSION_KONZEPT_KEY)
     if konzept_id:
         questions_qs = QuizQuestion.objects.filter(
             active=True,
             konzept_id=konzept_id
         ).order_by('id')
+        counter_qs = Konzepte.objects.filter(pk=konzept_id)
     else:
         # Fallback: alle Fragen des Kurses
         questions_qs = QuizQuestion.objects.filter(
             active=True,
             konzept__kurs_id=kurs_id
         ).order_by('id')
+        counter_qs = Kurse.objects.filter(pk=kurs_id)
+
+    total_questions = counter_qs.values_list('active_question_count', flat=True).first() or 0
+    if total_questions and run.total != total_questions:
+        # Gesamtanzahl für die Auswertung im Lauf merken
+        update_run(run, lambda r: {"total": total_questions} if r.total != total_questions else None)
+    return questions_qs, total_questions
+
 
-    questions = list(questions_qs)
+def _current_question(run, questions_qs, total_questions):
+    """(Index, Frage) – Frage ist None, wenn der Lauf durch ist."""
+    current_index = run.index
+    if current_index >= total_questions:
+        return current_index, None
+    current_question = (questions_qs
+                        .select_related('konzept__kurs')[current_index:current_index + 1]
+                        .first())
+    return current_index, current_question
+
+
+def _ensure_session_id(request):
+    if not request.session.session_key:
+        request.session.create()
+    return request.session.session_key
+
+
+def _is_stale(posted_item_id, question):
+    """POST bezieht sich auf eine Aufgabe, die (z. B. in einem anderen Tab) schon erledigt ist."""
+    return bool(posted_item_id) and str(posted_item_id) != str(question.item_id)
+
+
+def _rating_required(request, quiz_id, item_id, rating_int):
+    """Es gab einen Versuch, der noch kein Rating hat, und es kommt auch keins mit."""
+    bucket = request.session.get(_session_key(quiz_id, item_id), [])
+    last = bucket[-1] if bucket else None
+    return bool(last and last.get("rating") is None and rating_int is None)
+
+
+def _parse_rating(value):
+    value = str(value or "")
+    return int(value) if value.isdigit() else None
+
+
+PENDING_FEEDBACK = {
+    "is_correct": None,
+    "feedback_ai": "Deine Antwort wird gerade noch bewertet – bitte einen Moment warten.",
+    "score": None,
+}
+
+
+def _submit_answer(request, run, question, user_answer, idem_key=None):
+    """
+    Antwort bewerten & Versuch (ohne Rating) in Session ablegen. Gibt das Feedback-Dict zurück.
+    Gleicher idem_key nochmal (Doppelklick/Retry) → gespeichertes Feedback, keine zweite Bewertung.
+    """
+    claimed, stored = claim_request(run, idem_key, "submit")
+    if not claimed and isinstance(stored, dict):
+        return stored
+    if stored is IN_PROGRESS:
+        return dict(PENDING_FEEDBACK)
+
+    item_id = str(question.item_id)
+    try:
+        with perf.timed("grade"):
+            fb = get_feedback_unified(question, user_answer)
+    except Exception:
+        release_request(run, idem_key)
+        raise
+
+    score_val = fb.get("score")
+    try:
+        score_val = float(score_val)
+    except (TypeError, ValueError):
+        score_val = 0.0
+    score_val = min(max(score_val, 0.0), 1.0)
+
+    is_correct = fb.get("is_correct")
+    if is_correct is None:
+        is_correct = (score_val > 0.8)
+
+    # Nur einmal pro Item eine korrekte Lösung zählen – atomar im Lauf, nicht in der Session
+    if is_correct is True:
+        update_run(run, lambda r: None if item_id in r.solved else {
+            "solved": r.solved + [item_id],
+            "correct_count": r.correct_count + 1,
+        })
+
+    _append_attempt_to_session(request, run.quiz_id, item_id, {
+        "answer": user_answer,
+        "feedback_text": fb.get("feedback_ai", "") or "",
+        "correct_answer": fb.get("correct_answer") or "",
+        "is_correct": bool(is_correct),
+        "score": float(score_val),
+        "rating": None,  # Rating kommt erst im NEXT-Flow
+    })
+    store_result(run, idem_key, fb)
+    return fb
+
+
+def _advance(request, run, question, current_index, rating_int, idem_key=None):
+    """
+    NEXT: Rating setzen, Score aggregieren, Versuche ins Log schreiben, Index erhöhen.
+    Der Index wird per Versionsvergleich weitergezählt: von zwei gleichzeitigen NEXT auf dieselbe
+    Aufgabe gewinnt genau einer – nur der schreibt das Log, der andere verwirft seinen Bucket.
+    """
+    claimed, _ = claim_request(run, idem_key, "next")
+    if not claimed:
+        run.refresh_from_db()   # Stand nach dem ersten Request
+        return
+
+    quiz_id = run.quiz_id
+    item_id = str(question.item_id)
+    key = _session_key(quiz_id, item_id)
+    bucket = request.session.get(key, [])
+    last = bucket[-1] if bucket else None
+
+    # Rating jetzt gesetzt → auf letzten Versuch schreiben
+    if last and last.get("rating") is None and rating_int is not None:
+        _set_rating_on_last_attempt(request, quiz_id, item_id, rating_int)
+
+    # Score aggregieren (nur wenn es überhaupt einen Versuch gab)
+    last_score = 0.0
+    if bucket:
+        try:
+            last_score = float((last or {}).get("score", 0.0) or 0.0)
+        except (TypeError, ValueError):
+            last_score = 0.0
+
+    advanced = update_run(run, lambda r: None if r.index != current_index else {
+        "index": current_index + 1,
+        "score_sum": r.score_sum + last_score,
+        "items_scored": r.items_scored + (1 if bucket else 0),
+    })
+
+    if advanced:
+        meta = _log_meta(question, _ensure_session_id(request))
+        with perf.timed("flush"):
+            _flush_session_to_questionlog(request, quiz_id, item_id, meta)
+            if bucket:
+                # Wiederholungsplan (utils/mastery.py) mit dem Score des letzten Versuchs
+                record_results(learner_key(request), [(item_id, question.konzept_id, last_score)])
+    else:
+        # schon von einem parallelen Request weitergeschaltet (und geloggt)
+        for k in (key, _started_key(quiz_id, item_id)):
+            request.session.pop(k, None)
+        request.session.modified = True
+
+    store_result(run, idem_key, {"index": run.index})
+
+
+# =========================
+# Eigentliche Quiz-View
+# =========================
+
+def quiz_view(request):
+    # Kurs aus der Session holen
+    kurs_id = request.session.get(SESSION_KURS_KEY)
+    if not kurs_id:
+        messages.info(request, "Bitte zuerst einen Kurs auswählen.")
+        return redirect("kurswahl")
+
+    run = _ensure_run(request)
+    quiz_id = run.quiz_id
 
     # Prüfen ob Fragen da
-    total_questions = len(questions)
+    questions_qs, total_questions = _run_questions(request, run)
     if total_questions == 0:
         messages.warning(request, "Für diesen Kurs sind noch keine aktiven Fragen hinterlegt.")
         return redirect('kurs')
-    else:
-        #Gesamtanzahl Fragen für das Quiz speichern 
-        request.session['total_questions'] = total_questions
 
-    current_index = request.session.get('quiz_index', 0)
-    if current_index >= total_questions:
+    current_index, current_question = _current_question(run, questions_qs, total_questions)
+    if current_question is None:
         return redirect('quiz_complete')
 
-    current_question = questions[current_index]
-
     # Session-ID sicherstellen
-    if not request.session.session_key:
-        request.session.create()
-    session_id = request.session.session_key
+    _ensure_session_id(request)
 
     item_id = str(current_question.item_id)
     feedback = None
     user_answer = ""
     ask_rating = False
+    next_question = None
 
     # Start der Aufgabe stempeln (nur einmal je Item)
     if request.method == 'GET':
         _set_created_at_once(request, quiz_id, item_id)
 
     if request.method == 'POST':
-        rating_str = request.POST.get("rating")
-        rating_int = int(rating_str) if rating_str and rating_str.isdigit() else None
+        rating_int = _parse_rating(request.POST.get("rating"))
+        idem_key = (request.POST.get("idem_key") or "")[:64] or None
+
+        # Formular gehört zu einer Aufgabe, die schon erledigt ist (zweiter Tab, Zurück-Button)
+        if _is_stale(request.POST.get("item_id"), current_question):
+            if not is_replay(run, idem_key):
+                messages.info(request, "Diese Aufgabe ist schon erledigt – hier geht es weiter.")
+            return redirect('quiz_view')
 
         # 👉 NEXT gedrückt
         if 'next' in request.POST:
-            key = _session_key(quiz_id, item_id)
-            bucket = request.session.get(key, [])
-            last = bucket[-1] if bucket else None
-
             # Kein Rating abgegeben, aber erforderlich → Sterne anzeigen
-            if last and last.get("rating") is None and rating_int is None:
+            if _rating_required(request, quiz_id, item_id, rating_int):
                 ask_rating = True
-                context = {
-                    'question': current_question,
-                    'feedback': None,
-                    'user_answer': user_answer,
-                    'index': current_index + 1,
-                    'total': total_questions,
-                    'ask_rating': ask_rating,
-                }
-                return render(request, 'quiz/quiz_view.html', context)
-
-            # Rating jetzt gesetzt → auf letzten Versuch schreiben
-            if last and last.get("rating") is None and rating_int is not None:
-                _set_rating_on_last_attempt(request, quiz_id, item_id, rating_int)
-
-            # Score aggregieren (nur wenn es überhaupt einen Versuch gab)
-            if bucket:
-                try:
-                    last_score = float((last or {}).get("score", 0.0) or 0.0)
-                except (TypeError, ValueError):
-                    last_score = 0.0
-                request.session['score_sum'] = float(request.session.get('score_sum', 0.0)) + last_score
-                request.session['items_scored'] = int(request.session.get('items_scored', 0)) + 1
-                request.session.modified = True
-
-            # Metadaten fürs Log (aus Kurs/Konzept/Fraag)
-            kurs_obj = current_question.konzept.kurs
-            meta = {
-                "session_id": session_id,
-                "fach": kurs_obj.fach,
-                "kurs": kurs_obj.kurs,
-                "konzept": (current_question.konzept.name or ""),
-                "text": current_question.text,
-                # nur Dateiname/Path speichern (string) oder None
-                "image": (current_question.image.name if current_question.image else None),
-                "question": current_question.question,
-                "correct_answer": current_question.correct_answer,
-                "feedback_prompt": getattr(current_question, "feedback_prompt", "") or "",
-                "gemini_feedback": bool(getattr(current_question, "gemini_feedback", False)),
-            }
-            _flush_session_to_questionlog(request, quiz_id, item_id, meta)
-
-            # nächste Frage
-            request.session['quiz_index'] = current_index + 1
-            request.session.modified = True
-            return redirect('quiz_view')
-
-        # 👉 ABSENDEN: Antwort bewerten & Versuch (ohne Rating) in Session ablegen
-        user_answer = (request.POST.get('answer') or '').strip()
-        fb = get_feedback_unified(current_question, user_answer)
-
-        score_val = fb.get("score")
-        try:
-            score_val = float(score_val)
-        except (TypeError, ValueError):
-            score_val = 0.0
-        score_val = min(max(score_val, 0.0), 1.0)
-
-        is_correct = fb.get("is_correct")
-        if is_correct is None:
-            is_correct = (score_val > 0.8)
-
-        # ⬇️ NEU: Nur einmal pro Item eine korrekte Lösung zählen
-        key = _session_key(quiz_id, item_id)
-        bucket_before = request.session.get(key, [])
-        already_correct = any(a.get("is_correct") for a in bucket_before)
-
-        if is_correct is True and not already_correct:
-            request.session['correct_count'] = request.session.get('correct_count', 0) + 1
-            request.session.modified = True
-
-        _append_attempt_to_session(request, quiz_id, item_id, {
-            "answer": user_answer,
-            "feedback_text": fb.get("feedback_ai", "") or "",
-            "correct_answer": fb.get("correct_answer") or "",
-            "is_correct": bool(is_correct),
-            "score": float(score_val),
-            "rating": None,  # Rating kommt erst im NEXT-Flow
-        })
-
-        feedback = fb
+            else:
+                _advance(request, run, current_question, current_index, rating_int, idem_key)
+                return redirect('quiz_view')
+        else:
+            # 👉 ABSENDEN: Antwort bewerten & Versuch (ohne Rating) in Session ablegen
+            user_answer = (request.POST.get('answer') or '').strip()
+            feedback = _submit_answer(request, run, current_question, user_answer, idem_key)
+
+            # Während der Schüler das Feedback liest: nächste Aufgabe vorbereiten
+            with perf.timed("prefetch"):
+                next_question = _prepare_next_question(questions_qs, current_index)
 
     # Render
     context = {
@@ -318,5 +453,8 @@ def quiz_view(request):
         'index': current_index + 1,
         'total': total_questions,
         'ask_rating': ask_rating,
+        'next_question': next_question,
+        'content_version': content_version(),
+        'idem_key': uuid.uuid4().hex,   # ein Key pro gerendertem Formular
     }
     return render(request, 'quiz/quiz_view.html', context)
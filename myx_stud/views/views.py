@@ -1,7 +1,17 @@
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from ..models import QuizQuestion, Kurse, Konzepte
-from django.http import JsonResponse
+from ..models import Kurse, QuizQuestion, RunRequest
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from ..utils.caching import (
+    content_version, get_catalog, get_konzept_page, get_kurs_page, version_datetime,
+)
+from ..utils import search
+from ..utils.mastery import due_counts, due_items, konzept_scores, learner_key, save_konzept_score
+from ..utils.runs import update_run
+from .quizview import _session_run
 
 
 SESSION_KURS_KEY = "current_kurs_id"
@@ -15,19 +25,32 @@ def home(request):
 
 
 
+def _catalog(request):
+    """get_catalog() einmal pro Request – ETag, Last-Modified und View lesen denselben Stand."""
+    data = getattr(request, "_myx_catalog", None)
+    if data is None:
+        data = request._myx_catalog = get_catalog()
+    return data
+
+
+def _catalog_etag(request, *args, **kwargs):
+    return str(_catalog(request)["version"])
+
+
+def _catalog_last_modified(request, *args, **kwargs):
+    return version_datetime(_catalog(request)["version"])
+
+
+@cache_control(private=True, no_cache=True)   # Browser darf cachen, muss aber revalidieren (→ 304)
+@condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)
 def get_kurse_for_fach(request):
     """AJAX: gibt Kursnamen zu einem Fach zurück (für das Dropdown)."""
     fach = (request.GET.get("fach") or "").strip()
     if not fach:
         return JsonResponse({"kurse": []})
 
-    kurse = (Kurse.objects
-             .filter(fach=fach)
-             .values_list("kurs", flat=True)
-             .order_by("kurs")
-             .distinct())
-
-    return JsonResponse({"kurse": list(kurse)})
+    kurse = _catalog(request)["faecher"].get(fach, [])
+    return JsonResponse({"kurse": kurse})
 
 
 def kurswahl(request):
@@ -51,10 +74,7 @@ def kurswahl(request):
         request.session.modified = True
         return redirect("kurs")
 
-    faecher = (Kurse.objects
-               .values_list("fach", flat=True)
-               .order_by("fach")
-               .distinct())
+    faecher = list(get_catalog()["faecher"])
 
     return render(request, "kurswahl.html", {"faecher": faecher})
 
@@ -66,35 +86,87 @@ def kurs(request):
         messages.info(request, "Bitte zuerst einen Kurs auswählen.")
         return redirect("kurswahl")
 
-    k = get_object_or_404(Kurse, id=kurs_id)
+    # Eine Version für Objekt-Cache und Template-Fragmente (invalidiert per Signal)
+    version = content_version()
+    page = get_kurs_page(kurs_id, version)
+    if page is None:
+        raise Http404("Kurs nicht gefunden.")
+    k, konzepte = page
     
-    # get scores saved at quiz_complete, e.g. {"<konzept_id>": 0..100}
-    scores_map = request.session.get(SCORES_KEY, {})
+    # get scores saved at quiz_complete, e.g. {"<konzept_id>": 0..100} (DB + Session)
+    scores_map = konzept_scores(request, SCORES_KEY)
+    due_map = due_counts(learner_key(request))
 
     # attach attribute on the Python objects so template stays simple
-    konzepte = list(k.konzepte.all())
+    # (Scores sind pro Schüler → außerhalb der gecachten Fragmente gerendert)
     for z in konzepte:
         z.scores = scores_map.get(str(z.id))  # int or None
+        z.due = due_map.get(str(z.id), 0)
 
-    return render(request, "kurs.html", {"kurs": k, "konzepte": konzepte})
+    return render(request, "kurs.html", {
+        "kurs": k,
+        "konzepte": konzepte,
+        "content_version": version,
+    })
 
 
 
 
-def konzept(request, konzept_id):
-    k = get_object_or_404(Konzepte, id=konzept_id)
-    # Auswahl merken (für quiz_view)
-    request.session[SESSION_KONZEPT_KEY] = str(k.id)
-    request.session.modified = True
-    has_quiz = QuizQuestion.objects.filter(konzept=k, active=True).exists()
+def konzept_suche(request):
+    """Konzepte des aktuellen Kurses per Volltextsuche (Konzepttexte + aktive Fragen)."""
+    kurs_id = request.session.get(SESSION_KURS_KEY)
+    if not kurs_id:
+        messages.info(request, "Bitte zuerst einen Kurs auswählen.")
+        return redirect("kurswahl")
+
+    page = get_kurs_page(kurs_id)
+    if page is None:
+        raise Http404("Kurs nicht gefunden.")
+    k, konzepte = page
 
-    scores_map = request.session.get(SCORES_KEY, {})  # {"<konzept_id>": 0..100}
+    q = (request.GET.get("q") or "").strip()[:200]
+    treffer = []
+    if q:
+        by_id = {z.id: z for z in konzepte}
+        ids = search.search_konzept_ids(q, within=by_id.keys())
+        if ids is None:   # kein Index (anderes DB-Backend) → nur Konzeptnamen
+            treffer = [z for z in konzepte if q.lower() in (z.name or "").lower()]
+        else:
+            treffer = [by_id[i] for i in ids]
+
+    return render(request, "suche.html", {"kurs": k, "q": q, "treffer": treffer})
+
+
+def wiederholen(request):
+    """Was ist fällig? Eine Range-Abfrage auf (learner_key, due_at) statt QuestionLog-Historie."""
+    due = due_items(learner_key(request))
+    questions = {
+        str(q.item_id): q
+        for q in QuizQuestion.objects.select_related("konzept")
+                                     .filter(active=True, item_id__in=[m.item_id for m in due])
+    }
+    rows = [(m, questions[m.item_id]) for m in due if m.item_id in questions]
+    return render(request, "wiederholen.html", {"rows": rows})
+
+
+def konzept(request, konzept_id):
+    version = content_version()
+    page = get_konzept_page(konzept_id, version)
+    if page is None:
+        raise Http404("Konzept nicht gefunden.")
+    k, kurs_obj, has_quiz = page
+    # Auswahl merken (für quiz_view) – nur bei Wechsel, sonst kein Session-UPDATE
+    if request.session.get(SESSION_KONZEPT_KEY) != str(k.id):
+        request.session[SESSION_KONZEPT_KEY] = str(k.id)
+
+    scores_map = konzept_scores(request, SCORES_KEY)  # {"<konzept_id>": 0..100}
     k.scores = scores_map.get(str(k.id))  # int oder None
 
     return render(request, "konzept.html", {
         "konzept": k, 
-        "kurs": k.kurs,
+        "kurs": kurs_obj,
         "has_quiz": has_quiz,
+        "content_version": version,
         })
 
 
@@ -113,40 +185,56 @@ def quiz_complete(request):
         messages.info(request, "Bitte zuerst ein Konzept auswählen.")
         return redirect("kurs")  # oder eigene Konzeptliste
 
-    # Korrekte gemerkte Antworten (Zähler kam aus der quiz_view)
-    correct = int(request.session.get('correct_count', 0))
-
-    # Anzahl Quititems
-    total_questions = request.session.get('total_questions')
-
-    # Score-Ergebnis (Durchschnitt aus den tatsächlich bewerteten Items)
-    score_sum    = float(request.session.get('score_sum', 0.0))
-    items_scored = int(request.session.get('items_scored', 0))
-    avg_score    = (score_sum / total_questions) if items_scored > 0 else 0.0
-    percent = max(0, min(100, int(round(100 * avg_score))))
-
-    # Save to session per Konzept
+    result = _finish_run(request, konzept_id)
+    return render(request, 'quiz/quiz_complete.html', result)
+
+
+def _finish_run(request, konzept_id):
+    """
+    Ergebnis des Laufs berechnen, Score pro Konzept merken und den Lauf abschließen
+    (der nächste Aufruf der quiz_view startet einen neuen). Erneutes Aufrufen – Reload,
+    zweiter Tab – liefert das gespeicherte Ergebnis.
+    """
+    run = _session_run(request)
+    if run is None:
+        return {'correct': 0, 'avg_score': 0.0, 'percent': 0, 'score_sum': 0.0, 'konzept_id': konzept_id}
+
+    if run.result is None:
+        # Korrekte gemerkte Antworten (Zähler kam aus der quiz_view)
+        correct = run.correct_count
+
+        # Score-Ergebnis (Durchschnitt aus den tatsächlich bewerteten Items)
+        score_sum = run.score_sum
+        avg_score = (score_sum / run.total) if run.items_scored > 0 and run.total else 0.0
+        percent = max(0, min(100, int(round(100 * avg_score))))
+        result = {
+            'correct': correct,
+            'avg_score': round(avg_score, 3),  # z.B. 0.667
+            'percent'  : percent,              # z.B. 67
+            'score_sum': round(score_sum, 3),
+        }
+        written = update_run(run, lambda r: None if r.result is not None else {
+            'result': result,
+            'finished_at': timezone.now(),
+        })
+        if written:
+            RunRequest.objects.filter(run=run).delete()   # Idempotenz-Keys werden nicht mehr gebraucht
+        elif run.result is None:
+            # update_run hat nach MAX_RETRIES aufgegeben: gespeichertes Ergebnis eines parallelen
+            # Requests nehmen, sonst das eben berechnete (der nächste Aufruf schreibt es erneut)
+            run.refresh_from_db()
+            if run.result is None:
+                run.result = result
+
+    # Save to session per Konzept (+ dauerhaft je Lernendem)
     scores = request.session.get(SCORES_KEY, {})
     if konzept_id:
-        scores[str(konzept_id)] = int(max(0, min(100, percent)))
+        scores[str(konzept_id)] = int(max(0, min(100, run.result['percent'])))
         request.session[SCORES_KEY] = scores
         request.session.modified = True
+        save_konzept_score(learner_key(request), konzept_id, run.result['percent'])
 
-
-    # Soft-Reset für einen neuen Durchlauf im selben Kurs
-    request.session['quiz_index']    = 0
-    request.session['correct_count'] = 0
-    request.session['score_sum']     = 0.0
-    request.session['items_scored']  = 0
-    request.session.modified = True
-
-    return render(request, 'quiz/quiz_complete.html', {
-        'correct': correct,
-        'avg_score': round(avg_score, 3),  # z.B. 0.667
-        'percent'  : percent,              # z.B. 67
-        'score_sum': round(score_sum, 3),
-        'konzept_id': konzept_id,
-    })
+    return {**run.result, 'konzept_id': konzept_id}
 
 
 def _clear_quiz_session(request):